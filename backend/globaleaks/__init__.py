@@ -10,7 +10,7 @@ __copyright__ = '2011-2023 - GlobaLeaks'
 __version__ = '4.13.13'
 __license__ = 'AGPL-3.0'
 
-DATABASE_VERSION = 66
+DATABASE_VERSION = 67
 FIRST_DATABASE_VERSION_SUPPORTED = 45
 
 # Add new languages as they are supported here! To do this retrieve the name of
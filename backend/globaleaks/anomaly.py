@@ -96,11 +96,7 @@ class Alarm(object):
         """
         number_of_anomalies = 0
 
-        self.event_matrix.clear()
-
-        for event in State.tenants[tid].RecentEventQ:
-            self.event_matrix.setdefault(event.event_type, 0)
-            self.event_matrix[event.event_type] += 1
+        self.event_matrix = State.tenants[tid].RecentEvents.counts()
 
         for event_name, threshold in ANOMALY_MAP.items():
             if event_name in self.event_matrix:
@@ -205,7 +201,7 @@ class Alarm(object):
                      old_accept_submissions, accept_submissions)
 
             # Must invalidate the cache here becuase accept_subs served in /public has changed
-            Cache.invalidate()
+            Cache.invalidate(1, ['node'])
 
 
 @inlineCallbacks
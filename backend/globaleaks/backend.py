@@ -6,6 +6,7 @@ import traceback
 
 from twisted.application import service
 from twisted.internet import reactor, defer
+from twisted.internet.threads import deferToThread
 from twisted.python.log import ILogObserver
 from twisted.python.log import addObserver
 from twisted.web import resource, server
@@ -15,17 +16,15 @@ from globaleaks.services import tor
 
 from globaleaks.db import create_db, init_db, update_db, \
     sync_refresh_tenant_cache, sync_clean_untracked_files, sync_initialize_snimap
+from globaleaks.handlers.staticfile import StaticFiles
 from globaleaks.rest.api import APIResourceWrapper
+from globaleaks.rest.compression import GzipEncoderFactory
 from globaleaks.settings import Settings
 from globaleaks.state import State
 from globaleaks.utils.log import log, openLogFile, logFormatter, LogObserver
 from globaleaks.utils.sock import listen_tcp_on_sock, listen_tls_on_sock
 
 
-# Set Gzip Encoder compression level to 1 prioritizing speed over compression
-server.GzipEncoderFactory.compressLevel = 1
-
-
 def fail_startup(excep):
     log.err("ERROR: Cannot start GlobaLeaks. Please manually examine the exception.")
     log.err("EXCEPTION: %s", excep)
@@ -36,6 +35,7 @@ def fail_startup(excep):
 
 class Request(server.Request):
     log_ip_and_ua = False
+    precompressed = False
 
 
 class Site(server.Site):
@@ -50,7 +50,7 @@ class Service(service.Service):
 
     def __init__(self):
         self.state = State
-        self.arw = resource.EncodingResourceWrapper(APIResourceWrapper(), [server.GzipEncoderFactory()])
+        self.arw = resource.EncodingResourceWrapper(APIResourceWrapper(), [GzipEncoderFactory()])
         self.api_factory = Site(self.arw, logPath=Settings.accesslogfile, logFormatter=logFormatter)
 
         self.api_factory.displayTracebacks = False
@@ -67,6 +67,7 @@ class Service(service.Service):
 
             self._shutdown = True
             self.state.orm_tp.stop()
+            self.state.orm_ro_tp.stop()
             d.callback(None)
 
         reactor.callLater(30, _shutdown, None)
@@ -107,8 +108,6 @@ class Service(service.Service):
             create_db()
             init_db()
 
-        sync_clean_untracked_files()
-
         if self.state.settings.migrate_only:
             reactor.stop()
             return
@@ -117,6 +116,10 @@ class Service(service.Service):
         sync_initialize_snimap()
 
         self.state.orm_tp.start()
+        self.state.orm_ro_tp.start()
+
+        # Index the client files before accepting connections
+        StaticFiles.load(self.state.settings.client_path)
 
         reactor.addSystemEventTrigger('before', 'shutdown', self.shutdown)
 
@@ -131,6 +134,9 @@ class Service(service.Service):
 
         self.start_jobs()
 
+        # The reconciliation of the attachments is not needed to serve requests
+        deferToThread(sync_clean_untracked_files).addErrback(lambda failure: log.err('Failure reconciling the attachments: %s', failure))
+
         self.print_listening_interfaces()
 
     @defer.inlineCallbacks
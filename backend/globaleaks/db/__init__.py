@@ -1,6 +1,7 @@
 # -*- coding: utf-8
 import os
 import sys
+import time
 import traceback
 import warnings
 
@@ -110,39 +111,48 @@ def db_get_tracked_files(session):
     """
     Transaction for retrieving the list of files tracked by the application database
     :param session: An ORM session
-    :return: The list of filenames of the files
+    :return: The set of filenames of the files
     """
-    return [x[0] for x in session.query(models.File.id)]
+    return {x[0] for x in session.query(models.File.id)}
 
 
 def db_get_tracked_attachments(session):
     """
     Transaction for retrieving the list of attachment files tracked by the application database
     :param session: An ORM session
-    :return: The list of filenames of the attachment files
+    :return: The set of filenames of the attachment files
     """
-    ifiles = session.query(models.InternalFile.id).all()
-    wbfiles = session.query(models.WhistleblowerFile.id).all()
-    rfiles = session.query(models.ReceiverFile.id).all()
+    tracked_files = set()
 
-    return [x[0] for x in ifiles + wbfiles + rfiles]
+    for model in [models.InternalFile, models.WhistleblowerFile, models.ReceiverFile]:
+        tracked_files.update(x[0] for x in session.query(model.id))
+
+    return tracked_files
 
 
 @transact_sync
-def sync_clean_untracked_files(session):
+def sync_get_tracked_attachments(session):
+    return db_get_tracked_attachments(session)
+
+
+def sync_clean_untracked_files():
     """
-    Transaction for removing files that are not tracked by the application database
-    :param session: An ORM session
+    Function for removing files that are not tracked by the application database
+
+    The files are handed to the secure deletion queue; the files modified
+    after the load of the tracked files are skipped so that the function
+    could run while new files are being uploaded.
     """
-    tracked_files = db_get_tracked_attachments(session)
-    for filesystem_file in os.listdir(Settings.attachments_path):
-        if filesystem_file not in tracked_files:
-            file_to_remove = os.path.join(Settings.attachments_path, filesystem_file)
-            log.debug('Removing untracked file: %s', file_to_remove)
-            try:
-                fs.srm(file_to_remove)
-            except OSError:
-                log.err('Failed to remove untracked file', file_to_remove)
+    snapshot = time.time()
+    tracked_files = sync_get_tracked_attachments()
+
+    count = 0
+    for path in fs.scan_untracked_files(Settings.attachments_path, tracked_files, snapshot):
+        log.debug('Removing untracked file: %s', path)
+        fs.SecureDeletionQueue.put(path)
+        count += 1
+
+    log.debug('Reconciled %d tracked files: %d untracked files removed', len(tracked_files), count)
 
 
 @transact_sync
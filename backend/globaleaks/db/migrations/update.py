@@ -1,13 +1,57 @@
 # -*- coding: utf-8 -*-
+import resource
+import time
+
+from sqlalchemy import insert, select
+
 from globaleaks import DATABASE_VERSION, FIRST_DATABASE_VERSION_SUPPORTED
 from globaleaks.db.appdata import load_appdata
 from globaleaks.utils.log import log
 
 
+def get_memory_high_water_mark():
+    """
+    Return the maximum resident set size of the process in MB
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+
+
+class MigrationProgress(object):
+    """
+    Progress of the migration of a table logged at fixed time intervals
+    """
+    interval = 10
+
+    def __init__(self, model_name, total):
+        self.model_name = model_name
+        self.total = total
+        self.count = 0
+        self.start = self.last = time.monotonic()
+
+    def update(self, count):
+        self.count += count
+
+        now = time.monotonic()
+        if now - self.last < self.interval and self.count < self.total:
+            return
+
+        self.last = now
+
+        elapsed = now - self.start
+        eta = elapsed * max(self.total - self.count, 0) / self.count
+
+        log.info('   %s: %d/%d entries (%d%%), ETA %ds, memory high-water mark %dMB' %
+                 (self.model_name, self.count, self.total,
+                  100 * self.count // max(self.total, 1), eta, get_memory_high_water_mark()))
+
+
 class MigrationBase(object):
     """
     This is the base class used by every Updater
     """
+    # Number of entries read and inserted at once by the generic migration
+    batch_size = 1000
+
     skip_model_migration = {}
     skip_count_check = {}
     renamed_attrs = {}
@@ -55,6 +99,39 @@ class MigrationBase(object):
         pass
 
     def generic_migration_function(self, model_name):
+        """
+        Copy the entries of a table streaming them in batches of fixed size
+        """
+        model_from = self.model_from[model_name]
+        model_to = self.model_to[model_name]
+        renamed_attrs = self.renamed_attrs.get(model_name, {})
+
+        old_columns = model_from.__table__.columns
+        keys, old_keys = [], []
+        for key in [c.key for c in model_to.__table__.columns]:
+            old_key = renamed_attrs.get(key, key)
+
+            if old_key in old_columns:
+                keys.append(key)
+                old_keys.append(old_key)
+            elif hasattr(model_from, old_key):
+                # The value is computed by the old model
+                return self.generic_object_migration_function(model_name)
+
+        result = self.session_old.execute(select([old_columns[old_key] for old_key in old_keys]))
+
+        progress = MigrationProgress(model_name, self.entries_count[model_name])
+
+        while True:
+            rows = result.fetchmany(self.batch_size)
+            if not rows:
+                break
+
+            self.session_new.execute(insert(model_to.__table__), [dict(zip(keys, row)) for row in rows])
+
+            progress.update(len(rows))
+
+    def generic_object_migration_function(self, model_name):
         for old_obj in self.session_old.query(self.model_from[model_name]):
             new_obj = self.model_to[model_name]()
 
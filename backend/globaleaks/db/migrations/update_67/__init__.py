@@ -0,0 +1,23 @@
+# -*- coding: UTF-8
+from globaleaks.db.migrations.update import MigrationBase
+from globaleaks.models import Model
+from globaleaks.models.properties import *
+from globaleaks.utils.utility import datetime_now
+
+
+class AuditLog_v_66(Model):
+    __tablename__ = 'auditlog'
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = Column(Integer, primary_key=True)
+    tid = Column(Integer, default=1)
+    date = Column(DateTime, default=datetime_now, nullable=False)
+    type = Column(UnicodeText(24), default='', nullable=False)
+    severity = Column(Integer, default=0, nullable=False)
+    user_id = Column(UnicodeText(36))
+    object_id = Column(UnicodeText(36))
+    data = Column(JSON)
+
+
+class MigrationScript(MigrationBase):
+    pass
@@ -1,4 +1,5 @@
 # -*- coding: utf-8
+import time
 
 from globaleaks.state import State
 from globaleaks.utils.utility import datetime_now
@@ -45,9 +46,9 @@ class Event(object):
     Once a while, they disappear. The statistics just take
     account of the expiration of the events collected, once a while.
 
-    - Anomaly check is based on those elements.
-    - Real-time analysis is based on these, too.
+    - Real-time analysis is based on these elements.
     """
+    __slots__ = ('event_type', 'creation_date', 'request_time')
 
     def __init__(self, event_obj, request_time):
         self.event_type = event_obj['name']
@@ -62,12 +63,79 @@ class Event(object):
         }
 
 
+class EventCounter(object):
+    """
+    Sliding window counters of the events of a tenant
+
+    The window is divided in buckets of fixed duration kept in a ring for
+    each type of event; the totals of the window are updated on every
+    increment and on every expiration of a bucket so that the memory used
+    and the cost of the counts do not depend on the rate of the events.
+
+    - Anomaly check is based on these counters.
+    """
+    __slots__ = ('bucket_size', 'size', 'rings', 'totals', 'current')
+
+    def __init__(self, window=3600, bucket_size=60):
+        self.bucket_size = bucket_size
+        self.size = window // bucket_size
+        self.rings = {}
+        self.totals = {}
+        self.current = self.get_bucket(time.monotonic())
+
+    def get_bucket(self, now):
+        return int(now // self.bucket_size)
+
+    def advance(self, now):
+        bucket = self.get_bucket(now)
+        elapsed = bucket - self.current
+
+        if elapsed <= 0:
+            return
+
+        if elapsed >= self.size:
+            for event_type, ring in self.rings.items():
+                ring[:] = [0] * self.size
+                self.totals[event_type] = 0
+        else:
+            for i in range(self.current + 1, bucket + 1):
+                slot = i % self.size
+                for event_type, ring in self.rings.items():
+                    self.totals[event_type] -= ring[slot]
+                    ring[slot] = 0
+
+        self.current = bucket
+
+    def increment(self, event_type, now=None):
+        self.advance(time.monotonic() if now is None else now)
+
+        ring = self.rings.get(event_type)
+        if ring is None:
+            ring = self.rings[event_type] = [0] * self.size
+            self.totals[event_type] = 0
+
+        ring[self.current % self.size] += 1
+        self.totals[event_type] += 1
+
+    def count(self, event_type, now=None):
+        self.advance(time.monotonic() if now is None else now)
+
+        return self.totals.get(event_type, 0)
+
+    def counts(self, now=None):
+        """
+        Return the number of the events of each type occurred in the window
+        """
+        self.advance(time.monotonic() if now is None else now)
+
+        return {event_type: total for event_type, total in self.totals.items() if total}
+
+
 def track_handler(handler):
     tid = handler.request.tid
 
     for event in events_monitored:
         if event['handler_check'](handler):
-            e = Event(event, handler.request.execution_time)
-            State.tenants[tid].RecentEventQ.append(e)
-            State.tenants[tid].EventQ.append(e)
+            State.tenants[tid].RecentEvents.increment(event['name'])
+            State.tenants[tid].EventQ.append(Event(event, handler.request.execution_time))
             break
@@ -1,13 +1,29 @@
 # -*- coding: utf-8
-import operator
+import csv
+import io
+import json
 import os
 
-from sqlalchemy.sql.expression import distinct, func
+from datetime import datetime
+
+from sqlalchemy.sql.expression import and_, distinct, func, or_
 
 from globaleaks import models
 from globaleaks.handlers.base import BaseHandler
-from globaleaks.orm import transact
+from globaleaks.orm import get_orm_stats, transact_ro, transact_sync
+from globaleaks.rest import errors
+from globaleaks.rest.cache import Cache
+from globaleaks.sessions import TipKeyCache
 from globaleaks.state import State
+from globaleaks.utils.crypto import Argon2Pool
+from globaleaks.utils.fs import SecureDeletionQueue
+from globaleaks.utils.json import JSONEncoder
+from globaleaks.utils.pgp import KeyringCache
+from globaleaks.utils.utility import decode_cursor, encode_cursor
+
+AUDIT_LOG_PAGE_SIZE = 100
+AUDIT_LOG_MAX_PAGE_SIZE = 1000
+AUDIT_LOG_FIELDS = ['date', 'type', 'severity', 'user_id', 'object_id', 'data']
 
 
 def serialize_log(log):
@@ -21,14 +37,117 @@ def serialize_log(log):
     }
 
 
-@transact
-def get_audit_log(session, tid):
-    logs = session.query(models.AuditLog).filter(models.AuditLog.tid == tid)
+def parse_audit_log_filters(args):
+    """
+    Parse the request arguments returning the filters to be applied to the audit log
+
+    :param args: The request arguments
+    :return: A list of filter expressions
+    """
+    filters = []
+
+    try:
+        for key in ['type', 'user_id', 'object_id']:
+            if key.encode() in args:
+                filters.append(getattr(models.AuditLog, key) == args[key.encode()][0].decode())
+
+        if b'date_after' in args:
+            filters.append(models.AuditLog.date >= datetime.utcfromtimestamp(int(args[b'date_after'][0])))
+
+        if b'date_before' in args:
+            filters.append(models.AuditLog.date <= datetime.utcfromtimestamp(int(args[b'date_before'][0])))
+    except (ValueError, OverflowError, UnicodeDecodeError):
+        raise errors.InputValidationError("Invalid audit log filter")
+
+    return filters
+
+
+def db_get_audit_log_page(session, tid, filters, cursor, limit):
+    """
+    Return a page of audit log entries ordered from the most recent
+    applying keyset pagination on (date, id)
+
+    :param session: An ORM session
+    :param tid: A tenant ID
+    :param filters: The filters to be applied
+    :param cursor: The cursor of the last entry of the previous page
+    :param limit: The maximum number of entries to be returned
+    :return: The list of entries and the cursor to be used for the next page
+    """
+    query = session.query(models.AuditLog).filter(models.AuditLog.tid == tid, *filters)
+
+    if cursor:
+        date, id = cursor
+        query = query.filter(or_(models.AuditLog.date < date,
+                                 and_(models.AuditLog.date == date,
+                                      models.AuditLog.id < id)))
+
+    logs = query.order_by(models.AuditLog.date.desc(), models.AuditLog.id.desc()).limit(limit).all()
+
+    next_cursor = None
+    if len(logs) == limit:
+        next_cursor = (logs[-1].date, logs[-1].id)
+
+    return [serialize_log(log) for log in logs], next_cursor
+
+
+@transact_ro
+def get_audit_log(session, tid, filters=()):
+    logs = session.query(models.AuditLog).filter(models.AuditLog.tid == tid, *filters)
 
     return [serialize_log(log) for log in logs]
 
 
-@transact
+@transact_ro
+def get_audit_log_page(session, tid, filters, cursor, limit):
+    logs, next_cursor = db_get_audit_log_page(session, tid, filters, cursor, limit)
+
+    return {
+        'entries': logs,
+        'cursor': encode_cursor(*next_cursor) if next_cursor else None
+    }
+
+
+@transact_sync
+def sync_get_audit_log_page(session, tid, filters, cursor, limit):
+    return db_get_audit_log_page(session, tid, filters, cursor, limit)
+
+
+def stream_audit_log(tid, filters, fmt):
+    """
+    Generator of the audit log in NDJSON or CSV format
+
+    Entries are fetched in pages so that the full log is never
+    loaded in memory at once.
+    """
+    output = io.StringIO()
+
+    if fmt == 'csv':
+        writer = csv.DictWriter(output, fieldnames=AUDIT_LOG_FIELDS)
+        writer.writeheader()
+
+    cursor = None
+    while True:
+        logs, cursor = sync_get_audit_log_page(tid, filters, cursor, AUDIT_LOG_MAX_PAGE_SIZE)
+
+        for log in logs:
+            if fmt == 'csv':
+                log['data'] = json.dumps(log['data'], cls=JSONEncoder) if log['data'] is not None else ''
+                writer.writerow(log)
+            else:
+                output.write(json.dumps(log, cls=JSONEncoder, separators=(',', ':')))
+                output.write('\n')
+
+        yield output.getvalue().encode()
+
+        output.seek(0)
+        output.truncate()
+
+        if cursor is None:
+            break
+
+
+@transact_ro
 def get_tips(session, tid):
     tips = []
 
@@ -88,11 +207,8 @@ class RecentEventsCollection(BaseHandler):
     check_roles = 'admin'
 
     def get(self):
-        templist = [e.serialize() for e in State.tenants[self.request.tid].EventQ]
-
-        templist.sort(key=operator.itemgetter('creation_date'))
-
-        return templist
+        # Events are collected in chronological order
+        return [e.serialize() for e in State.tenants[self.request.tid].EventQ]
 
 
 class JobsTiming(BaseHandler):
@@ -113,14 +229,73 @@ class JobsTiming(BaseHandler):
         return response
 
 
+class Metrics(BaseHandler):
+    """
+    This handler returns the runtime metrics of the backend components
+    """
+    check_roles = 'admin'
+    root_tenant_only = True
+
+    def get(self):
+        from globaleaks.jobs.delivery import DeliveryPool
+        from globaleaks.jobs.notification import Notification
+        from globaleaks.handlers.staticfile import StaticFiles
+        from globaleaks.rest.api import APIResourceWrapper
+
+        return {
+            'argon2': Argon2Pool.stats(),
+            'cache': Cache.stats(),
+            'delivery': DeliveryPool.stats(),
+            'mail': {
+                'pools': {tid: pool.stats() for tid, pool in State.smtp_pools.items()},
+                'last_spool': Notification.last_spool
+            },
+            'orm': get_orm_stats(),
+            'pgp': KeyringCache.stats(),
+            'router': APIResourceWrapper.router.stats() if APIResourceWrapper.router is not None else {},
+            'secure_deletion': SecureDeletionQueue.stats(),
+            'static': StaticFiles.stats(),
+            'tip_keys': TipKeyCache.stats()
+        }
+
+
 class AuditLog(BaseHandler):
     """
-    Handler that provide access to the access.log file
+    Handler that provide access to the audit log
+
+    The log could be fetched:
+      - entirely (default);
+      - in pages by specifying the arguments limit and cursor;
+      - as an NDJSON or CSV download by specifying the argument format.
     """
     check_roles = 'admin'
+    handler_exec_time_threshold = 3600
 
     def get(self):
-        return get_audit_log(self.request.tid)
+        args = self.request.args
+        filters = parse_audit_log_filters(args)
+
+        fmt = args.get(b'format', [b''])[0]
+        if fmt in (b'csv', b'ndjson'):
+            fmt = fmt.decode()
+            return self.write_stream_as_download('auditlog.' + fmt,
+                                                 stream_audit_log(self.request.tid, filters, fmt))
+
+        if b'limit' not in args and b'cursor' not in args:
+            return get_audit_log(self.request.tid, filters)
+
+        try:
+            limit = int(args.get(b'limit', [AUDIT_LOG_PAGE_SIZE])[0])
+            cursor = args.get(b'cursor', [b''])[0].decode()
+            cursor = decode_cursor(cursor) if cursor else None
+            if cursor:
+                cursor = cursor[0], int(cursor[1])
+        except (ValueError, UnicodeDecodeError):
+            raise errors.InputValidationError("Invalid audit log cursor")
+
+        limit = min(max(limit, 1), AUDIT_LOG_MAX_PAGE_SIZE)
+
+        return get_audit_log_page(self.request.tid, filters, cursor, limit)
 
 
 class AccessLog(BaseHandler):
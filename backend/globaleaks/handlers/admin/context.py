@@ -225,6 +225,7 @@ def order_elements(session, tid, ids, *args, **kwargs):
 class ContextsCollection(OperationHandler):
     check_roles = 'admin'
     invalidate_cache = True
+    invalidate_cache_tags = ['contexts', 'questionnaires']
 
     def get(self):
         """
@@ -253,6 +254,7 @@ class ContextsCollection(OperationHandler):
 class ContextInstance(BaseHandler):
     check_roles = 'admin'
     invalidate_cache = True
+    invalidate_cache_tags = ['contexts', 'questionnaires']
 
     def put(self, context_id):
         """
@@ -393,6 +393,7 @@ def get_fieldtemplate_list(session, tid, language):
 class FieldTemplatesCollection(BaseHandler):
     check_roles = 'admin'
     invalidate_cache = True
+    invalidate_cache_tags = ['questionnaires']
 
     def get(self):
         """
@@ -423,6 +424,7 @@ class FieldTemplatesCollection(BaseHandler):
 class FieldTemplateInstance(BaseHandler):
     check_roles = 'admin'
     invalidate_cache = True
+    invalidate_cache_tags = ['questionnaires']
 
     def get(self, field_id):
         """
@@ -452,6 +454,7 @@ class FieldTemplateInstance(BaseHandler):
 class FieldsCollection(BaseHandler):
     check_roles = 'admin'
     invalidate_cache = True
+    invalidate_cache_tags = ['questionnaires']
 
     def post(self):
         """
@@ -468,6 +471,7 @@ class FieldsCollection(BaseHandler):
 class FieldInstance(BaseHandler):
     check_roles = 'admin'
     invalidate_cache = True
+    invalidate_cache_tags = ['questionnaires']
 
     def put(self, field_id):
         """
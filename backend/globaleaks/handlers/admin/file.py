@@ -95,6 +95,7 @@ def delete_file(session, tid, id_or_name):
 class FileInstance(BaseHandler):
     check_roles = 'user'
     invalidate_cache = True
+    invalidate_cache_tags = ['contexts', 'node', 'receivers']
     upload_handler = True
 
     allowed_mimetypes = [
@@ -24,16 +24,22 @@ def db_load_tls_config(session, tid, test=False):
     :param tid: A tenant ID
     :return: The serialized TLS configuration for the specified tenant
     """
-    node = ConfigFactory(session, tid)
-
-    if test or node.get_val('https_enabled'):
-        key = node.get_val('https_key')
-        cert = node.get_val('https_cert')
-        chain = node.get_val('https_chain')
-        hostname = node.get_val('hostname')
+    node = ConfigFactory(session, tid).get_vals(['https_enabled',
+                                                 'https_key',
+                                                 'https_cert',
+                                                 'https_chain',
+                                                 'hostname',
+                                                 'https_selfsigned_key',
+                                                 'https_selfsigned_cert'])
+
+    if test or node['https_enabled']:
+        key = node['https_key']
+        cert = node['https_cert']
+        chain = node['https_chain']
+        hostname = node['hostname']
     else:
-        key = node.get_val('https_selfsigned_key')
-        cert = node.get_val('https_selfsigned_cert')
+        key = node['https_selfsigned_key']
+        cert = node['https_selfsigned_cert']
         chain = ''
         hostname = '127.0.0.1'
 
@@ -42,7 +48,7 @@ def db_load_tls_config(session, tid, test=False):
         'ssl_key': key,
         'ssl_cert': cert,
         'ssl_intermediate': chain,
-        'https_enabled': node.get_val('https_enabled'),
+        'https_enabled': node['https_enabled'],
         'hostname': hostname
     }
 
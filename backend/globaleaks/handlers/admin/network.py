@@ -43,6 +43,7 @@ class NetworkInstance(BaseHandler):
     check_roles = 'user'
     root_tenant_or_management_only = True
     invalidate_cache = True
+    invalidate_cache_tags = ['node']
 
     def get(self):
         """
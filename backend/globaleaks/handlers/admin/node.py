@@ -119,6 +119,7 @@ def db_update_node(session, tid, user_session, request, language):
 class NodeInstance(BaseHandler):
     check_roles = 'user'
     invalidate_cache = True
+    invalidate_cache_tags = ['l10n', 'node']
 
     def determine_allow_config_filter(self):
         if self.session.user_role == 'admin':
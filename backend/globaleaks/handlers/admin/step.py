@@ -95,6 +95,7 @@ def order_elements(session, handler, req_args, *args, **kwargs):
 class StepCollection(OperationHandler):
     check_roles = 'admin'
     invalidate_cache = True
+    invalidate_cache_tags = ['questionnaires']
 
     def post(self):
         request = self.validate_request(self.request.content.read(),
@@ -111,6 +112,7 @@ class StepCollection(OperationHandler):
 class StepInstance(BaseHandler):
     check_roles = 'admin'
     invalidate_cache = True
+    invalidate_cache_tags = ['questionnaires']
 
     def put(self, step_id):
         request = self.validate_request(self.request.content.read(),
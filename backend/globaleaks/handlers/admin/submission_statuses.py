@@ -152,6 +152,7 @@ def order_substatus_elements(session, handler, req_args, *args, **kwargs):
 class SubmissionStatusCollection(OperationHandler):
     check_roles = 'admin'
     invalidate_cache = True
+    invalidate_cache_tags = ['submission_statuses']
 
     def get(self):
         return tw(db_get_submission_statuses, self.request.tid, self.request.language)
@@ -171,6 +172,7 @@ class SubmissionStatusCollection(OperationHandler):
 class SubmissionStatusInstance(BaseHandler):
     check_roles = 'admin'
     invalidate_cache = True
+    invalidate_cache_tags = ['submission_statuses']
 
     def put(self, status_id):
         request = self.validate_request(self.request.content.read(),
@@ -189,6 +191,7 @@ class SubmissionSubStatusCollection(OperationHandler):
     """Manages substatuses for a given status"""
     check_roles = 'admin'
     invalidate_cache = True
+    invalidate_cache_tags = ['submission_statuses']
 
     @inlineCallbacks
     def get(self, status_id):
@@ -214,6 +217,7 @@ class SubmissionSubStatusCollection(OperationHandler):
 class SubmissionSubStatusInstance(BaseHandler):
     check_roles = 'admin'
     invalidate_cache = True
+    invalidate_cache_tags = ['submission_statuses']
 
     def put(self, status_id, substatus_id):
         request = self.validate_request(self.request.content.read(),
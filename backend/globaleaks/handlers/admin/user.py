@@ -169,6 +169,7 @@ def db_get_users(session, tid, role=None, language=None):
 class UsersCollection(BaseHandler):
     check_roles = 'admin'
     invalidate_cache = True
+    invalidate_cache_tags = ['contexts', 'receivers']
 
     def get(self):
         """
@@ -192,6 +193,7 @@ class UsersCollection(BaseHandler):
 class UserInstance(BaseHandler):
     check_roles = 'admin'
     invalidate_cache = True
+    invalidate_cache_tags = ['contexts', 'receivers']
 
     def put(self, user_id):
         """
@@ -3,14 +3,14 @@
 # Handlers dealing with platform authentication
 from datetime import timedelta
 from random import SystemRandom
-from sqlalchemy import or_
+from sqlalchemy import bindparam, or_
 from twisted.internet.defer import inlineCallbacks, returnValue
 
 import globaleaks.handlers.auth.token
 
 from globaleaks.handlers.base import connection_check, BaseHandler
 from globaleaks.models import InternalTip, User
-from globaleaks.orm import db_log, transact, tw
+from globaleaks.orm import bakery, db_log, transact, tw
 from globaleaks.rest import errors, requests
 from globaleaks.sessions import initialize_submission_session, Sessions
 from globaleaks.settings import Settings
@@ -19,6 +19,18 @@ from globaleaks.utils.crypto import Base64Encoder, GCE
 from globaleaks.utils.utility import datetime_now, deferred_sleep
 
 
+login_user_query = bakery(lambda session: session.query(User)
+                                               .filter(User.username == bindparam('username'),
+                                                       User.enabled.is_(True),
+                                                       User.tid == bindparam('tid')))
+
+simplified_login_user_query = bakery(lambda session: session.query(User)
+                                                          .filter(or_(User.id == bindparam('username'),
+                                                                      User.username == bindparam('username')),
+                                                                  User.enabled.is_(True),
+                                                                  User.tid == bindparam('tid')))
+
+
 def db_login_failure(session, tid, whistleblower=False):
     Settings.failed_login_attempts[tid] = Settings.failed_login_attempts.get(tid, 0) + 1
 
@@ -102,14 +114,11 @@ def login(session, tid, username, password, authcode, client_using_tor, client_i
     :return: Returns a user session in case of success
     """
     if tid in State.tenants and State.tenants[tid].cache.simplified_login:
-        user = session.query(User).filter(or_(User.id == username,
-                                              User.username == username),
-                                          User.enabled.is_(True),
-                                          User.tid == tid).one_or_none()
+        query = simplified_login_user_query
     else:
-        user = session.query(User).filter(User.username == username,
-                                          User.enabled.is_(True),
-                                          User.tid == tid).one_or_none()
+        query = login_user_query
+
+    user = query(session).params(tid=tid, username=username).one_or_none()
 
     if not user or not GCE.check_password(password, user.salt, user.hash):
         db_login_failure(session, tid, 0)
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 import base64
-import json
 import mimetypes
 import os
 import re
@@ -15,16 +14,19 @@ from twisted.protocols.basic import FileSender
 from globaleaks.event import track_handler
 from globaleaks.orm import transact_sync
 from globaleaks.rest import errors
+from globaleaks.rest.validator import ValidationError, Validators, validate_request
 from globaleaks.sessions import Sessions
 from globaleaks.settings import Settings
 from globaleaks.state import State
 from globaleaks.transactions import db_get_user
 from globaleaks.utils.crypto import GCE
+from globaleaks.utils.fileproducer import MmapFileProducer
 from globaleaks.utils.ip import check_ip
 from globaleaks.utils.log import log
 from globaleaks.utils.pgp import PGPContext
 from globaleaks.utils.securetempfile import SecureTemporaryFile
 from globaleaks.utils.utility import datetime_now
+from globaleaks.utils.zipstream import ZipStreamProducer
 
 mimetypes.add_type('text/javascript', '.js')
 
@@ -39,7 +41,35 @@ def decodeString(string):
     return ''.join(map(chr, uint16_array))
 
 
+def get_file_range(fo):
+    """
+    Return the offset and the size of the data to be served from a file
+
+    :return: A tuple (offset, size) or None for objects not backed by a file
+    """
+    try:
+        offset = fo.tell()
+        size = os.fstat(fo.fileno()).st_size - offset
+    except (AttributeError, OSError, ValueError):
+        return None
+
+    return offset, size
+
+
 def serve_file(request, fo):
+    file_range = get_file_range(fo)
+
+    if file_range is not None and file_range[1] > 0:
+        if request.finished:
+            return
+
+        request.setHeader(b'Content-Length', b'%d' % file_range[1])
+
+        d = MmapFileProducer(request, fo, *file_range).start()
+        d.addBoth(lambda _: fo.close())
+
+        return d
+
     filesender = FileSender()
 
     def on_success(byte):
@@ -99,7 +129,9 @@ class BaseHandler(object):
     check_roles = 'admin'
     handler_exec_time_threshold = 120
     cache_resource = False
+    cache_tags = ()
     invalidate_cache = False
+    invalidate_cache_tags = None
     root_tenant_only = False
     root_tenant_or_management_only = False
     upload_handler = False
@@ -182,41 +214,13 @@ class BaseHandler(object):
 
     @staticmethod
     def validate_type(value, type):
-        retval = False
+        try:
+            Validators.get(type)(value)
+        except ValidationError as e:
+            log.err("-- Invalid value [%s]: %s", value, e)
+            return False
 
-        if value is None:
-            log.err("-- Invalid python_type, in [%s] expected %s", value, type)
-
-        # if it's callable, than assumes is a primitive class
-        elif callable(type):
-            retval = BaseHandler.validate_python_type(value, type)
-            if not retval:
-                log.err("-- Invalid python_type, in [%s] expected %s", value, type)
-
-        # value as "{foo:bar}"
-        elif isinstance(type, dict):
-            retval = BaseHandler.validate_request(value, type)
-            if not retval:
-                log.err("-- Invalid JSON/dict [%s] expected %s", value, type)
-
-        # regexp
-        elif isinstance(type, str):
-            retval = BaseHandler.validate_regexp(value, type)
-            if not retval:
-                log.err("-- Failed Match in regexp [%s] against %s", value, type)
-
-        # value as "[ type ]"
-        elif isinstance(type, list):
-            # empty list is ok
-            if not value:
-                retval = True
-
-            else:
-                retval = all(BaseHandler.validate_type(x, type[0]) for x in value)
-                if not retval:
-                    log.err("-- List validation failed [%s] of %s", value, type)
-
-        return retval
+        return True
 
     @staticmethod
     def validate_request(request, request_template):
@@ -224,67 +228,10 @@ class BaseHandler(object):
         Takes a string that represents a JSON requests and checks to see if it
         conforms to the request type it is supposed to be.
 
-        This request must be either a dict or a list. This function may be called
-        recursively to validate sub-parameters that are also go GLType.
+        The request template is compiled once in a validation function; the
+        keys of the request not defined in the template are stripped.
         """
-        if not isinstance(request, (dict, list)):
-            try:
-                request = json.loads(request)
-            except:
-                raise errors.InputValidationError
-
-        if isinstance(request_template, dict):
-            success_check = 0
-            keys_to_strip = []
-            for key, value in request.items():
-                if key not in request_template:
-                    # strip whatever is not validated
-                    #
-                    # reminder: it's not possible to raise an exception for the
-                    # in case more values are present because it's normal that the
-                    # client will send automatically more data.
-                    #
-                    # e.g. the client will always send 'creation_date' attributes of
-                    #      objects and attributes like this are present generally only
-                    #      from the second request on.
-                    #
-                    keys_to_strip.append(key)
-                    continue
-
-                if not BaseHandler.validate_type(value, request_template[key]):
-                    log.err("Received key %s: type validation fail", key)
-                    raise errors.InputValidationError("Key (%s) type validation failure" % key)
-                success_check += 1
-
-            for key in keys_to_strip:
-                del request[key]
-
-            for key, value in request_template.items():
-                if key not in request:
-                    log.debug("Key %s expected but missing!", key)
-                    log.debug("Received schema %s - Expected %s",
-                              request.keys(), request_template.keys())
-                    raise errors.InputValidationError("Missing key %s" % key)
-
-                if not BaseHandler.validate_type(request[key], value):
-                    log.err("Expected key: %s type validation failure", key)
-                    raise errors.InputValidationError("Key (%s) double validation failure" % key)
-
-                if isinstance(request_template[key], (dict, list)) and request_template[key]:
-                    BaseHandler.validate_request(request[key], request_template[key])
-
-                success_check += 1
-
-            if success_check != len(request_template) * 2:
-                log.err("Success counter double check failure: %d", success_check)
-                raise errors.InputValidationError("Success counter double check failure")
-
-        elif isinstance(request_template, list):
-            if not all(BaseHandler.validate_type(x, request_template[0]) for x in request):
-                raise errors.InputValidationError("Not every element in %s is %s" %
-                                                  (request, request_template[0]))
-
-        return request
+        return validate_request(request, request_template)
 
     def redirect(self, url):
         self.request.setResponseCode(301)
@@ -336,6 +283,17 @@ class BaseHandler(object):
 
         return serve_file(self.request, fp)
 
+    def write_stream_as_download(self, filename, stream, pgp_key=''):
+        if pgp_key:
+            filename += '.pgp'
+            stream = PGPContext(pgp_key).encrypt_stream(stream)
+
+        self.request.setHeader(b'Content-Type', 'application/octet-stream')
+        self.request.setHeader(b'Content-Disposition',
+                               'attachment; filename="%s"' % filename)
+
+        return ZipStreamProducer(self, stream).start()
+
     def process_file_upload(self):
         if b'flowFilename' not in self.request.args:
             return
@@ -2,16 +2,19 @@
 #
 # Handlers dealing with public API exporting main platform configuration/resources
 import copy
+import json
 import os
 
-from sqlalchemy import or_
+from sqlalchemy import bindparam, or_
 
 from globaleaks import models, LANGUAGES_SUPPORTED, LANGUAGES_SUPPORTED_CODES
 from globaleaks.handlers.base import BaseHandler
 from globaleaks.models import get_localized_values
 from globaleaks.models.config import ConfigFactory, ConfigL10NFactory
-from globaleaks.orm import db_get, db_query, transact
+from globaleaks.orm import bakery, db_get, transact_ro
+from globaleaks.rest.cache import QuestionnaireCache
 from globaleaks.state import State
+from globaleaks.utils.crypto import sha256
 
 default_questionnaires = ['default']
 default_questions = ['whistleblower_identity']
@@ -24,8 +27,12 @@ trigger_map = {
 }
 
 
+languages_query = bakery(lambda session: session.query(models.EnabledLanguage.name)
+                                               .filter(models.EnabledLanguage.tid == bindparam('tid')))
+
+
 def db_get_languages(session, tid):
-    return [x[0] for x in db_query(session, models.EnabledLanguage.name, models.EnabledLanguage.tid == tid)]
+    return [x[0] for x in languages_query(session).params(tid=tid)]
 
 
 def serialize_submission_substatus(substatus, language):
@@ -266,25 +273,28 @@ def db_serialize_node(session, tid, language):
         ret[x] = session.query(models.File.id).filter(models.File.tid == tid, models.File.name == x).one_or_none()
 
     if tid != 1:
-        root_tenant_node = ConfigFactory(session, 1)
+        root_tenant_node = ConfigFactory(session, 1).get_vals(['version',
+                                                               'version_db',
+                                                               'latest_version',
+                                                               'default_language',
+                                                               'onionservice',
+                                                               'disable_privacy_badge'])
 
         for varname in ['version', 'version_db', 'latest_version']:
-            ret[varname] = root_tenant_node.get_val(varname)
+            ret[varname] = root_tenant_node[varname]
 
         if language not in languages:
-            language = root_tenant_node.get_val('default_language')
-
-        root_tenant_l10n = ConfigL10NFactory(session, 1)
+            language = root_tenant_node['default_language']
 
         if ret['mode'] != 'default':
-            ret['onionservice'] = ret['subdomain'] + '.' + root_tenant_node.get_val('onionservice')
+            ret['onionservice'] = ret['subdomain'] + '.' + root_tenant_node['onionservice']
 
         if ret['mode'] not in ['default', 'demo']:
-            ret['disable_privacy_badge'] = root_tenant_node.get_val('disable_privacy_badge')
-            ret['footer'] = root_tenant_l10n.get_val('footer', language)
-            ret['whistleblowing_question'] = root_tenant_l10n.get_val('whistleblowing_question', language)
-            ret['whistleblowing_button'] = root_tenant_l10n.get_val('whistleblowing_button', language)
-            ret['disclaimer_text'] = root_tenant_l10n.get_val('disclaimer_text', language)
+            ret['disable_privacy_badge'] = root_tenant_node['disable_privacy_badge']
+            ret.update(ConfigL10NFactory(session, 1).get_vals(['footer',
+                                                               'whistleblowing_question',
+                                                               'whistleblowing_button',
+                                                               'disclaimer_text'], language))
 
             for x in special_files:
                 if not ret[x]:
@@ -489,6 +499,83 @@ def serialize_questionnaire(session, tid, questionnaire, language, serialize_tem
     return get_localized_values(ret, questionnaire, questionnaire.localized_keys, language)
 
 
+def db_get_compiled_questionnaire(session, tid, questionnaire, serialize_templates=False):
+    """
+    Return the compiled version of a questionnaire
+
+    The compiled questionnaire includes the language neutral serialization
+    of the questionnaire and the hash of its steps and is cached until
+    an administrative change invalidates the cache of the tenant.
+
+    :param session: An ORM session
+    :param tid: A tenant ID
+    :param questionnaire: A questionnaire model
+    :param serialize_templates: A boolean to require template serialization
+    :return: A dictionary with the keys questionnaire, hash and microphone
+    """
+    key = (questionnaire.id, serialize_templates)
+
+    entry = QuestionnaireCache.get(tid, key)
+    if entry is not None:
+        return entry
+
+    version = QuestionnaireCache.get_version(tid)
+
+    ret = serialize_questionnaire(session, tid, questionnaire, None, serialize_templates=serialize_templates)
+
+    def has_voice_fields(fields):
+        return any(f['type'] == 'voice' or has_voice_fields(f['children']) for f in fields)
+
+    entry = {
+        'questionnaire': ret,
+        'hash': sha256(json.dumps(ret['steps'], sort_keys=True)).decode(),
+        'microphone': any(has_voice_fields(step['children']) for step in ret['steps'])
+    }
+
+    return QuestionnaireCache.set(tid, key, version, entry)
+
+
+def localize_field(field, language):
+    """
+    Localize a field of a compiled questionnaire
+
+    :param field: The language neutral serialization of the field
+    :param language: The language to be used during the localization
+    :return: The localized field
+    """
+    ret = dict(field)
+
+    ret['attrs'] = {}
+    for name, attr in field['attrs'].items():
+        ret['attrs'][name] = dict(attr)
+        if attr['type'] == 'localized':
+            get_localized_values(ret['attrs'][name], attr, ['value'], language)
+
+    ret['options'] = [get_localized_values(dict(o), o, models.FieldOption.localized_keys, language) for o in field['options']]
+    ret['children'] = [localize_field(f, language) for f in field['children']]
+
+    return get_localized_values(ret, field, models.Field.localized_keys, language)
+
+
+def localize_questionnaire(questionnaire, language):
+    """
+    Localize a compiled questionnaire
+
+    :param questionnaire: The language neutral serialization of the questionnaire
+    :param language: The language to be used during the localization
+    :return: The localized questionnaire
+    """
+    ret = dict(questionnaire)
+
+    ret['steps'] = []
+    for step in questionnaire['steps']:
+        x = dict(step)
+        x['children'] = [localize_field(f, language) for f in step['children']]
+        ret['steps'].append(get_localized_values(x, step, models.Step.localized_keys, language))
+
+    return get_localized_values(ret, questionnaire, models.Questionnaire.localized_keys, language)
+
+
 def serialize_receiver(session, user, language, data=None):
     """
     Serialize a receiver.
@@ -525,16 +612,19 @@ def db_get_questionnaires(session, tid, language, serialize_templates=False):
     :param serialize_templates: A boolean to require template serialization
     :return: A list of contexts descriptors
     """
-    if tid in State.tenants:
-        State.tenants[tid].microphone = False
-
     questionnaires = session.query(models.Questionnaire) \
                             .filter(models.Questionnaire.tid.in_({1, tid}),
                                     or_(models.Context.questionnaire_id == models.Questionnaire.id,
                                         models.Context.additional_questionnaire_id == models.Questionnaire.id),
                                     models.Context.tid == tid)
 
-    return [serialize_questionnaire(session, tid, questionnaire, language, serialize_templates=serialize_templates) for questionnaire in questionnaires]
+    compiled = [db_get_compiled_questionnaire(session, tid, questionnaire, serialize_templates) for questionnaire in questionnaires]
+
+    # Enable voice features if questions of type voice are enabled
+    if tid in State.tenants:
+        State.tenants[tid].microphone = any(x['microphone'] for x in compiled)
+
+    return [localize_questionnaire(x['questionnaire'], language) for x in compiled]
 
 
 def db_get_contexts(session, tid, language):
@@ -569,7 +659,7 @@ def db_get_receivers(session, tid, language):
     return [serialize_receiver(session, receiver, language, data) for receiver in receivers]
 
 
-@transact
+@transact_ro
 def get_public_resources(session, tid, language):
     """
     Transaction that compose the public API
@@ -595,6 +685,7 @@ class PublicResource(BaseHandler):
     """
     check_roles = 'any'
     cache_resource = True
+    cache_tags = ['contexts', 'node', 'questionnaires', 'receivers', 'submission_statuses']
 
     def get(self):
         """
@@ -4,9 +4,9 @@
 import base64
 import json
 
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from sqlalchemy.sql.expression import distinct, func, and_
+from sqlalchemy.sql.expression import distinct, func, and_, or_
 
 from globaleaks import models
 from globaleaks.handlers.base import BaseHandler
@@ -15,73 +15,108 @@ from globaleaks.models import serializers
 from globaleaks.orm import db_get, db_del, db_log, transact
 from globaleaks.rest import requests, errors
 from globaleaks.utils.crypto import GCE
+from globaleaks.utils.utility import datetime_now, decode_cursor, encode_cursor
 
 import globaleaks.handlers.recipient.export
 
+RTIPS_PAGE_SIZE = 100
+RTIPS_MAX_PAGE_SIZE = 500
+RTIPS_SYNC_TOKEN_MARGIN = 5
+SYNC_TOKEN_FORMAT = '%Y%m%d%H%M%S%f'
 
-@transact
-def get_receivertips(session, tid, receiver_id, user_key, language, args={}):
+
+def db_get_receivertips(session, receiver_id, user_key, filters=(), cursor=None, limit=None, summary=False, tip_keys=None):
     """
-    Return list of submissions received by the specified receiver
+    Return the list of submissions received by the specified receiver
+
+    When a limit is specified the list is paginated with keyset pagination
+    on (creation_date, id) so that the cursor stays stable while tips change.
 
     :param session: An ORM session
-    :param tid: The tenant ID
     :param receiver_id: The receiver ID
     :param user_key: The user key to be used for decrypting data
-    :param language: The language to be used during data serialization
-    :return: A list of submissions descriptors
+    :param filters: The filters to be applied on the internaltips
+    :param cursor: The cursor of the last tip of the previous page
+    :param limit: The maximum number of tips to be returned
+    :param summary: A boolean to skip the load and decryption of the answers
+    :param tip_keys: The cache of the tip keys of the user session
+    :return: The list of submissions descriptors and the cursor of the next page
     """
     ret = []
 
-    updated_after = datetime.fromtimestamp(int(args.get(b'updated_after', [b'0'])[0]))
-    updated_before = datetime.fromtimestamp(int(args.get(b'updated_before', [b'32503680000'])[0]))
-
     comments_by_itip = {}
     files_by_itip = {}
 
+    entities = [models.ReceiverTip, models.InternalTip, models.InternalTipData]
+    if not summary:
+        entities.append(models.InternalTipAnswers)
+
+    query = session.query(*entities) \
+                   .join(models.InternalTipData,
+                         and_(models.InternalTipData.internaltip_id == models.InternalTip.id,
+                              models.InternalTipData.key == 'whistleblower_identity'),
+                         isouter=True) \
+                   .filter(models.ReceiverTip.receiver_id == receiver_id,
+                           models.InternalTip.id == models.ReceiverTip.internaltip_id,
+                           *filters)
+
+    if not summary:
+        query = query.filter(models.InternalTipAnswers.internaltip_id == models.ReceiverTip.internaltip_id)
+
+    query = query.group_by(models.ReceiverTip.id)
+
+    if limit is not None:
+        if cursor:
+            date, id = cursor
+            query = query.filter(or_(models.InternalTip.creation_date < date,
+                                     and_(models.InternalTip.creation_date == date,
+                                          models.ReceiverTip.id < id)))
+
+        query = query.order_by(models.InternalTip.creation_date.desc(), models.ReceiverTip.id.desc()).limit(limit)
+
+    results = query.all()
+
+    counts_filters = [models.ReceiverTip.receiver_id == receiver_id,
+                      models.ReceiverTip.internaltip_id == models.InternalTip.id]
+
+    if limit is not None:
+        # Restrict the counts to the tips of the current page
+        counts_filters.append(models.InternalTip.id.in_([result[1].id for result in results]))
+
     # Fetch comments count
     for itip_id, count in session.query(models.InternalTip.id,
                                         func.count(distinct(models.Comment.id))) \
-                                 .filter(models.ReceiverTip.receiver_id == receiver_id,
-                                         models.ReceiverTip.internaltip_id == models.InternalTip.id,
-                                         models.Comment.internaltip_id == models.InternalTip.id,
-                                         models.Comment.visibility == 0) \
+                                 .filter(models.Comment.internaltip_id == models.InternalTip.id,
+                                         models.Comment.visibility == 0,
+                                         *counts_filters) \
                                  .group_by(models.InternalTip.id):
         comments_by_itip[itip_id] = count
 
     # Fetch files count
     for itip_id, count in session.query(models.InternalTip.id,
                                         func.count(distinct(models.InternalFile.id))) \
-                                 .filter(models.ReceiverTip.receiver_id == receiver_id,
-                                         models.ReceiverTip.internaltip_id == models.InternalTip.id,
-                                         models.InternalFile.internaltip_id == models.InternalTip.id) \
+                                 .filter(models.InternalFile.internaltip_id == models.InternalTip.id,
+                                         *counts_filters) \
                                  .group_by(models.InternalTip.id):
         files_by_itip[itip_id] = count
 
-    # Fetch rtip, internaltip and associated questionnaire schema
-    for rtip, itip, answers, data in session.query(models.ReceiverTip,
-                                                   models.InternalTip,
-                                                   models.InternalTipAnswers,
-                                                   models.InternalTipData) \
-                                            .join(models.InternalTipData,
-                                                  and_(models.InternalTipData.internaltip_id == models.InternalTip.id,
-                                                       models.InternalTipData.key == 'whistleblower_identity'),
-                                                  isouter=True) \
-                                            .filter(models.ReceiverTip.receiver_id == receiver_id,
-                                                    models.InternalTip.update_date >= updated_after,
-                                                    models.InternalTip.update_date <= updated_before,
-                                                    models.InternalTip.id == models.ReceiverTip.internaltip_id,
-                                                    models.InternalTipAnswers.internaltip_id == models.ReceiverTip.internaltip_id) \
-                                            .group_by(models.ReceiverTip.id):
-        answers = answers.answers
+    for result in results:
+        rtip, itip, data = result[:3]
+
         label = itip.label
-        if itip.crypto_tip_pub_key:
-            tip_key = GCE.asymmetric_decrypt(user_key, base64.b64decode(rtip.crypto_tip_prv_key))
+        answers = result[3].answers if not summary else None
+
+        if itip.crypto_tip_pub_key and (label or not summary):
+            if tip_keys is not None:
+                tip_key = tip_keys.get(user_key, base64.b64decode(rtip.crypto_tip_prv_key))
+            else:
+                tip_key = GCE.asymmetric_decrypt(user_key, base64.b64decode(rtip.crypto_tip_prv_key))
 
             if label:
                 label = GCE.asymmetric_decrypt(tip_key, base64.b64decode(label.encode())).decode()
 
-            answers = json.loads(GCE.asymmetric_decrypt(tip_key, base64.b64decode(answers.encode())).decode())
+            if not summary:
+                answers = json.loads(GCE.asymmetric_decrypt(tip_key, base64.b64decode(answers.encode())).decode())
 
         if data is None:
             subscription = 0
@@ -90,7 +125,7 @@ def get_receivertips(session, tid, receiver_id, user_key, language, args={}):
         else:
             subscription = 2
 
-        ret.append({
+        tip = {
             'id': rtip.id,
             'itip_id': itip.id,
             'creation_date': itip.creation_date,
@@ -105,14 +140,88 @@ def get_receivertips(session, tid, receiver_id, user_key, language, args={}):
             'updated': rtip.last_access < itip.update_date,
             'context_id': itip.context_id,
             'tor': itip.tor,
-            'answers': answers,
             'score': itip.score,
             'status': itip.status,
             'substatus': itip.substatus,
             'file_count': files_by_itip.get(itip.id, 0),
             'comment_count': comments_by_itip.get(itip.id, 0),
             'subscription': subscription
-        })
+        }
+
+        if not summary:
+            tip['answers'] = answers
+
+        ret.append(tip)
+
+    next_cursor = None
+    if limit is not None and len(results) == limit:
+        next_cursor = (results[-1][1].creation_date, results[-1][0].id)
+
+    return ret, next_cursor
+
+
+@transact
+def get_receivertips(session, tid, receiver_id, user_key, language, args={}, tip_keys=None):
+    """
+    Return list of submissions received by the specified receiver
+
+    :param session: An ORM session
+    :param tid: The tenant ID
+    :param receiver_id: The receiver ID
+    :param user_key: The user key to be used for decrypting data
+    :param language: The language to be used during data serialization
+    :param args: The request arguments
+    :param tip_keys: The cache of the tip keys of the user session
+    :return: A list of submissions descriptors
+    """
+    updated_after = datetime.fromtimestamp(int(args.get(b'updated_after', [b'0'])[0]))
+    updated_before = datetime.fromtimestamp(int(args.get(b'updated_before', [b'32503680000'])[0]))
+
+    filters = [models.InternalTip.update_date >= updated_after,
+               models.InternalTip.update_date <= updated_before]
+
+    return db_get_receivertips(session, receiver_id, user_key, filters, tip_keys=tip_keys)[0]
+
+
+@transact
+def get_receivertips_page(session, tid, receiver_id, user_key, cursor, limit, summary, sync_token, tip_keys=None):
+    """
+    Return a page of the submissions received by the specified receiver
+
+    When a sync token is specified only the submissions updated after the
+    generation of the token are returned together with the ids of all the
+    submissions still accessible so that clients could drop the removed ones.
+
+    :param session: An ORM session
+    :param tid: The tenant ID
+    :param receiver_id: The receiver ID
+    :param user_key: The user key to be used for decrypting data
+    :param cursor: The cursor of the last tip of the previous page
+    :param limit: The maximum number of tips to be returned
+    :param summary: A boolean to skip the load and decryption of the answers
+    :param sync_token: The sync token returned by a previous request
+    :param tip_keys: The cache of the tip keys of the user session
+    :return: A dictionary with the tips, the cursor of the next page and a new sync token
+    """
+    # Updates committed while the list is fetched could carry a date
+    # preceding the new token; the margin make them part of the next delta.
+    new_sync_token = datetime_now() - timedelta(seconds=RTIPS_SYNC_TOKEN_MARGIN)
+
+    filters = []
+    if sync_token:
+        filters.append(models.InternalTip.update_date >= sync_token)
+
+    tips, next_cursor = db_get_receivertips(session, receiver_id, user_key, filters, cursor, limit, summary, tip_keys)
+
+    ret = {
+        'tips': tips,
+        'cursor': encode_cursor(*next_cursor) if next_cursor else None,
+        'sync_token': new_sync_token.strftime(SYNC_TOKEN_FORMAT)
+    }
+
+    if sync_token:
+        ret['ids'] = [x[0] for x in session.query(models.ReceiverTip.id)
+                                           .filter(models.ReceiverTip.receiver_id == receiver_id)]
 
     return ret
 
@@ -155,15 +264,46 @@ class TipsCollection(BaseHandler):
     """
 
     Handler dealing with submissions fetch
+
+    The list could be fetched:
+      - entirely (default);
+      - in pages by specifying the arguments limit and cursor;
+      - without the answers by specifying the argument summary;
+      - limited to the changes since a previous request by specifying the argument sync_token.
     """
     check_roles = 'receiver'
 
     def get(self):
-        return get_receivertips(self.request.tid,
-                                self.session.user_id,
-                                self.session.cc,
-                                self.request.language,
-                                self.request.args)
+        args = self.request.args
+
+        if not any(x in args for x in (b'limit', b'cursor', b'summary', b'sync_token')):
+            return get_receivertips(self.request.tid,
+                                    self.session.user_id,
+                                    self.session.cc,
+                                    self.request.language,
+                                    args,
+                                    self.session.tip_keys)
+
+        try:
+            limit = int(args.get(b'limit', [RTIPS_PAGE_SIZE])[0])
+            summary = args.get(b'summary', [b'false'])[0] in (b'1', b'true')
+            cursor = args.get(b'cursor', [b''])[0].decode()
+            cursor = decode_cursor(cursor) if cursor else None
+            sync_token = args.get(b'sync_token', [b''])[0].decode()
+            sync_token = datetime.strptime(sync_token, SYNC_TOKEN_FORMAT) if sync_token else None
+        except (ValueError, UnicodeDecodeError):
+            raise errors.InputValidationError("Invalid tips cursor")
+
+        limit = min(max(limit, 1), RTIPS_MAX_PAGE_SIZE)
+
+        return get_receivertips_page(self.request.tid,
+                                     self.session.user_id,
+                                     self.session.cc,
+                                     cursor,
+                                     limit,
+                                     summary,
+                                     sync_token,
+                                     self.session.tip_keys)
 
 
 class Operations(BaseHandler):
@@ -21,7 +21,6 @@ from globaleaks.rest import errors
 from globaleaks.settings import Settings
 from globaleaks.utils.crypto import Base64Encoder, GCE
 from globaleaks.utils.fs import directory_traversal_check
-from globaleaks.utils.securetempfile import SecureTemporaryFile
 from globaleaks.utils.templating import Templating
 from globaleaks.utils.utility import datetime_now, datetime_null, msdos_encode
 from globaleaks.utils.zipstream import ZipStream
@@ -67,11 +66,16 @@ def get_tip_export(session, tid, user_id, rtip_id, language):
 
 
 @inlineCallbacks
-def prepare_tip_export(cc, tip_export):
+def prepare_tip_export(cc, tip_export, tip_keys=None):
     files = tip_export['tip']['wbfiles'] + tip_export['tip']['rfiles']
 
     if tip_export['crypto_tip_prv_key']:
-        tip_export['tip'] = yield deferToThread(decrypt_tip, cc, tip_export['crypto_tip_prv_key'], tip_export['tip'])
+        tip_export['tip'] = yield deferToThread(decrypt_tip, cc, tip_export['crypto_tip_prv_key'], tip_export['tip'], tip_keys)
+
+        if tip_keys is not None:
+            tip_prv_key = tip_keys.get(cc, tip_export['crypto_tip_prv_key'])
+        else:
+            tip_prv_key = GCE.asymmetric_decrypt(cc, tip_export['crypto_tip_prv_key'])
 
         for file_dict in tip_export['tip']['wbfiles']:
             if file_dict.get('status', '') == 'encrypted':
@@ -80,7 +84,7 @@ def prepare_tip_export(cc, tip_export):
             if tip_export['deprecated_crypto_files_prv_key']:
                 files_prv_key = GCE.asymmetric_decrypt(cc, tip_export['deprecated_crypto_files_prv_key'])
             else:
-                files_prv_key = GCE.asymmetric_decrypt(cc, tip_export['crypto_tip_prv_key'])
+                files_prv_key = tip_prv_key
 
             filelocation = os.path.join(Settings.attachments_path, file_dict['id'])
             if not os.path.exists(filelocation):
@@ -95,7 +99,6 @@ def prepare_tip_export(cc, tip_export):
             if file_dict.get('status', '') == 'encrypted':
                 continue
 
-            tip_prv_key = GCE.asymmetric_decrypt(cc, tip_export['crypto_tip_prv_key'])
             filelocation = os.path.join(Settings.attachments_path, file_dict['name'])
             directory_traversal_check(Settings.attachments_path, filelocation)
             file_dict['key'] = tip_prv_key
@@ -133,16 +136,6 @@ class ExportHandler(BaseHandler):
 
         filename = "report-" + str(tip_export["tip"]["progressive"]) + ".zip"
 
-        files = yield prepare_tip_export(self.session.cc, tip_export)
-
-        zipstream = ZipStream(files)
-
-        stf = SecureTemporaryFile(self.state.settings.tmp_path)
-
-        with stf.open('w') as f:
-            for x in zipstream:
-                f.write(x)
-            f.finalize_write()
+        files = yield prepare_tip_export(self.session.cc, tip_export, self.session.tip_keys)
 
-        with stf.open('r') as f:
-            yield self.write_file_as_download(filename, f, pgp_key)
+        yield self.write_stream_as_download(filename, ZipStream(files), pgp_key)
@@ -7,6 +7,8 @@ import time
 
 from datetime import datetime, timedelta
 
+from sqlalchemy import bindparam
+
 from twisted.internet.threads import deferToThread
 from twisted.internet.defer import inlineCallbacks, returnValue
 
@@ -19,7 +21,7 @@ from globaleaks.handlers.operation import OperationHandler
 from globaleaks.handlers.whistleblower.submission import db_create_receivertip, decrypt_tip
 from globaleaks.handlers.user import user_serialize_user
 from globaleaks.models import serializers, Context
-from globaleaks.orm import db_get, db_del, db_log, transact, tw
+from globaleaks.orm import bakery, db_get, db_del, db_log, transact, tw
 from globaleaks.rest import errors, requests
 from globaleaks.state import State
 from globaleaks.utils.crypto import GCE
@@ -221,6 +223,14 @@ def update_tip_submission_status(session, tid, user_id, rtip_id, status_id, subs
     db_update_submission_status(session, tid, user_id, itip, status_id, substatus_id)
 
 
+rtip_access_query = bakery(lambda session: session.query(models.User, models.ReceiverTip, models.InternalTip)
+                                                .filter(models.User.id == bindparam('user_id'),
+                                                        models.ReceiverTip.id == bindparam('rtip_id'),
+                                                        models.ReceiverTip.receiver_id == models.User.id,
+                                                        models.ReceiverTip.internaltip_id == models.InternalTip.id,
+                                                        models.InternalTip.tid == bindparam('tid')))
+
+
 def db_access_rtip(session, tid, user_id, rtip_id):
     """
     Transaction retrieving an rtip and performing basic access checks
@@ -231,13 +241,7 @@ def db_access_rtip(session, tid, user_id, rtip_id):
     :param rtip_id: the requested rtip ID
     :return: A model requested
     """
-    return db_get(session,
-                  (models.User, models.ReceiverTip, models.InternalTip),
-                  (models.User.id == user_id,
-                   models.ReceiverTip.id == rtip_id,
-                   models.ReceiverTip.receiver_id == models.User.id,
-                   models.ReceiverTip.internaltip_id == models.InternalTip.id,
-                   models.InternalTip.tid == tid))
+    return rtip_access_query(session).params(tid=tid, user_id=user_id, rtip_id=rtip_id).one()
 
 
 def db_access_rfile(session, tid, user_id, rfile_id):
@@ -619,7 +623,7 @@ class RTipInstance(OperationHandler):
         tip, crypto_tip_prv_key = yield get_rtip(self.request.tid, self.session.user_id, tip_id, self.request.language)
 
         if State.tenants[self.request.tid].cache.encryption and crypto_tip_prv_key:
-            tip = yield deferToThread(decrypt_tip, self.session.cc, crypto_tip_prv_key, tip)
+            tip = yield deferToThread(decrypt_tip, self.session.cc, crypto_tip_prv_key, tip, self.session.tip_keys)
 
         returnValue(tip)
 
@@ -721,7 +725,7 @@ class WhistleblowerFileDownload(BaseHandler):
         self.check_file_presence(filelocation)
 
         if tip_prv_key:
-            tip_prv_key = GCE.asymmetric_decrypt(self.session.cc, base64.b64decode(tip_prv_key))
+            tip_prv_key = self.session.tip_keys.get(self.session.cc, base64.b64decode(tip_prv_key))
             name = GCE.asymmetric_decrypt(tip_prv_key, base64.b64decode(name.encode())).decode()
 
             try:
@@ -786,7 +790,7 @@ class ReceiverFileDownload(BaseHandler):
         self.check_file_presence(filelocation)
 
         if tip_prv_key:
-            tip_prv_key = GCE.asymmetric_decrypt(self.session.cc, tip_prv_key)
+            tip_prv_key = self.session.tip_keys.get(self.session.cc, tip_prv_key)
             name = GCE.asymmetric_decrypt(tip_prv_key, base64.b64decode(name.encode())).decode()
             filelocation = GCE.streaming_encryption_open('DECRYPT', tip_prv_key, filelocation)
 
@@ -1,11 +1,131 @@
 # -*- coding: utf-8 -*-
 #
 # Handler exposing application files
+import mimetypes
 import os
+import re
+
+from threading import Lock
 
 from globaleaks.handlers.base import BaseHandler
+from globaleaks.rest import errors
+from globaleaks.rest.compression import accepts_encoding
+from globaleaks.utils.backup import file_sha256
+from globaleaks.utils.crypto import sha256
 from globaleaks.utils.fs import directory_traversal_check
 
+# The assets produced by the build have the hash of their content in the name
+FINGERPRINT_RE = re.compile(r'\.[0-9a-f]{16,}\.\w+$')
+
+
+class StaticFile(object):
+    __slots__ = ('path', 'size', 'mtime', 'mimetype', 'etag', 'data', 'immutable')
+
+    def __init__(self, path, max_memory_file_size):
+        st = os.stat(path)
+
+        self.path = path
+        self.size = st.st_size
+        self.mtime = st.st_mtime_ns
+        self.mimetype, _ = mimetypes.guess_type(path[:-3] if path.endswith(('.br', '.gz')) else path)
+
+        if self.size <= max_memory_file_size:
+            with open(path, 'rb') as f:
+                self.data = f.read()
+
+            checksum = sha256(self.data)
+        else:
+            # The large files are hashed in chunks and read from disk when served
+            self.data = None
+            checksum = file_sha256(path).encode()
+
+        self.etag = b'"' + checksum + b'"'
+        self.immutable = FINGERPRINT_RE.search(path) is not None
+
+
+class _StaticFiles(object):
+    """
+    Index of the files of the client build
+
+    The index holds the content hashes used as ETags, the mimetypes and the
+    sizes of the files and keeps in memory the content of the small ones.
+    In devel mode the files are checked at each request and indexed again
+    when changed on disk.
+    """
+    max_memory_file_size = 256 * 1024
+
+    def __init__(self):
+        self.indexes = {}
+        self.lock = Lock()
+
+    def load(self, root):
+        root = os.path.abspath(root)
+        index = {}
+
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if os.path.isfile(path):
+                    index[os.path.relpath(path, root)] = StaticFile(path, self.max_memory_file_size)
+
+        with self.lock:
+            self.indexes[root] = index
+
+        return index
+
+    def get(self, root, filename, refresh=False):
+        """
+        Return the entry of a file of the client build
+
+        :param root: The directory of the client build
+        :param filename: The path of the file relative to the root
+        :param refresh: Check if the file changed on disk
+        :return: The entry of the file or None if the file does not exist
+        """
+        root = os.path.abspath(root)
+
+        index = self.indexes.get(root)
+        if index is None:
+            index = self.load(root)
+
+        path = os.path.abspath(os.path.join(root, filename))
+        directory_traversal_check(root, path)
+
+        filename = os.path.relpath(path, root)
+        entry = index.get(filename)
+        if not refresh:
+            return entry
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            index.pop(filename, None)
+            return None
+
+        if entry is None or entry.mtime != st.st_mtime_ns or entry.size != st.st_size:
+            if not os.path.isfile(path):
+                return None
+
+            entry = index[filename] = StaticFile(path, self.max_memory_file_size)
+
+        return entry
+
+    def clear(self):
+        with self.lock:
+            self.indexes.clear()
+
+    def stats(self):
+        with self.lock:
+            indexes = list(self.indexes.values())
+
+        return {
+            'files': sum(len(index) for index in indexes),
+            'size': sum(len(entry.data) for index in indexes for entry in index.values() if entry.data is not None)
+        }
+
+
+StaticFiles = _StaticFiles()
+
 
 class StaticFileHandler(BaseHandler):
     check_roles = 'any'
@@ -14,6 +134,10 @@ class StaticFileHandler(BaseHandler):
         'text/html',
         'text/javascript'
     ]
+    precompressed_variants = [
+        (b'br', '.br'),
+        (b'gzip', '.gz')
+    ]
 
     def __init__(self, state, request):
         BaseHandler.__init__(self, state, request)
@@ -24,9 +148,6 @@ class StaticFileHandler(BaseHandler):
         if not filename:
             filename = 'index.html'
 
-        abspath = os.path.abspath(os.path.join(self.root, filename))
-        directory_traversal_check(self.root, abspath)
-
         if not self.state.settings.disable_csp:
             if filename == 'index.html':
                 self.request.setHeader(b'Content-Security-Policy',
@@ -42,4 +163,47 @@ class StaticFileHandler(BaseHandler):
                                        b"script-src 'self' 'sha256-l4srTx31TC+tE2K4jVVCnC9XfHivkiSs/v+DPWccDDM=';"
                                        b"style-src 'self' 'sha256-pru43GdcNLwb4MwzOriCI9/9cKBzE5xeoLWHlKai1As=';")
 
-        return self.write_file(filename, abspath)
+        return self.write_static_file(filename)
+
+    def write_static_file(self, filename):
+        entry = StaticFiles.get(self.root, filename, self.state.settings.devel_mode)
+        if entry is None:
+            raise errors.ResourceNotFound
+
+        self.request.setHeader(b'Vary', b'Accept-Encoding')
+
+        # Serve the precompressed variants of the client build when available
+        for encoding, extension in self.precompressed_variants:
+            if accepts_encoding(self.request, encoding):
+                variant = StaticFiles.get(self.root, filename + extension, self.state.settings.devel_mode)
+                if variant is not None:
+                    self.request.setHeader(b'Content-Encoding', encoding)
+                    self.request.precompressed = True
+                    entry = variant
+                    break
+
+        # The client files are the same for every installation and do not
+        # include any user data; they are revalidated by means of their ETag
+        # and the fingerprinted assets never change.
+        if entry.immutable:
+            self.request.setHeader(b'Cache-control', b'public, max-age=31536000, immutable')
+        else:
+            self.request.setHeader(b'Cache-control', b'no-cache')
+
+        self.request.setHeader(b'ETag', entry.etag)
+
+        if_none_match = b','.join(self.request.requestHeaders.getRawHeaders(b'if-none-match', []))
+        if entry.etag in [x.strip() for x in if_none_match.split(b',')]:
+            self.request.setResponseCode(304)
+            self.request.precompressed = True
+            return
+
+        if entry.data is None:
+            return self.write_file(filename, entry.path)
+
+        mimetype = entry.mimetype
+        if mimetype not in self.allowed_mimetypes:
+            mimetype = 'application/octet-stream'
+
+        self.request.setHeader(b'Content-Type', mimetype)
+        self.request.write(entry.data)
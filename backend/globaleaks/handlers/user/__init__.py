@@ -182,6 +182,7 @@ class UserInstance(BaseHandler):
     """
     check_roles = 'user'
     invalidate_cache = True
+    invalidate_cache_tags = ['contexts', 'receivers']
 
     def get(self):
         return get_user(self.session.user_tid,
@@ -5,8 +5,8 @@ import base64
 import json
 
 from globaleaks import models
-from globaleaks.handlers.admin.questionnaire import db_get_questionnaire
 from globaleaks.handlers.base import BaseHandler
+from globaleaks.handlers.public import db_get_compiled_questionnaire
 from globaleaks.orm import db_get, db_log, transact
 from globaleaks.rest import errors, requests
 from globaleaks.state import State
@@ -15,8 +15,11 @@ from globaleaks.utils.json import JSONEncoder
 from globaleaks.utils.utility import get_expiration, datetime_null
 
 
-def decrypt_tip(user_key, tip_prv_key, tip):
-    tip_key = GCE.asymmetric_decrypt(user_key, tip_prv_key)
+def decrypt_tip(user_key, tip_prv_key, tip, tip_keys=None):
+    if tip_keys is not None:
+        tip_key = tip_keys.get(user_key, tip_prv_key)
+    else:
+        tip_key = GCE.asymmetric_decrypt(user_key, tip_prv_key)
 
     if 'label' in tip and tip['label']:
         tip['label'] = GCE.asymmetric_decrypt(tip_key, base64.b64decode(tip['label'].encode())).decode()
@@ -107,8 +110,10 @@ def db_assign_submission_progressive(session, tid):
     return counter.value
 
 
-def db_archive_questionnaire_schema(session, questionnaire):
-    hash = sha256(json.dumps(questionnaire, sort_keys=True)).decode("utf-8")
+def db_archive_questionnaire_schema(session, questionnaire, hash=None):
+    if hash is None:
+        hash = sha256(json.dumps(questionnaire, sort_keys=True)).decode("utf-8")
+
     if session.query(models.ArchivedSchema).filter(models.ArchivedSchema.hash == hash).count():
         return hash
 
@@ -143,8 +148,9 @@ def db_create_submission(session, tid, request, user_session, client_using_tor,
                                      models.Questionnaire.id == models.Context.questionnaire_id))
 
     answers = request['answers']
-    steps = db_get_questionnaire(session, tid, questionnaire.id, None, True)['steps']
-    questionnaire_hash = db_archive_questionnaire_schema(session, steps)
+    compiled = db_get_compiled_questionnaire(session, tid, questionnaire, True)
+    steps = compiled['questionnaire']['steps']
+    questionnaire_hash = db_archive_questionnaire_schema(session, steps, compiled['hash'])
 
     crypto_tip_pub_key = ''
 
@@ -1,12 +1,13 @@
 # -*- coding: utf-8
 # Implementation of the daily operations.
-import os
-from datetime import datetime, timedelta
+import time
+from datetime import timedelta
 
 from sqlalchemy import not_
 from sqlalchemy.sql.expression import func
 
 from twisted.internet.defer import inlineCallbacks
+from twisted.internet.threads import deferToThread
 
 from globaleaks import models
 from globaleaks.db import compact_db, db_get_tracked_attachments, db_get_tracked_files, db_refresh_tenant_cache
@@ -15,9 +16,9 @@ from globaleaks.handlers.admin.notification import db_get_notification
 from globaleaks.handlers.user import user_serialize_user
 from globaleaks.jobs.job import DailyJob
 from globaleaks.orm import db_del, db_log, db_query, transact, tw
-from globaleaks.utils.fs import srm
+from globaleaks.utils.fs import scan_untracked_files, SecureDeletionQueue
 from globaleaks.utils.templating import Templating
-from globaleaks.utils.utility import datetime_now, is_expired
+from globaleaks.utils.utility import datetime_now
 
 
 __all__ = ['Cleaning']
@@ -98,31 +99,17 @@ class Cleaning(DailyJob):
                                                        .subquery()
         db_del(session, models.Tenant, models.Tenant.id.in_(subquery))
 
-    def perform_secure_deletion_of_files(self, path, valid_files):
-        # Delete the customization files not associated to the database
-        for f in os.listdir(path):
-            if f in valid_files:
-                continue
-
-            filepath = os.path.join(path, f)
-            timestamp = datetime.fromtimestamp(os.path.getmtime(filepath))
-            if is_expired(timestamp, days=1):
-                srm(filepath)
+    def perform_secure_deletion_of_files(self, path, valid_files, days=1):
+        # Delete the files not associated to the database if older than the specified days
+        for filepath in scan_untracked_files(path, valid_files, time.time() - days * 86400):
+            SecureDeletionQueue.put(filepath)
 
     def perform_secure_deletion_of_temporary_files(self):
         # Delete the outdated temp files if older than 1 day
-        for f in os.listdir(self.state.settings.tmp_path):
-            path = os.path.join(self.state.settings.tmp_path, f)
-            timestamp = datetime.fromtimestamp(os.path.getmtime(path))
-            if is_expired(timestamp, days=1):
-                srm(path)
+        self.perform_secure_deletion_of_files(self.state.settings.tmp_path, set())
 
         # Delete the outdated ramdisk tokens older than 1 week
-        for f in os.listdir(self.state.settings.ramdisk_path):
-            path = os.path.join(self.state.settings.ramdisk_path, f)
-            timestamp = datetime.fromtimestamp(os.path.getmtime(path))
-            if is_expired(timestamp, days=7):
-                srm(path)
+        self.perform_secure_deletion_of_files(self.state.settings.ramdisk_path, set(), 7)
 
     @transact
     def delete_expired_demo_platforms(self, session):
@@ -146,12 +133,15 @@ class Cleaning(DailyJob):
         for tid in self.state.tenants:
             yield tw(self.db_check_for_expiring_submissions, tid)
 
+        # The directories are scanned and the files deleted off the reactor thread
         valid_files = yield tw(db_get_tracked_files)
-        self.perform_secure_deletion_of_files(self.state.settings.files_path, valid_files)
+        yield deferToThread(self.perform_secure_deletion_of_files, self.state.settings.files_path, valid_files)
 
         valid_files = yield tw(db_get_tracked_attachments)
-        self.perform_secure_deletion_of_files(self.state.settings.attachments_path, valid_files)
+        yield deferToThread(self.perform_secure_deletion_of_files, self.state.settings.attachments_path, valid_files)
+
+        yield deferToThread(self.perform_secure_deletion_of_temporary_files)
 
-        self.perform_secure_deletion_of_temporary_files()
+        yield deferToThread(SecureDeletionQueue.join)
 
         compact_db()
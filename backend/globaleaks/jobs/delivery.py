@@ -1,8 +1,14 @@
 # -*- coding: utf-8 -*-
 import os
+import queue
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
 
 from twisted.internet import abstract
 from twisted.internet.defer import inlineCallbacks
+from twisted.internet.threads import deferToThread
 
 from globaleaks import models
 from globaleaks.jobs.job import LoopingJob
@@ -11,14 +17,13 @@ from globaleaks.settings import Settings
 from globaleaks.utils.crypto import GCE
 from globaleaks.utils.log import log
 from globaleaks.utils.pgp import PGPContext
-from globaleaks.utils.utility import uuid4
 
 
 __all__ = ['Delivery']
 
 
 @transact
-def file_delivery(session):
+def file_delivery(session, limit=20):
     """
     This function roll over the InternalFile uploaded, extract a path, id and
     receivers associated, one entry for each combination. representing the
@@ -31,7 +36,7 @@ def file_delivery(session):
                               .filter(models.InternalFile.new.is_(True),
                                       models.InternalTip.id == models.InternalFile.internaltip_id) \
                               .order_by(models.InternalFile.creation_date) \
-                              .limit(20):
+                              .limit(limit):
         ifile.new = False
         src = ifile.id
 
@@ -65,7 +70,7 @@ def file_delivery(session):
                                .filter(models.ReceiverFile.new.is_(True),
                                        models.ReceiverFile.internaltip_id == models.InternalTip.id) \
                                .order_by(models.ReceiverFile.creation_date) \
-                               .limit(20):
+                               .limit(limit):
         rfile.new = False
         src = rfile.id
 
@@ -80,84 +85,248 @@ def file_delivery(session):
     return receiverfiles_maps, whistleblowerfiles_maps
 
 
-def write_plaintext_file(sf, dest_path):
-    try:
-        with sf.open('rb') as encrypted_file, open(dest_path, "a+b") as plaintext_file:
-            chunk = encrypted_file.read(abstract.FileDescriptor.bufferSize)
-            while chunk:
+def write_file(target, chunks):
+    """
+    Write the plaintext chunks of a file to one of its destinations
+
+    :param target: A descriptor of the destination of the file
+    :param chunks: An iterable of plaintext chunks
+    """
+    if target['key']:
+        with GCE.streaming_encryption_open('ENCRYPT', target['key'], target['dst']) as seo:
+            for chunk in chunks:
+                seo.encrypt_chunk(chunk, 0)
+
+            seo.encrypt_chunk(b'', 1)
+    elif target.get('pgp_key_public'):
+        with PGPContext(target['pgp_key_public']).open_encrypted_file(target['dst']) as pgp_file:
+            for chunk in chunks:
+                pgp_file.write(chunk)
+    else:
+        with open(target['dst'], 'wb') as plaintext_file:
+            for chunk in chunks:
                 plaintext_file.write(chunk)
-                chunk = encrypted_file.read(abstract.FileDescriptor.bufferSize)
 
-    except Exception as excep:
-        log.err("Unable to create plaintext file %s: %s", dest_path, excep)
 
+class FileWriter(threading.Thread):
+    """
+    Thread writing a destination of a file consuming
+    the plaintext chunks from a bounded queue
+    """
+    queue_size = 16
+
+    def __init__(self, target):
+        threading.Thread.__init__(self, name='delivery-writer', daemon=True)
+        self.target = target
+        self.queue = queue.Queue(self.queue_size)
+        self.finished = False
+        self.error = None
+
+    def chunks(self):
+        while True:
+            chunk = self.queue.get()
+            if chunk is None:
+                self.finished = True
+                return
+
+            yield chunk
+
+    def run(self):
+        try:
+            write_file(self.target, self.chunks())
+        except Exception as excep:
+            self.error = excep
+
+            # Keep consuming the queue so that the reader is never blocked
+            while not self.finished and self.queue.get() is not None:
+                pass
+
+
+def deliver_file(sf, targets, progress):
+    """
+    Decrypt a temporary file once fanning out its plaintext
+    to the writers of all its destinations
+
+    :param sf: The temporary file to be delivered
+    :param targets: The descriptors of the destinations of the file
+    :param progress: The progress record of the file
+    :return: The list of the failed targets and their errors
+    """
+    writers = [FileWriter(target) for target in targets]
+    for writer in writers:
+        writer.start()
 
-def write_encrypted_file(key, sf, dest_path):
     try:
-        with sf.open('rb') as encrypted_file, \
-             GCE.streaming_encryption_open('ENCRYPT', key, dest_path) as seo:
-            chunk = encrypted_file.read(abstract.FileDescriptor.bufferSize)
+        with sf.open('rb') as plaintext_file:
+            chunk = plaintext_file.read(abstract.FileDescriptor.bufferSize)
             while chunk:
-                seo.encrypt_chunk(chunk, 0)
-                chunk = encrypted_file.read(abstract.FileDescriptor.bufferSize)
+                for writer in writers:
+                    writer.queue.put(chunk)
 
-            seo.encrypt_chunk(b'', 1)
+                progress['read'] += len(chunk)
+                chunk = plaintext_file.read(abstract.FileDescriptor.bufferSize)
     except Exception as excep:
-        log.err("Unable to create plaintext file %s: %s", dest_path, excep)
+        error = excep
+    else:
+        error = None
+    finally:
+        for writer in writers:
+            writer.queue.put(None)
 
+        for writer in writers:
+            writer.join()
 
-def process_receiverfiles(state, files_maps):
-    """
-    Function that process uploaded receiverfiles
+    if error is not None:
+        return [(writer.target, error) for writer in writers]
 
-    :param state: A reference to the application state
-    :param files_maps: descriptors of whistleblower files to be processed
-    """
-    for a, m in files_maps.items():
-        sf = state.get_tmp_file_by_name(m['src'])
-
-        for rcounter, rf in enumerate(m['wbfiles']):
-            try:
-                if m['key']:
-                    write_encrypted_file(m['key'], sf, rf['dst'])
-                elif rf['pgp_key_public']:
-                    with sf.open('rb') as encrypted_file:
-                        PGPContext(rf['pgp_key_public']).encrypt_file(encrypted_file, rf['dst'])
-                else:
-                    write_plaintext_file(sf, rf['dst'])
-            except:
-                pass
+    return [(writer.target, writer.error) for writer in writers if writer.error is not None]
 
 
-def process_whistleblowerfiles(state, files_maps):
+class _DeliveryPool(object):
     """
-    Function that process uploaded whistleblowerfiles
+    Pool of workers delivering the uploaded files to their destinations
 
-    :param state: A reference to the application state
-    :param files_maps: descriptors of whistleblower files to be processed
+    Each file is delivered by a worker of the pool; the destinations of the
+    file are written in parallel and those failed are retried before the
+    file is accounted as failed.
     """
-    for _, m in files_maps.items():
+    max_attempts = 3
+    retry_delay = 1
+
+    def __init__(self, size=0):
+        self.size = size or min(4, os.cpu_count() or 1)
+        self.executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix='delivery')
+        self.lock = threading.Lock()
+        self.progress = {}
+        self.delivered = 0
+        self.failed = 0
+        self.retries = 0
+        self.errors = 0
+        self.bytes = 0
+
+    def _deliver(self, file_id, sf, targets):
+        # Destinations written to the same path are written only once
+        targets = list({target['dst']: target for target in targets}.values())
+
+        progress = {
+            'size': sf.size if sf is not None else 0,
+            'read': 0,
+            'targets': len(targets),
+            'attempts': 0
+        }
+
+        with self.lock:
+            self.progress[file_id] = progress
+
         try:
-            sf = state.get_tmp_file_by_name(m['src'])
+            for attempt in range(1, self.max_attempts + 1):
+                progress['attempts'] = attempt
+                progress['read'] = 0
+
+                if sf is None:
+                    failed = [(target, 'temporary file not found') for target in targets]
+                else:
+                    failed = deliver_file(sf, targets, progress)
+
+                for target, error in failed:
+                    log.err("Unable to deliver file %s to %s (attempt %d): %s",
+                            file_id, target['dst'], attempt, error)
+
+                    try:
+                        os.remove(target['dst'])
+                    except OSError:
+                        pass
+
+                with self.lock:
+                    self.errors += len(failed)
+                    self.bytes += progress['read'] * (len(targets) - len(failed))
+
+                if not failed or sf is None:
+                    break
+
+                targets = [target for target, _ in failed]
+
+                if attempt < self.max_attempts:
+                    with self.lock:
+                        self.retries += 1
+
+                    time.sleep(self.retry_delay * attempt)
+
+            with self.lock:
+                if failed:
+                    self.failed += 1
+                else:
+                    self.delivered += 1
+        finally:
+            with self.lock:
+                self.progress.pop(file_id, None)
+
+    def deliver(self, files):
+        """
+        Deliver a batch of files waiting for its completion
+
+        :param files: A list of tuples (file_id, temporary file, targets)
+        """
+        for future in [self.executor.submit(self._deliver, *f) for f in files]:
+            future.result()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'size': self.size,
+                'delivered': self.delivered,
+                'failed': self.failed,
+                'retries': self.retries,
+                'errors': self.errors,
+                'bytes': self.bytes,
+                'in_progress': {k: dict(v) for k, v in self.progress.items()}
+            }
+
 
-            if m['key']:
-                write_encrypted_file(m['key'], sf, m['dst'])
-            else:
-                write_plaintext_file(sf, m['dst'])
-        except:
-            pass
+DeliveryPool = _DeliveryPool()
 
 
 class Delivery(LoopingJob):
     interval = 5
     monitor_interval = 180
 
+    # The number of files processed at every run adapts to the time
+    # taken by the previous runs within the following bounds
+    batch_size = 20
+    min_batch_size = 5
+    max_batch_size = 200
+
+    def adapt_batch_size(self, count, elapsed):
+        if count >= self.batch_size and elapsed < self.interval:
+            self.batch_size = min(self.batch_size * 2, self.max_batch_size)
+        elif elapsed > self.interval * 4:
+            self.batch_size = max(self.batch_size // 2, self.min_batch_size)
+
     @inlineCallbacks
     def operation(self):
         """
         This function creates receiver files
         """
-        receiverfiles_maps, whistleblowerfiles_maps = yield file_delivery()
+        start = time.monotonic()
+
+        receiverfiles_maps, whistleblowerfiles_maps = yield file_delivery(self.batch_size)
+
+        files = []
+
+        for file_id, m in receiverfiles_maps.items():
+            files.append((file_id,
+                          self.state.get_tmp_file_by_name(m['src']),
+                          [{'key': m['key'],
+                            'dst': rf['dst'],
+                            'pgp_key_public': rf['pgp_key_public']} for rf in m['wbfiles']]))
+
+        for file_id, m in whistleblowerfiles_maps.items():
+            files.append((file_id,
+                          self.state.get_tmp_file_by_name(m['src']),
+                          [{'key': m['key'], 'dst': m['dst']}]))
+
+        if files:
+            yield deferToThread(DeliveryPool.deliver, files)
 
-        process_receiverfiles(self.state, receiverfiles_maps)
-        process_whistleblowerfiles(self.state, whistleblowerfiles_maps)
+        self.adapt_batch_size(max(len(receiverfiles_maps), len(whistleblowerfiles_maps)),
+                              time.monotonic() - start)
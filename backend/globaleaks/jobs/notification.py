@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 # Implement the notification of new submissions
 import itertools
+import time
 
+from collections import defaultdict
 from datetime import timedelta
 
 from sqlalchemy import or_
@@ -102,6 +104,8 @@ class MailGenerator(object):
                                     models.WhistleblowerFile.new.is_(True)) \
                           .order_by(models.InternalFile.creation_date)
 
+        notifications = defaultdict(list)
+
         for user, rtip, itip, obj in itertools.chain(results1, results2, results3):
             tid = user.tid
 
@@ -116,18 +120,42 @@ class MailGenerator(object):
 
             rtips_ids[rtip.id] = True
 
-            try:
-                if isinstance(obj, models.ReceiverTip):
-                    data = {'type': 'tip'}
-                else:
-                    data = {'type': 'tip_update'}
-
-                data['user'] = user_serialize_user(session, user, user.language)
-                data['tip'] = serializers.serialize_rtip(session, itip, rtip, user.language)
+            notifications[user.language].append((user, rtip, itip, obj))
 
-                self.process_mail_creation(session, tid, data)
-            except:
-                pass
+        # Tips are serialized in bulk for each language so that the number
+        # of queries does not depend on the number of notifications
+        for language, entries in notifications.items():
+            try:
+                tips = serializers.serialize_rtips(session, [(itip, rtip) for _, rtip, itip, _ in entries], language)
+            except Exception as e:
+                # Fall back to the serialization of the single tips so that
+                # only the tips that cannot be serialized are skipped
+                log.err("Unable to serialize the tips to be notified in %s: %s", language, e)
+
+                tips = []
+                for _, rtip, itip, _ in entries:
+                    try:
+                        tips.append(serializers.serialize_rtip(session, itip, rtip, language))
+                    except Exception as e:
+                        log.err("Unable to serialize the tip %s to be notified: %s", rtip.id, e)
+                        tips.append(None)
+
+            for (user, rtip, itip, obj), tip in zip(entries, tips):
+                if tip is None:
+                    continue
+
+                try:
+                    if isinstance(obj, models.ReceiverTip):
+                        data = {'type': 'tip'}
+                    else:
+                        data = {'type': 'tip_update'}
+
+                    data['user'] = user_serialize_user(session, user, user.language)
+                    data['tip'] = tip
+
+                    self.process_mail_creation(session, user.tid, data)
+                except:
+                    pass
 
         for user in session.query(models.User).filter(models.User.reminder_date < now - timedelta(reminder_time),
                                                       models.User.id == models.ReceiverTip.receiver_id,
@@ -194,19 +222,52 @@ class Notification(LoopingJob):
     interval = 10
     monitor_interval = 3 * 60
     next_daily_run = datetime_now()
+    last_spool = {}
 
     def generate_emails(self):
         return MailGenerator(self.state).generate()
 
     @defer.inlineCallbacks
-    def spool_emails(self):
-        mails = yield get_mails_from_the_pool()
-        for mail in mails:
+    def spool_email(self, mail):
+        """
+        Send a mail retrying with exponential backoff in case of failure
+
+        :return: A deferred resolving to True if the mail is sent
+        """
+        for attempt in range(self.state.settings.mail_attempts_limit):
+            if attempt:
+                yield deferred_sleep(2 ** (attempt - 1))
+
             sent = yield self.state.sendmail(mail['tid'], mail['address'], mail['subject'], mail['body'])
             if sent:
-                yield tw(db_del, models.Mail, models.Mail.id == mail['id'])
+                return True
+
+        return False
+
+    @defer.inlineCallbacks
+    def spool_emails(self):
+        start = time.monotonic()
+
+        mails = yield get_mails_from_the_pool()
+        if not mails:
+            return
+
+        # The mails are sent in parallel; the concurrency of the
+        # connections to each SMTP server is limited by its pool
+        results = yield defer.gatherResults([self.spool_email(mail) for mail in mails])
+
+        sent = [mail['id'] for mail, result in zip(mails, results) if result]
+        if sent:
+            yield tw(db_del, models.Mail, models.Mail.id.in_(sent))
+
+        elapsed = time.monotonic() - start
 
-            yield deferred_sleep(1)
+        Notification.last_spool = {
+            'mails': len(mails),
+            'sent': len(sent),
+            'time': elapsed,
+            'throughput': len(sent) / elapsed if elapsed else 0
+        }
 
     @defer.inlineCallbacks
     def operation(self):
@@ -27,7 +27,7 @@ def evaluate_update_notification(session, state, latest_version):
     if parse_version(stored_latest) >= parse_version(latest_version):
         return
 
-    Cache.invalidate()
+    Cache.invalidate(1, ['node'])
 
     priv_fact.set_val('latest_version', latest_version)
 
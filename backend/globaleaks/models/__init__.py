@@ -213,7 +213,6 @@ class _AuditLog(Model):
     This model contains audit logs
     """
     __tablename__ = 'auditlog'
-    __table_args__ = {'sqlite_autoincrement': True}
 
     id = Column(Integer, primary_key=True)
     tid = Column(Integer, default=1)
@@ -224,6 +223,12 @@ class _AuditLog(Model):
     object_id = Column(UnicodeText(36))
     data = Column(JSON)
 
+    @declared_attr
+    def __table_args__(self):
+        return (Index('ix_auditlog_tid_date', 'tid', 'date'),
+                Index('ix_auditlog_tid_type', 'tid', 'type'),
+                {'sqlite_autoincrement': True})
+
 
 class _Comment(Model):
     """
@@ -1,8 +1,9 @@
 # -*- coding: utf-8 -*-
-from sqlalchemy import not_
+from sqlalchemy import bindparam, not_
 from globaleaks.models import Config, ConfigL10N, EnabledLanguage
 from globaleaks.models.properties import *
 from globaleaks.models.config_desc import ConfigDescriptor, ConfigFilters, ConfigL10NFilters
+from globaleaks.orm import bakery
 from globaleaks.utils.onion import generate_onion_service_v3
 
 
@@ -23,6 +24,16 @@ def get_default(default):
     return default
 
 
+config_value_query = bakery(lambda session: session.query(Config.value)
+                                                 .filter(Config.tid == bindparam('tid'),
+                                                         Config.var_name == bindparam('var_name')))
+
+config_l10n_value_query = bakery(lambda session: session.query(ConfigL10N.value)
+                                                      .filter(ConfigL10N.tid == bindparam('tid'),
+                                                              ConfigL10N.lang == bindparam('lang'),
+                                                              ConfigL10N.var_name == bindparam('var_name')))
+
+
 class ConfigFactory(object):
     def __init__(self, session, tid):
         self.session = session
@@ -40,12 +51,21 @@ class ConfigFactory(object):
         return self.session.query(Config).filter(Config.tid == self.tid, Config.var_name == var_name).one_or_none()
 
     def get_val(self, var_name):
-        v = self.get_cfg(var_name)
+        v = config_value_query(self.session).params(tid=self.tid, var_name=var_name).first()
         if v is None:
             return get_default(ConfigDescriptor[var_name].default)
 
         return v.value
 
+    def get_vals(self, var_names):
+        """
+        Return the values of a list of variables with a single query
+        """
+        values = dict(self.session.query(Config.var_name, Config.value).filter(Config.tid == self.tid, Config.var_name.in_(var_names)))
+
+        return {var_name: values[var_name] if var_name in values else get_default(ConfigDescriptor[var_name].default)
+                for var_name in var_names}
+
     def set_val(self, var_name, value):
         v = self.get_cfg(var_name)
         if v:
@@ -105,12 +125,20 @@ class ConfigL10NFactory(object):
             ConfigL10NFactory.initialize(self, list(set(ConfigL10NFilters[group]) - set(old_keys)), lang, data)
 
     def get_val(self, var_name, lang):
-        v = self.session.query(ConfigL10N.value).filter(ConfigL10N.tid == self.tid, ConfigL10N.lang == lang, ConfigL10N.var_name == var_name).one_or_none()
+        v = config_l10n_value_query(self.session).params(tid=self.tid, lang=lang, var_name=var_name).first()
         if v is None:
             return ''
 
         return v.value
 
+    def get_vals(self, var_names, lang):
+        """
+        Return the values of a list of variables with a single query
+        """
+        values = dict(self.session.query(ConfigL10N.var_name, ConfigL10N.value).filter(ConfigL10N.tid == self.tid, ConfigL10N.lang == lang, ConfigL10N.var_name.in_(var_names)))
+
+        return {var_name: values.get(var_name, '') for var_name in var_names}
+
     def set_val(self, var_name, lang, value):
         v = self.session.query(ConfigL10N).filter(ConfigL10N.tid == self.tid, ConfigL10N.lang == lang, ConfigL10N.var_name == var_name).one_or_none()
         if v:
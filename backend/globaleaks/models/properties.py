@@ -2,7 +2,7 @@
 # pylint: disable=unused-import
 import json
 
-from sqlalchemy import Column, CheckConstraint, ForeignKeyConstraint, UniqueConstraint, types
+from sqlalchemy import Column, CheckConstraint, ForeignKeyConstraint, Index, UniqueConstraint, types
 from sqlalchemy.schema import ForeignKey
 from sqlalchemy.types import Boolean, DateTime, Integer, LargeBinary, UnicodeText
 
@@ -18,6 +18,7 @@ from globaleaks.utils.utility import uuid4
 class JSON(types.TypeDecorator):
     """Stores and retrieves JSON as TEXT."""
     impl = types.UnicodeText
+    cache_ok = True
 
     def process_bind_param(self, value, dialect):
         if value is not None:
@@ -35,16 +36,19 @@ class JSON(types.TypeDecorator):
 class Enum(types.TypeDecorator):
     """Stores and retrieves ENUM as INTEGER."""
     impl = types.Integer
+    cache_ok = True
 
     def __init__(self, enumtype, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self._enumtype = enumtype
+
+        # The attribute is named after the argument to be part of the cache key
+        self.enumtype = enumtype
 
     def process_bind_param(self, value, dialect):
         if isinstance(value, str):
-            return getattr(self._enumtype, value).value
+            return getattr(self.enumtype, value).value
 
         return value
 
     def process_result_value(self, value, dialect):
-        return self._enumtype(value).name
+        return self.enumtype(value).name
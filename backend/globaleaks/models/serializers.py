@@ -2,10 +2,11 @@
 import copy
 import os
 
+from collections import defaultdict
+
 from globaleaks import models
 from globaleaks.models.config import ConfigFactory
 from globaleaks.state import State
-from sqlalchemy import or_, and_
 
 
 def serialize_archived_field_recursively(field, language):
@@ -51,6 +52,10 @@ def serialize_identityaccessrequest(session, identityaccessrequest):
     reply_user = session.query(models.User) \
                         .filter(models.User.id == identityaccessrequest.reply_user_id).one_or_none()
 
+    return _serialize_identityaccessrequest(identityaccessrequest, itip, request_user, reply_user)
+
+
+def _serialize_identityaccessrequest(identityaccessrequest, itip, request_user, reply_user):
     return {
         'id': identityaccessrequest.id,
         'internaltip_id': identityaccessrequest.internaltip_id,
@@ -65,6 +70,7 @@ def serialize_identityaccessrequest(session, identityaccessrequest):
         'submission_date': itip.creation_date
     }
 
+
 def serialize_comment(session, comment):
     """
     Transaction returning a serialized descriptor of a comment
@@ -147,50 +153,72 @@ def serialize_rfile(session, rfile):
 
 
 def serialize_itip(session, internaltip, language):
-    x = session.query(models.InternalTipAnswers, models.ArchivedSchema) \
-               .filter(models.ArchivedSchema.hash == models.InternalTipAnswers.questionnaire_hash,
-                       models.InternalTipAnswers.internaltip_id == internaltip.id) \
-               .order_by(models.InternalTipAnswers.creation_date.asc())
-
-    questionnaires = []
-    for ita, aqs in x:
-        questionnaires.append({
-            'steps': serialize_archived_questionnaire_schema(aqs.schema, language),
+    return serialize_itips(session, [internaltip], language)[0]
+
+
+def serialize_itips(session, itips, language):
+    """
+    Transaction returning the serialized descriptors of a list of itips
+
+    The questionnaires and the data of the itips are fetched
+    with a fixed number of queries independent of the number of itips.
+
+    :param session: An ORM session
+    :param itips: The list of itips to be serialized
+    :param language: A language of the serialization
+    :return: The list of the serialized descriptors ordered as the itips
+    """
+    itip_ids = [itip.id for itip in itips]
+
+    schemas = {}
+    questionnaires = defaultdict(list)
+    data = defaultdict(dict)
+
+    for ita, aqs in session.query(models.InternalTipAnswers, models.ArchivedSchema) \
+                           .filter(models.ArchivedSchema.hash == models.InternalTipAnswers.questionnaire_hash,
+                                   models.InternalTipAnswers.internaltip_id.in_(itip_ids)) \
+                           .order_by(models.InternalTipAnswers.creation_date.asc()):
+        if aqs.hash not in schemas:
+            schemas[aqs.hash] = serialize_archived_questionnaire_schema(aqs.schema, language)
+
+        questionnaires[ita.internaltip_id].append({
+            'steps': schemas[aqs.hash],
             'answers': ita.answers
         })
 
-    ret = {
-        'id': internaltip.id,
-        'creation_date': internaltip.creation_date,
-        'update_date': internaltip.update_date,
-        'expiration_date': internaltip.expiration_date,
-        'context_id': internaltip.context_id,
-        'questionnaires': questionnaires,
-        'tor': internaltip.tor,
-        'mobile': internaltip.mobile,
-        'reminder_date' : internaltip.reminder_date,
-        'enable_two_way_comments': internaltip.enable_two_way_comments,
-        'enable_attachments': internaltip.enable_attachments,
-        'enable_whistleblower_identity': internaltip.enable_whistleblower_identity,
-        'last_access': internaltip.last_access,
-        'score': internaltip.score,
-        'status': internaltip.status,
-        'substatus': internaltip.substatus,
-        'receivers': [],
-        'comments': [],
-        'wbfiles': [],
-        'rfiles': [],
-        'data': {}
-    }
-
-    for itd in session.query(models.InternalTipData).filter(models.InternalTipData.internaltip_id == internaltip.id):
-        ret['data'][itd.key] = itd.value
-        ret['data'][itd.key + "_date"] = itd.creation_date
+    for itd in session.query(models.InternalTipData).filter(models.InternalTipData.internaltip_id.in_(itip_ids)):
+        data[itd.internaltip_id][itd.key] = itd.value
+        data[itd.internaltip_id][itd.key + "_date"] = itd.creation_date
+
+    ret = []
+    for internaltip in itips:
+        ret.append({
+            'id': internaltip.id,
+            'creation_date': internaltip.creation_date,
+            'update_date': internaltip.update_date,
+            'expiration_date': internaltip.expiration_date,
+            'context_id': internaltip.context_id,
+            'questionnaires': [dict(q) for q in questionnaires[internaltip.id]],
+            'tor': internaltip.tor,
+            'mobile': internaltip.mobile,
+            'reminder_date' : internaltip.reminder_date,
+            'enable_two_way_comments': internaltip.enable_two_way_comments,
+            'enable_attachments': internaltip.enable_attachments,
+            'enable_whistleblower_identity': internaltip.enable_whistleblower_identity,
+            'last_access': internaltip.last_access,
+            'score': internaltip.score,
+            'status': internaltip.status,
+            'substatus': internaltip.substatus,
+            'receivers': [],
+            'comments': [],
+            'wbfiles': [],
+            'rfiles': [],
+            'data': dict(data[internaltip.id])
+        })
 
     return ret
 
 
-
 def serialize_rtip(session, itip, rtip, language):
     """
     Transaction returning a serialized descriptor of a tip
@@ -201,61 +229,102 @@ def serialize_rtip(session, itip, rtip, language):
     :param language: A language of the serialization
     :return: A serialized description of the model specified
     """
-    user_id = rtip.receiver_id
-
-    ret = serialize_itip(session, itip, language)
+    return serialize_rtips(session, [(itip, rtip)], language)[0]
 
-    ret['id'] = rtip.id
-    ret['internaltip_id'] = itip.id
-    ret['progressive'] = itip.progressive
-    ret['receiver_id'] = user_id
-    ret['custodian'] = State.tenants[itip.tid].cache['custodian']
-    ret['important'] = itip.important
-    ret['label'] = itip.label
-    ret['enable_notifications'] = rtip.enable_notifications
 
-    iar = session.query(models.IdentityAccessRequest) \
-                 .filter(models.IdentityAccessRequest.internaltip_id == itip.id) \
-                 .order_by(models.IdentityAccessRequest.request_date.desc()).first()
+def serialize_rtips(session, tips, language):
+    """
+    Transaction returning the serialized descriptors of a list of tips
 
-    if iar:
-        ret['iar'] = serialize_identityaccessrequest(session, iar)
+    All the related objects are prefetched with a fixed number of
+    queries independent of the number of tips to be serialized.
 
-    for receiver in session.query(models.User) \
-                           .filter(models.User.id == models.ReceiverTip.receiver_id,
-                                   models.ReceiverTip.internaltip_id == itip.id):
-        ret['receivers'].append({
-          'id': receiver.id,
-          'name': receiver.name
+    :param session: An ORM session
+    :param tips: A list of (itip, rtip) tuples to be serialized
+    :param language: A language of the serialization
+    :return: The list of the serialized descriptors ordered as the tips
+    """
+    if not tips:
+        return []
+
+    itip_ids = list({itip.id for itip, _ in tips})
+    rtip_ids = [rtip.id for _, rtip in tips]
+
+    iars = {}
+    users = {}
+    receivers = defaultdict(list)
+    wbfiles = defaultdict(list)
+    rfiles = defaultdict(list)
+    comments = defaultdict(list)
+
+    results = session.query(models.IdentityAccessRequest) \
+                     .filter(models.IdentityAccessRequest.internaltip_id.in_(itip_ids)) \
+                     .order_by(models.IdentityAccessRequest.request_date.desc()).all()
+
+    for iar in results:
+        iars.setdefault(iar.internaltip_id, iar)
+
+    if iars:
+        user_ids = {iar.request_user_id for iar in iars.values()} | \
+                   {iar.reply_user_id for iar in iars.values()}
+
+        users = {user.id: user for user in session.query(models.User).filter(models.User.id.in_(user_ids))}
+
+    for itip_id, user_id, user_name in session.query(models.ReceiverTip.internaltip_id, models.User.id, models.User.name) \
+                                              .filter(models.User.id == models.ReceiverTip.receiver_id,
+                                                      models.ReceiverTip.internaltip_id.in_(itip_ids)):
+        receivers[itip_id].append({
+          'id': user_id,
+          'name': user_name
         })
 
-    if 'whistleblower_identity' in ret['data']:
-        ret['data']['whistleblower_identity_provided'] = True
-
-        if 'iar' not in ret or ret['iar']['reply'] == 'denied':
-            del ret['data']['whistleblower_identity']
-
-
     for ifile, wbfile in session.query(models.InternalFile, models.WhistleblowerFile) \
                                .filter(models.InternalFile.id == models.WhistleblowerFile.internalfile_id,
-                                       models.WhistleblowerFile.receivertip_id == rtip.id):
-        ret['wbfiles'].append(serialize_wbfile(session, ifile, wbfile))
+                                       models.WhistleblowerFile.receivertip_id.in_(rtip_ids)):
+        wbfiles[wbfile.receivertip_id].append(serialize_wbfile(session, ifile, wbfile))
 
     for rfile in session.query(models.ReceiverFile) \
-                         .filter(models.ReceiverFile.internaltip_id == itip.id,
-                                 or_(models.ReceiverFile.visibility == 0,
-                                     models.ReceiverFile.visibility == 1,
-                                     and_(models.ReceiverFile.visibility == 2,
-                                          models.ReceiverFile.author_id == user_id))):
-        ret['rfiles'].append(serialize_rfile(session, rfile))
+                        .filter(models.ReceiverFile.internaltip_id.in_(itip_ids)):
+        rfiles[rfile.internaltip_id].append(rfile)
 
     for comment in session.query(models.Comment) \
-                          .filter(models.Comment.internaltip_id == itip.id,
-                                  or_(models.Comment.visibility == 0,
-                                      models.Comment.visibility == 1,
-                                      and_(models.Comment.visibility == 2,
-                                           models.Comment.author_id == user_id))):
-        ret['comments'].append(serialize_comment(session, comment))
+                          .filter(models.Comment.internaltip_id.in_(itip_ids)):
+        comments[comment.internaltip_id].append(comment)
+
+    ret = serialize_itips(session, [itip for itip, _ in tips], language)
+
+    for x, (itip, rtip) in zip(ret, tips):
+        user_id = rtip.receiver_id
+
+        x['id'] = rtip.id
+        x['internaltip_id'] = itip.id
+        x['progressive'] = itip.progressive
+        x['receiver_id'] = user_id
+        x['custodian'] = State.tenants[itip.tid].cache['custodian']
+        x['important'] = itip.important
+        x['label'] = itip.label
+        x['enable_notifications'] = rtip.enable_notifications
+        x['receivers'] = list(receivers[itip.id])
+
+        iar = iars.get(itip.id)
+        if iar:
+            x['iar'] = _serialize_identityaccessrequest(iar, itip,
+                                                        users[iar.request_user_id],
+                                                        users.get(iar.reply_user_id))
+
+        if 'whistleblower_identity' in x['data']:
+            x['data']['whistleblower_identity_provided'] = True
+
+            if 'iar' not in x or x['iar']['reply'] == 'denied':
+                del x['data']['whistleblower_identity']
+
+        x['wbfiles'] = wbfiles[rtip.id]
+
+        x['rfiles'] = [serialize_rfile(session, rfile) for rfile in rfiles[itip.id]
+                       if rfile.visibility in (0, 1) or (rfile.visibility == 2 and rfile.author_id == user_id)]
+
+        x['comments'] = [serialize_comment(session, comment) for comment in comments[itip.id]
+                         if comment.visibility in (0, 1) or (comment.visibility == 2 and comment.author_id == user_id)]
 
     return ret
 
@@ -7,7 +7,9 @@ import threading
 
 from sqlalchemy import create_engine, event
 from sqlalchemy.exc import OperationalError, SAWarning
+from sqlalchemy.ext import baked
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
 from twisted.internet import reactor
 from twisted.internet.threads import deferToThreadPool
@@ -18,7 +20,19 @@ from globaleaks.models import AuditLog
 _ORM_DEBUG = False
 _ORM_DB_URI = 'sqlite:'
 _ORM_THREAD_POOL = None
+_ORM_THREAD_POOL_RO = None
 _ORM_TRANSACTION_RETRIES = 20
+_ORM_POOL_SIZE = 16
+_ORM_POOL_SIZE_RO = 16
+_ORM_WAL = False
+_ORM_MMAP_SIZE = 256 * 1024 * 1024
+_ORM_ENGINES = {}
+_ORM_LOCK = threading.Lock()
+_ORM_STATS = {
+    'lock_retries': 0,
+    'lock_wait': 0.0,
+    'lock_failures': 0
+}
 
 
 SQLITE_DELETE=9
@@ -43,24 +57,52 @@ def set_db_uri(db_uri):
     global _DB_URI
     _DB_URI = db_uri
 
+    dispose_engines()
+
 
 def get_db_uri():
     return _DB_URI
 
 
-def get_engine(db_uri=None, foreign_keys=True, orm_lockdown=True):
+def enable_orm_wal():
+    """
+    Enable the WAL journal mode on the connections of the shared engines
+
+    In WAL mode the readers do not block the writers and the writers do not
+    block the readers; the mode is persistent in the database file.
+    """
+    global _ORM_WAL
+    _ORM_WAL = True
+
+    dispose_engines()
+
+
+def get_engine(db_uri=None, foreign_keys=True, orm_lockdown=True, readonly=False, pool_size=None):
     if db_uri is None:
         db_uri = get_db_uri()
 
-    engine = create_engine(db_uri, connect_args={'timeout': 30}, echo=_ORM_DEBUG)
+    connect_args = {'timeout': 30}
+    kwargs = {}
+
+    if pool_size is not None:
+        # Connections are shared by the threads of the pool
+        connect_args['check_same_thread'] = False
+        kwargs = {'poolclass': QueuePool, 'pool_size': pool_size, 'max_overflow': -1}
+
+    engine = create_engine(db_uri, connect_args=connect_args, echo=_ORM_DEBUG, **kwargs)
+
+    if readonly:
+        actions = [SQLITE_READ, SQLITE_SELECT, SQLITE_TRANSACTION]
+    else:
+        actions = [SQLITE_DELETE,
+                   SQLITE_INSERT,
+                   SQLITE_READ,
+                   SQLITE_SELECT,
+                   SQLITE_TRANSACTION,
+                   SQLITE_UPDATE]
 
     def authorizer_callback(action, table, column, sql_location, ignore):
-        if action in [SQLITE_DELETE,
-                      SQLITE_INSERT,
-                      SQLITE_READ,
-                      SQLITE_SELECT,
-                      SQLITE_TRANSACTION,
-                      SQLITE_UPDATE] or \
+        if action in actions or \
            (action == SQLITE_FUNCTION and column in ['count',
                                                      'lower',
                                                      'min',
@@ -77,16 +119,122 @@ def get_engine(db_uri=None, foreign_keys=True, orm_lockdown=True):
         if foreign_keys:
             conn.execute('PRAGMA foreign_keys=ON')
 
-        if orm_lockdown:
+        if pool_size is not None and _ORM_WAL:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA mmap_size=%d' % _ORM_MMAP_SIZE)
+
+        if readonly:
+            conn.execute('PRAGMA query_only=ON')
+
+            # Transactions are started explicitly on the begin event
+            conn.isolation_level = None
+
+        if orm_lockdown or readonly:
             conn.set_authorizer(authorizer_callback)
 
+    if readonly:
+        @event.listens_for(engine, "begin")
+        def do_begin(conn):
+            # Read only transactions read from a consistent snapshot
+            conn.connection.execute('BEGIN DEFERRED')
+
     return engine
 
 
-def get_session(db_uri=None, foreign_keys=True):
+def get_thread_pool_stats(thread_pool):
+    stats = {
+        'queued': 0,
+        'working': 0,
+        'idle': 0
+    }
+
+    team = getattr(thread_pool, '_team', None)
+    if team is not None:
+        statistics = team.statistics()
+        stats['queued'] = statistics.backloggedWorkCount
+        stats['working'] = statistics.busyWorkerCount
+        stats['idle'] = statistics.idleWorkerCount
+
+    return stats
+
+
+def get_shared_engine(readonly=False):
+    """
+    Return the engine shared by the threads of the process
+
+    The engine keeps a pool of connections sized on the ORM thread pool;
+    a separate pool of query only connections is used for the reads.
+    """
+    engine = _ORM_ENGINES.get(readonly)
+    if engine is not None:
+        return engine
+
+    with _ORM_LOCK:
+        engine = _ORM_ENGINES.get(readonly)
+        if engine is None:
+            pool_size = _ORM_POOL_SIZE_RO if readonly else _ORM_POOL_SIZE
+            engine = _ORM_ENGINES[readonly] = get_engine(readonly=readonly, pool_size=pool_size)
+
+    return engine
+
+
+def dispose_engines():
+    """
+    Close the connections of the shared engines
+
+    The engines are recreated on their next use, e.g. after a change of the
+    database in use or of the configuration of the connections.
+    """
+    with _ORM_LOCK:
+        for engine in _ORM_ENGINES.values():
+            engine.dispose()
+
+        _ORM_ENGINES.clear()
+
+
+def get_session(db_uri=None, foreign_keys=True, readonly=False):
+    if db_uri is None:
+        return sessionmaker(bind=get_shared_engine(readonly))()
+
     return sessionmaker(bind=get_engine(db_uri, foreign_keys))()
 
 
+def get_thread_session(readonly=False):
+    """
+    Return the session of the current thread bound to a shared engine
+    """
+    engine = get_shared_engine(readonly)
+    name = 'readonly_session' if readonly else 'session'
+
+    session = getattr(THREAD_LOCAL, name, None)
+    if session is None or session.bind is not engine:
+        session = sessionmaker(bind=engine)()
+        setattr(THREAD_LOCAL, name, session)
+
+    return session
+
+
+def get_orm_stats():
+    stats = dict(_ORM_STATS)
+
+    stats['wal'] = _ORM_WAL
+    stats['pools'] = {}
+    for readonly, engine in list(_ORM_ENGINES.items()):
+        stats['pools']['readonly' if readonly else 'readwrite'] = {
+            'size': engine.pool.size(),
+            'checked_in': engine.pool.checkedin(),
+            'checked_out': engine.pool.checkedout()
+        }
+
+    stats['thread_pools'] = {
+        'readwrite': get_thread_pool_stats(get_thread_pool()),
+        'readonly': get_thread_pool_stats(get_ro_thread_pool())
+    }
+
+    return stats
+
+
 
 def enable_orm_debug():
     global _ORM_DEBUG
@@ -94,14 +242,42 @@ def enable_orm_debug():
 
 
 def set_thread_pool(thread_pool):
-    global _ORM_THREAD_POOL
+    global _ORM_POOL_SIZE, _ORM_THREAD_POOL
     _ORM_THREAD_POOL = thread_pool
 
+    # The connections pool is sized to serve all the threads at once
+    pool_size = getattr(thread_pool, 'max', _ORM_POOL_SIZE)
+    if pool_size != _ORM_POOL_SIZE:
+        _ORM_POOL_SIZE = pool_size
+        dispose_engines()
+
 
 def get_thread_pool():
     return _ORM_THREAD_POOL
 
 
+def set_ro_thread_pool(thread_pool):
+    global _ORM_POOL_SIZE_RO, _ORM_THREAD_POOL_RO
+    _ORM_THREAD_POOL_RO = thread_pool
+
+    pool_size = getattr(thread_pool, 'max', _ORM_POOL_SIZE_RO)
+    if pool_size != _ORM_POOL_SIZE_RO:
+        _ORM_POOL_SIZE_RO = pool_size
+        dispose_engines()
+
+
+def get_ro_thread_pool():
+    if _ORM_THREAD_POOL_RO is None:
+        return _ORM_THREAD_POOL
+
+    return _ORM_THREAD_POOL_RO
+
+
+# Cache of the queries of the hottest lookups, that are built and compiled
+# once and then executed with bound parameters
+bakery = baked.bakery()
+
+
 def db_add(session, model_class, model_fields):
     obj = model_class(model_fields)
     session.add(obj)
@@ -169,10 +345,7 @@ class transact(object):
         Wrap provided function calling it inside a thread and
         passing the ORM session to it.
         """
-        global THREAD_LOCAL
-        session = getattr(THREAD_LOCAL, 'session', None)
-        if not session:
-            session = THREAD_LOCAL.session = get_session()
+        session = get_thread_session()
 
         retries = 0
 
@@ -194,9 +367,18 @@ class transact(object):
                     retries += 1
 
                     if retries >= _ORM_TRANSACTION_RETRIES:
+                        with _ORM_LOCK:
+                            _ORM_STATS['lock_failures'] += 1
+
                         raise Exception("Transaction failed with too many retries")
 
-                    time.sleep(0.2 * random.uniform(1, 2 ** retries))
+                    wait = 0.2 * random.uniform(1, 2 ** retries)
+
+                    with _ORM_LOCK:
+                        _ORM_STATS['lock_retries'] += 1
+                        _ORM_STATS['lock_wait'] += wait
+
+                    time.sleep(wait)
                 except:
                     session.rollback()
                     raise
@@ -206,6 +388,34 @@ class transact(object):
             session.close()
 
 
+class transact_ro(transact):
+    """
+    Class decorator for managing read only transactions.
+
+    The transactions run on a dedicated thread pool and on query only
+    connections so that the reads do not queue behind the writes; as they
+    do not write they are never committed nor retried.
+    """
+    def run(self, function, *args, **kwargs):
+        return deferToThreadPool(reactor,
+                                 get_ro_thread_pool(),
+                                 function,
+                                 *args,
+                                 **kwargs)
+
+    def _wrap(self, function, *args, **kwargs):
+        session = get_thread_session(readonly=True)
+
+        try:
+            if self.instance:
+                return function(self.instance, session, *args, **kwargs)
+            else:
+                return function(session, *args, **kwargs)
+        finally:
+            session.rollback()
+            session.close()
+
+
 class transact_sync(transact):
     def run(self, function, *args, **kwargs):
         return function(*args, **kwargs)
@@ -38,6 +38,9 @@ from globaleaks.handlers import admin, \
                                 whistleblower
 
 from globaleaks.rest import decorators, requests, errors
+from globaleaks.rest.compression import compress_response
+from globaleaks.rest.router import Router
+from globaleaks.rest.validator import Validators
 from globaleaks.state import State, extract_exception_traceback_and_schedule_email
 from globaleaks.utils.json import JSONEncoder
 
@@ -114,6 +117,7 @@ api_spec = [
     (r'/api/admin/auditlog/access', admin.auditlog.AccessLog),
     (r'/api/admin/auditlog/debug', admin.auditlog.DebugLog),
     (r'/api/admin/auditlog/jobs', admin.auditlog.JobsTiming),
+    (r'/api/admin/auditlog/metrics', admin.auditlog.Metrics),
     (r'/api/admin/auditlog/tips', admin.auditlog.TipsCollection),
     (r'/api/admin/l10n/(' + '|'.join(LANGUAGES_SUPPORTED_CODES) + ')', admin.l10n.AdminL10NHandler),
     (r'/api/admin/config', admin.operation.AdminOperationHandler),
@@ -160,7 +164,7 @@ api_spec = [
 
 
 class APIResourceWrapper(Resource):
-    _registry = None
+    router = None
     isLeaf = True
     method_map = {
       'delete': 200,
@@ -173,9 +177,13 @@ class APIResourceWrapper(Resource):
 
     def __init__(self):
         Resource.__init__(self)
-        self._registry = []
         self.handler = None
 
+        if APIResourceWrapper.router is not None:
+            return
+
+        router = Router()
+
         for tup in api_spec:
             args = {}
             if len(tup) == 2:
@@ -183,12 +191,6 @@ class APIResourceWrapper(Resource):
             else:
                 pattern, handler, args = tup
 
-            if not pattern.startswith("^"):
-                pattern = "^" + pattern
-
-            if not pattern.endswith("$"):
-                pattern += "$"
-
             if not hasattr(handler, '_decorated'):
                 handler._decorated = True
                 for m in ['delete', 'get', 'put', 'post']:
@@ -196,7 +198,11 @@ class APIResourceWrapper(Resource):
                     if hasattr(handler, m):
                         decorators.decorate_method(handler, m)
 
-            self._registry.append((re.compile(pattern), handler, args))
+            router.add(pattern, handler, args)
+
+        APIResourceWrapper.router = router
+
+        Validators.compile_module(requests)
 
     def should_redirect_https(self, request):
         if request.isSecure() or \
@@ -375,19 +381,14 @@ class APIResourceWrapper(Resource):
             request.redirect(State.tenants[request.tid].cache['redirects'][request_path])
             return b''
 
-        match = None
-        for regexp, handler, args in self._registry:
-            try:
-                match = regexp.match(request_path)
-            except UnicodeDecodeError:
-                match = None
-            if match:
-                break
-
+        match = self.router.match(request_path)
         if match is None:
             self.handle_exception(errors.ResourceNotFound, request)
             return b''
 
+        route, groups = match
+        handler, args = route.handler, route.args
+
         method = request.method.lower().decode()
 
         if method == 'head':
@@ -401,7 +402,6 @@ class APIResourceWrapper(Resource):
             return b''
 
         f = getattr(handler, method)
-        groups = match.groups()
 
         self.handler = handler(State, request, **args)
 
@@ -453,6 +453,11 @@ class APIResourceWrapper(Resource):
                 if isinstance(ret, str):
                     ret = ret.encode()
 
+                ret = yield compress_response(request, ret)
+
+                if request.finished:
+                    return
+
                 request.write(ret)
 
             request.finish()
@@ -1,31 +1,232 @@
 # -*- coding: utf-8 -*-
+import gzip
+
+from collections import OrderedDict
+from threading import Lock
+
+from twisted.internet import defer
+
+from globaleaks.utils.crypto import sha256
+
+
 class Cache(object):
-    memory_cache_dict = {}
+    """
+    Cache of the responses of the cacheable resources
+
+    Entries are indexed by tenant, resource and language and are tagged with
+    the dependencies of the resource so that administrative changes invalidate
+    only the affected entries. The memory used is bounded with LRU eviction and
+    concurrent misses of the same entry are coalesced on a single rebuild.
+
+    Each entry is a tuple (content_type, data, etag, gzip_data, gzip_etag)
+    where data is stored together with its gzip compressed variant and the
+    strong ETags of the two representations.
+    """
+    # Tags of the root tenant on which depend the resources of every tenant
+    shared_tags = {'l10n', 'node', 'questionnaires'}
+
+    max_size = 64 * 1024 * 1024
+    size = 0
+    generation = 0
+
+    memory_cache_dict = OrderedDict()
+    tags_index = {}
+    pending = {}
+    lock = Lock()
+
+    hits = 0
+    misses = 0
+    evictions = 0
+    coalesced = 0
 
     @classmethod
     def get(cls, tid, resource, language):
-        if tid in cls.memory_cache_dict \
-           and resource in cls.memory_cache_dict[tid] \
-           and language in cls.memory_cache_dict[tid][resource]:
-            return cls.memory_cache_dict[tid][resource][language]
+        key = (tid, resource, language)
+
+        with cls.lock:
+            entry = cls.memory_cache_dict.get(key)
+            if entry is None:
+                cls.misses += 1
+                return None
+
+            cls.memory_cache_dict.move_to_end(key)
+            cls.hits += 1
+
+        return entry[0]
+
+    @classmethod
+    def wait(cls, tid, resource, language):
+        """
+        Register the rebuild of an entry
+
+        :return: A Deferred firing with the entry if a rebuild is already in
+                 progress, otherwise None and the generation to be passed to set
+        """
+        key = (tid, resource, language)
+
+        if key in cls.pending:
+            cls.coalesced += 1
+            d = defer.Deferred()
+            cls.pending[key].append(d)
+            return d, None
+
+        cls.pending[key] = []
+
+        return None, cls.generation
+
+    @staticmethod
+    def build_entry(content_type, data):
+        """
+        Build an entry compressing its data
+
+        The compression is CPU bound and is meant to be run off the reactor.
+        """
+        if isinstance(data, str):
+            data = data.encode()
+
+        etag = sha256(data)
+
+        return (content_type,
+                data,
+                b'"' + etag + b'"',
+                gzip.compress(data, compresslevel=9, mtime=0),
+                b'"' + etag + b'-gz"')
+
+    @classmethod
+    def set(cls, tid, resource, language, content_type, data, tags=(), generation=None):
+        return cls.store(tid, resource, language, cls.build_entry(content_type, data), tags, generation)
+
+    @classmethod
+    def store(cls, tid, resource, language, entry, tags=(), generation=None):
+        key = (tid, resource, language)
+
+        with cls.lock:
+            if generation is None or generation == cls.generation:
+                cls._store(key, entry, tags)
+
+        for d in cls.pending.pop(key, []):
+            d.callback(entry)
+
+        return entry
+
+    @classmethod
+    def fail(cls, tid, resource, language, failure):
+        for d in cls.pending.pop((tid, resource, language), []):
+            d.errback(failure)
 
     @classmethod
-    def set(cls, tid, resource, language, content_type, data):
-        if tid not in Cache.memory_cache_dict:
-            cls.memory_cache_dict[tid] = {}
+    def _store(cls, key, entry, tags):
+        size = len(entry[1]) + len(entry[3])
+        if size > cls.max_size:
+            return
+
+        cls._remove(key)
+
+        index_keys = set()
+        for tag in tags:
+            index_keys.add((key[0], tag))
+            if key[0] != 1 and tag in cls.shared_tags:
+                index_keys.add((1, tag))
+
+        for index_key in index_keys:
+            cls.tags_index.setdefault(index_key, set()).add(key)
 
-        if resource not in Cache.memory_cache_dict[tid]:
-            cls.memory_cache_dict[tid][resource] = {}
+        cls.memory_cache_dict[key] = (entry, index_keys)
+        cls.size += size
+
+        while cls.size > cls.max_size:
+            cls._remove(next(iter(cls.memory_cache_dict)))
+            cls.evictions += 1
+
+    @classmethod
+    def _remove(cls, key):
+        entry = cls.memory_cache_dict.pop(key, None)
+        if entry is None:
+            return
+
+        cls.size -= len(entry[0][1]) + len(entry[0][3])
+
+        for index_key in entry[1]:
+            keys = cls.tags_index.get(index_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del cls.tags_index[index_key]
+
+    @classmethod
+    def invalidate(cls, tid=1, tags=None):
+        """
+        Invalidate the cache
 
-        entry = (content_type, data)
+        :param tid: The tenant ID of the tenant whose data changed
+        :param tags: The tags of the data changed; if not specified all the
+                     entries of the tenant are invalidated and the
+                     invalidation of the root tenant clears the full cache
+        """
+        with cls.lock:
+            cls.generation += 1
 
-        cls.memory_cache_dict[tid][resource][language] = entry
+            if tags is None:
+                if tid == 1:
+                    cls.memory_cache_dict.clear()
+                    cls.tags_index.clear()
+                    cls.size = 0
+                else:
+                    for key in [key for key in cls.memory_cache_dict if key[0] == tid]:
+                        cls._remove(key)
+
+                return
+
+            for tag in tags:
+                for key in list(cls.tags_index.get((tid, tag), [])):
+                    cls._remove(key)
+
+    @classmethod
+    def stats(cls):
+        return {
+            'entries': len(cls.memory_cache_dict),
+            'size': cls.size,
+            'hits': cls.hits,
+            'misses': cls.misses,
+            'evictions': cls.evictions,
+            'coalesced': cls.coalesced
+        }
+
+
+class QuestionnaireCache(object):
+    """
+    Versioned cache of the compiled questionnaires of each tenant
+
+    Each invalidation increases the version of the tenant so that entries
+    compiled from data read before the invalidation are never stored.
+    """
+    memory_cache_dict = {}
+    versions = {}
+    version = 0
+    lock = Lock()
+
+    @classmethod
+    def get_version(cls, tid):
+        return cls.version, cls.versions.get(tid, 0)
+
+    @classmethod
+    def get(cls, tid, key):
+        return cls.memory_cache_dict.get(tid, {}).get(key)
+
+    @classmethod
+    def set(cls, tid, key, version, entry):
+        with cls.lock:
+            if version == cls.get_version(tid):
+                cls.memory_cache_dict.setdefault(tid, {})[key] = entry
 
         return entry
 
     @classmethod
     def invalidate(cls, tid=1):
-        if tid == 1:
-            cls.memory_cache_dict.clear()
-        else:
-            cls.memory_cache_dict.pop(tid, None)
+        with cls.lock:
+            if tid == 1:
+                cls.version += 1
+                cls.memory_cache_dict.clear()
+            else:
+                cls.versions[tid] = cls.versions.get(tid, 0) + 1
+                cls.memory_cache_dict.pop(tid, None)
@@ -0,0 +1,135 @@
+# -*- coding: utf-8
+#   Compression
+#   ***********
+#
+# Policy for the compression of the HTTP responses
+import gzip
+import re
+
+from twisted.internet import defer
+from twisted.internet.threads import deferToThread
+from twisted.web import server
+
+# Compression level of the gzip encoder prioritizing speed over compression
+COMPRESS_LEVEL = 1
+
+# Size above which the response bodies are compressed off the reactor thread
+OFFLOAD_THRESHOLD = 64 * 1024
+
+COMPRESSIBLE_CONTENT_TYPES = {
+    b'application/javascript',
+    b'application/json',
+    b'application/xml',
+    b'image/svg+xml'
+}
+
+
+def accepts_encoding(request, encoding):
+    """
+    Check if the client declared to accept a content encoding
+
+    :param request: The request
+    :param encoding: The name of the encoding, e.g. b'gzip'
+    :return: A boolean
+    """
+    for value in request.requestHeaders.getRawHeaders(b'accept-encoding', []):
+        for item in value.split(b','):
+            name, _, params = item.strip().partition(b';')
+            if name.strip().lower() != encoding:
+                continue
+
+            q = re.search(br'q=([0-9.]+)', params)
+            try:
+                return q is None or float(q.group(1)) > 0
+            except ValueError:
+                return False
+
+    return False
+
+
+def is_compressible(request):
+    """
+    Check if the response to a request could benefit from compression
+
+    Only text responses are compressed; images, archives and the encrypted
+    files are sent as application/octet-stream and would not shrink.
+    """
+    content_type = request.responseHeaders.getRawHeaders(b'content-type')
+    if not content_type:
+        # The default content type of twisted is text/html
+        return True
+
+    content_type = content_type[0]
+    if isinstance(content_type, str):
+        content_type = content_type.encode()
+
+    content_type = content_type.split(b';')[0].strip().lower()
+
+    return content_type.startswith(b'text/') or content_type in COMPRESSIBLE_CONTENT_TYPES
+
+
+class GzipEncoder(server._GzipEncoder):
+    """
+    Gzip encoder applying the compression policy
+
+    The encoder does not compress again responses that the handlers mark
+    as already compressed and responses whose content is not compressible.
+    The decision is taken at the first write when the headers are known.
+    """
+    skip = None
+
+    def encode(self, data):
+        if self.skip is None:
+            self.skip = self._request.precompressed or not is_compressible(self._request)
+
+            if self.skip and not self._request.precompressed:
+                encodings = b','.join(self._request.responseHeaders.getRawHeaders(b'content-encoding', []))
+                encodings = [x for x in encodings.split(b',') if x.strip() not in (b'', b'gzip')]
+                if encodings:
+                    self._request.responseHeaders.setRawHeaders(b'content-encoding', [b','.join(encodings)])
+                else:
+                    self._request.responseHeaders.removeHeader(b'content-encoding')
+
+        if self.skip:
+            return data
+
+        return server._GzipEncoder.encode(self, data)
+
+    def finish(self):
+        if self.skip or self._request.precompressed:
+            self._zlibCompressor = None
+            return b''
+
+        return server._GzipEncoder.finish(self)
+
+
+class GzipEncoderFactory(server.GzipEncoderFactory):
+    compressLevel = COMPRESS_LEVEL
+
+    def encoderForRequest(self, request):
+        if server.GzipEncoderFactory.encoderForRequest(self, request) is not None:
+            return GzipEncoder(self.compressLevel, request)
+
+
+def compress_response(request, data):
+    """
+    Compress a response body off the reactor thread
+
+    Bodies larger than OFFLOAD_THRESHOLD that would be compressed by the
+    gzip encoder are compressed in a thread and marked as precompressed.
+
+    :param request: The request
+    :param data: The response body
+    :return: A deferred firing with the body to be written
+    """
+    if len(data) < OFFLOAD_THRESHOLD or \
+       request.precompressed or \
+       not isinstance(getattr(request, '_encoder', None), GzipEncoder) or \
+       not is_compressible(request):
+        return defer.succeed(data)
+
+    def on_compressed(compressed):
+        request.precompressed = True
+        return compressed
+
+    return deferToThread(gzip.compress, data, COMPRESS_LEVEL, mtime=0).addCallback(on_compressed)
@@ -7,7 +7,7 @@ from twisted.internet.threads import deferToThread
 
 from globaleaks.db import sync_refresh_tenant_cache
 from globaleaks.rest import errors
-from globaleaks.rest.cache import Cache
+from globaleaks.rest.cache import Cache, QuestionnaireCache
 from globaleaks.state import State
 from globaleaks.utils.json import JSONEncoder
 from globaleaks.utils.utility import datetime_now, deferred_sleep
@@ -70,46 +70,91 @@ def decorator_authentication(f, roles):
     return wrapper
 
 
+def write_cached_entry(request, entry):
+    """
+    Return the body to be sent for a cached entry
+
+    Clients accepting gzip receive the compressed variant which has its own
+    ETag; requests carrying the ETag of the representation selected in
+    If-None-Match are answered with 304 and no body.
+    """
+    content_type, data, etag, gzip_data, gzip_etag = entry
+
+    compressed = request.responseHeaders.getRawHeaders(b'content-encoding') == [b'gzip']
+    if compressed:
+        data, etag = gzip_data, gzip_etag
+
+    request.setHeader(b'Content-type', content_type)
+    request.setHeader(b'ETag', etag)
+    request.setHeader(b'Vary', b'Accept-Encoding')
+
+    if_none_match = b','.join(request.requestHeaders.getRawHeaders(b'if-none-match', []))
+    if etag in [x.strip() for x in if_none_match.split(b',')]:
+        request.setResponseCode(304)
+        request.precompressed = True
+        return None
+
+    if compressed:
+        request.precompressed = True
+
+    return data
+
+
 def decorator_cache_get(f):
     # Decorator that checks if the requests resource is cached
     def wrapper(self, *args, **kwargs):
-        c = Cache.get(self.request.tid, self.request.path, self.request.language)
+        key = (self.request.tid, self.request.path, self.request.language)
+
+        c = Cache.get(*key)
         if c is None:
-            d = defer.maybeDeferred(f, self, *args, **kwargs)
+            d, generation = Cache.wait(*key)
 
-            def callback(data):
-                if isinstance(data, (dict, list)):
-                    self.request.setHeader(b'content-type', b'application/json')
-                    data = json.dumps(data, cls=JSONEncoder)
+            if d is None:
+                # No other request is rebuilding the resource
+                d = defer.maybeDeferred(f, self, *args, **kwargs)
 
-                c = self.request.responseHeaders.getRawHeaders(b'Content-type', [b'application/json'])[0]
-                return Cache.set(self.request.tid, self.request.path, self.request.language, c, data)[1]
+                def callback(data):
+                    if isinstance(data, (dict, list)):
+                        self.request.setHeader(b'content-type', b'application/json')
+                        data = json.dumps(data, cls=JSONEncoder)
 
-            d.addCallback(callback)
+                    c = self.request.responseHeaders.getRawHeaders(b'Content-type', [b'application/json'])[0]
 
-            return d
+                    # The entry is compressed off the reactor thread
+                    return deferToThread(Cache.build_entry, c, data) \
+                        .addCallback(lambda entry: Cache.store(*key, entry, self.cache_tags, generation))
 
-        else:
-            self.request.setHeader(b'Content-type', c[0])
+                def errback(failure):
+                    Cache.fail(*key, failure)
+                    return failure
+
+                d.addCallback(callback)
+                d.addErrback(errback)
 
-        return c[1]
+            return d.addCallback(lambda c: write_cached_entry(self.request, c))
+
+        return write_cached_entry(self.request, c)
 
     return wrapper
 
 
 def decorator_cache_invalidate(f):
     def wrapper(self, *args, **kwargs):
-        d = defer.maybeDeferred(f, self, *args, **kwargs)
+        def callback(result):
+            QuestionnaireCache.invalidate(self.request.tid)
 
-        if self.invalidate_cache:
-            def callback(result):
-                Cache.invalidate(self.request.tid)
+            if State.settings.enable_api_cache:
+                Cache.invalidate(self.request.tid, self.invalidate_cache_tags)
                 deferToThread(sync_refresh_tenant_cache, self.request.tid)
-                return result
 
-            d.addCallback(callback)
+            return result
+
+        ret = f(self, *args, **kwargs)
+
+        if isinstance(ret, defer.Deferred):
+            return ret.addCallback(callback)
 
-        return d
+        return callback(ret)
 
     return wrapper
 
@@ -121,13 +166,13 @@ def decorate_method(h, method):
 
     f = getattr(h, method)
 
-    if State.settings.enable_api_cache:
-        if method == 'get':
-            if h.cache_resource:
-                f = decorator_cache_get(f)
-        elif method in ['delete', 'post', 'put']:
-            if h.invalidate_cache:
-                f = decorator_cache_invalidate(f)
+    if method == 'get':
+        if h.cache_resource and State.settings.enable_api_cache:
+            f = decorator_cache_get(f)
+    elif method in ['delete', 'post', 'put']:
+        # The compiled questionnaires are invalidated even when the API cache is disabled
+        if h.invalidate_cache:
+            f = decorator_cache_invalidate(f)
 
     if method in ['delete', 'post', 'put']:
         f = decorator_require_session_or_token(f)
@@ -0,0 +1,204 @@
+# -*- coding: utf-8
+#   Router
+#   ******
+#
+#   Dispatch of the request paths to the handlers of the API
+import re
+
+
+def split_pattern(pattern):
+    """
+    Split a pattern on the slashes that are not part of a group or of a set
+
+    :param pattern: A regular expression
+    :return: The list of the segments of the pattern
+    """
+    segments, segment, depth, escape = [], '', 0, False
+
+    for c in pattern:
+        if escape:
+            escape = False
+        elif c == '\\':
+            escape = True
+        elif c in '([':
+            depth += 1
+        elif c in ')]':
+            depth -= 1
+        elif c == '/' and depth == 0:
+            segments.append(segment)
+            segment = ''
+            continue
+
+        segment += c
+
+    segments.append(segment)
+
+    return segments
+
+
+def is_literal(segment):
+    # The dot is the only metacharacter used in literal segments, e.g. robots.txt
+    return re.fullmatch(r'[a-zA-Z0-9_\-\.]*', segment) is not None
+
+
+def is_slot(segment):
+    """
+    Check if a segment is a single capturing group not matching slashes
+    """
+    if not segment.startswith('(') or not segment.endswith(')'):
+        return False
+
+    inner = segment[1:-1]
+
+    return '(' not in inner and \
+           ')' not in inner and \
+           '/' not in inner and \
+           re.search(r'(^|[^\\])\.', inner) is None
+
+
+def is_tail(segment):
+    """
+    Check if a segment is a single capturing group possibly matching slashes
+    """
+    return segment.startswith('(') and \
+           segment.endswith(')') and \
+           '(' not in segment[1:-1] and \
+           ')' not in segment[1:-1]
+
+
+class Node(object):
+    __slots__ = ['literals', 'slots', 'tails', 'route']
+
+    def __init__(self):
+        self.literals = {}
+        self.slots = {}
+        self.tails = []
+        self.route = None
+
+
+class Route(object):
+    __slots__ = ['index', 'pattern', 'handler', 'args', 'count']
+
+    def __init__(self, index, pattern, handler, args):
+        self.index = index
+        self.pattern = pattern
+        self.handler = handler
+        self.args = args
+        self.count = 0
+
+
+class Router(object):
+    """
+    Router matching the request paths against the patterns of the API
+
+    Paths are split in segments and looked up in a trie of literal segments
+    and of typed slots; the patterns that cannot be represented in the trie
+    are matched with their regular expression. When more patterns match the
+    same path the first registered one is selected.
+    """
+    def __init__(self):
+        self.root = Node()
+        self.routes = []
+        self.fallbacks = []
+        self.slot_regexps = {}
+        self.not_found = 0
+
+    def add(self, pattern, handler, args=None):
+        route = Route(len(self.routes), pattern, handler, args or {})
+        self.routes.append(route)
+
+        segments = split_pattern(pattern)
+
+        if segments[0] != '' or \
+                not all(is_literal(s) or is_slot(s) or (is_tail(s) and i == len(segments) - 1)
+                        for i, s in enumerate(segments)):
+            regexp = pattern
+            if not regexp.startswith('^'):
+                regexp = '^' + regexp
+
+            if not regexp.endswith('$'):
+                regexp += '$'
+
+            prefix = re.match(r'[a-zA-Z0-9_\-/]*', pattern.lstrip('^')).group(0)
+            self.fallbacks.append((route, prefix, re.compile(regexp)))
+            return
+
+        node = self.root
+        for i, segment in enumerate(segments[1:], 1):
+            if is_literal(segment):
+                node = node.literals.setdefault(segment, Node())
+            elif is_slot(segment):
+                node = node.slots.setdefault(segment, Node())
+                self.slot_regexps[segment] = re.compile(segment[1:-1])
+            else:
+                node.tails.append((re.compile(segment[1:-1]), route))
+                return
+
+        if node.route is None:
+            node.route = route
+
+    def _lookup(self, node, segments, i, groups):
+        best = None
+
+        if i == len(segments):
+            if node.route is not None:
+                best = node.route, groups
+
+            return best
+
+        child = node.literals.get(segments[i])
+        if child is not None:
+            best = self._lookup(child, segments, i + 1, groups)
+
+        for segment, child in node.slots.items():
+            if self.slot_regexps[segment].fullmatch(segments[i]):
+                match = self._lookup(child, segments, i + 1, groups + (segments[i],))
+                if match is not None and (best is None or match[0].index < best[0].index):
+                    best = match
+
+        for regexp, route in node.tails:
+            if best is not None and route.index > best[0].index:
+                continue
+
+            tail = '/'.join(segments[i:])
+            if regexp.fullmatch(tail):
+                best = route, groups + (tail,)
+
+        return best
+
+    def match(self, path):
+        """
+        Match a path returning the route selected and the values of its groups
+
+        :param path: The path of the request
+        :return: A tuple (route, groups) or None if the path does not match any route
+        """
+        segments = path.split('/')
+
+        best = None
+        if segments[0] == '':
+            best = self._lookup(self.root, segments, 1, ())
+
+        for route, prefix, regexp in self.fallbacks:
+            if best is not None and route.index > best[0].index:
+                break
+
+            if path.startswith(prefix):
+                match = regexp.match(path)
+                if match is not None:
+                    best = route, match.groups()
+                    break
+
+        if best is None:
+            self.not_found += 1
+            return None
+
+        best[0].count += 1
+
+        return best
+
+    def stats(self):
+        return {
+            'routes': {route.pattern: route.count for route in self.routes if route.count},
+            'not_found': self.not_found
+        }
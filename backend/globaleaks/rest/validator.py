@@ -0,0 +1,194 @@
+# -*- coding: utf-8
+#   Validator
+#   *********
+#
+# Compilation of the request descriptors of rest.requests in validation functions
+import json
+import re
+
+from threading import Lock
+
+from globaleaks.rest import errors
+from globaleaks.utils.log import log
+
+
+class ValidationError(Exception):
+    """
+    Failure of a compiled validator
+
+    The path of the invalid value is collected while the exception
+    propagates through the validators of the enclosing objects.
+    """
+    def __init__(self, reason, key=None):
+        self.reason = reason
+        self.path = [] if key is None else [key]
+
+    def __str__(self):
+        path = '.'.join(str(key) for key in reversed(self.path))
+
+        return '%s: %s' % (path, self.reason) if path else self.reason
+
+
+def compile_python_type(python_type):
+    if python_type is int:
+        def validate(value):
+            try:
+                int(value)
+            except:
+                raise ValidationError('expected int')
+
+    elif python_type is bool:
+        def validate(value):
+            if not isinstance(value, bool) and value != 'true' and value != 'false':
+                raise ValidationError('expected bool')
+
+    else:
+        reason = 'expected %s' % python_type.__name__
+
+        def validate(value):
+            if not isinstance(value, python_type):
+                raise ValidationError(reason)
+
+    return validate
+
+
+def compile_regexp(regexp):
+    match = re.compile(regexp).match
+    reason = 'failed match against %s' % regexp
+
+    def validate(value):
+        if not isinstance(value, str) or match(value) is None:
+            raise ValidationError(reason)
+
+    return validate
+
+
+def compile_list(template):
+    validate_item = compile_descriptor(template[0])
+
+    def validate(value):
+        if value is None:
+            raise ValidationError('expected list')
+
+        # empty values are accepted in place of an empty list
+        if not value:
+            return
+
+        if not isinstance(value, list):
+            raise ValidationError('expected list')
+
+        for i, item in enumerate(value):
+            try:
+                validate_item(item)
+            except ValidationError as e:
+                e.path.append(i)
+                raise
+
+    return validate
+
+
+def compile_dict(template):
+    validators = [(key, compile_descriptor(value)) for key, value in template.items()]
+    size = len(validators)
+
+    def validate(value):
+        if not isinstance(value, dict):
+            raise ValidationError('expected object')
+
+        # Strip whatever is not validated; the client may send additional
+        # attributes like the creation_date of the objects.
+        if len(value) > size:
+            for key in [key for key in value if key not in template]:
+                del value[key]
+
+        for key, validate_value in validators:
+            if key not in value:
+                raise ValidationError('missing key', key)
+
+            try:
+                validate_value(value[key])
+            except ValidationError as e:
+                e.path.append(key)
+                raise
+
+    return validate
+
+
+def compile_descriptor(template):
+    """
+    Compile a request descriptor in a validation function
+
+    :param template: A descriptor as defined in rest.requests
+    :return: A function raising ValidationError on invalid values
+    """
+    if isinstance(template, dict):
+        return compile_dict(template)
+
+    if isinstance(template, list):
+        return compile_list(template)
+
+    if isinstance(template, str):
+        return compile_regexp(template)
+
+    if callable(template):
+        return compile_python_type(template)
+
+    raise ValueError('Unsupported request descriptor %r' % template)
+
+
+class _Validators(object):
+    """
+    Registry of the validators compiled for the request descriptors
+
+    The descriptors are static objects and are indexed by identity.
+    """
+    def __init__(self):
+        self.validators = {}
+        self.lock = Lock()
+
+    def get(self, template):
+        entry = self.validators.get(id(template))
+        if entry is not None:
+            return entry[1]
+
+        validator = compile_descriptor(template)
+
+        with self.lock:
+            # The descriptor is referenced to prevent the reuse of its id
+            self.validators.setdefault(id(template), (template, validator))
+
+        return validator
+
+    def compile_module(self, module):
+        """
+        Compile all the request descriptors of a module
+        """
+        for name, value in vars(module).items():
+            if not name.startswith('_') and isinstance(value, (dict, list)):
+                self.get(value)
+
+
+Validators = _Validators()
+
+
+def validate_request(request, request_template):
+    """
+    Validate a request against a descriptor
+
+    :param request: The JSON encoded request or its decoded value
+    :param request_template: A descriptor as defined in rest.requests
+    :return: The decoded request stripped of the keys not in the descriptor
+    """
+    if not isinstance(request, (dict, list)):
+        try:
+            request = json.loads(request)
+        except:
+            raise errors.InputValidationError
+
+    try:
+        Validators.get(request_template)(request)
+    except ValidationError as e:
+        log.debug("Request validation failure: %s", e)
+        raise errors.InputValidationError(str(e))
+
+    return request
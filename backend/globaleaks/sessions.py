@@ -1,10 +1,75 @@
 # -*- coding: utf-8 -*-
+from collections import OrderedDict
+from threading import Lock
+
 from globaleaks.settings import Settings
-from globaleaks.utils.crypto import generateRandomKey
+from globaleaks.utils.crypto import GCE, generateRandomKey
 from globaleaks.utils.tempdict import TempDict
 from globaleaks.utils.utility import datetime_now, uuid4
 
 
+class TipKeyCache(object):
+    """
+    Bounded LRU cache of the tip keys decrypted within a session
+
+    The caches are accessed by the handlers and by the threads
+    of the ORM pool and are therefore protected by a shared lock
+    that also guards the hit counters.
+    """
+    lock = Lock()
+    size = 1024
+
+    # Counters aggregated across all the sessions
+    hits = 0
+    misses = 0
+
+    def __init__(self, size=None):
+        if size is not None:
+            self.size = size
+
+        self.keys = OrderedDict()
+
+    def get(self, user_key, crypto_tip_prv_key):
+        """
+        Return the tip key decrypting it only if not already cached
+
+        :param user_key: The user key to be used for decrypting the tip key
+        :param crypto_tip_prv_key: The encrypted tip key
+        :return: The decrypted tip key
+        """
+        with self.lock:
+            tip_key = self.keys.get(crypto_tip_prv_key)
+            if tip_key is not None:
+                self.keys.move_to_end(crypto_tip_prv_key)
+                TipKeyCache.hits += 1
+                return tip_key
+
+            TipKeyCache.misses += 1
+
+        tip_key = GCE.asymmetric_decrypt(user_key, crypto_tip_prv_key)
+
+        with self.lock:
+            self.keys[crypto_tip_prv_key] = tip_key
+            if len(self.keys) > self.size:
+                self.keys.popitem(last=False)
+
+        return tip_key
+
+    def clear(self):
+        with self.lock:
+            self.keys.clear()
+
+    @classmethod
+    def stats(cls):
+        total = cls.hits + cls.misses
+
+        return {
+            'hits': cls.hits,
+            'misses': cls.misses,
+            'hit_rate': cls.hits / total if total else 0
+        }
+
+
 class Session(object):
     def __init__(self, tid, user_id, user_tid, user_role, cc='', ek=''):
         self.id = generateRandomKey()
@@ -19,8 +84,12 @@ class Session(object):
         self.ratelimit_time = datetime_now()
         self.ratelimit_count = 0
         self.files = []
+        self.tip_keys = TipKeyCache()
         self.expireCall = None
 
+    def expireCallback(self):
+        self.tip_keys.clear()
+
     def getTime(self):
         return self.expireCall.getTime() if self.expireCall else 0
 
@@ -56,6 +125,7 @@ class SessionsFactory(TempDict):
     def regenerate(self, session_id):
         session = self.pop(session_id)
         session.id = generateRandomKey()
+        session.tip_keys.clear()
         self[session.id] = session
         return session
 
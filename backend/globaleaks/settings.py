@@ -5,7 +5,7 @@ import os
 import pwd
 import sys
 
-from globaleaks.orm import make_db_uri, set_db_uri, enable_orm_debug
+from globaleaks.orm import make_db_uri, set_db_uri, enable_orm_debug, enable_orm_wal
 from globaleaks.utils.singleton import Singleton
 
 this_directory = os.path.dirname(__file__)
@@ -72,6 +72,9 @@ class SettingsClass(object, metaclass=Singleton):
         # Number of minutes in which a user is prevented to login in case of triggered alarm
         self.failed_login_block_time = 5
 
+        # Number of recent events kept in memory for each tenant
+        self.events_log_limit = 1000
+
         # Limit for log sizes and number of log files
         # https://github.com/globaleaks/GlobaLeaks/issues/1578
         self.log_size = 10000000  # 10MB
@@ -84,6 +87,7 @@ class SettingsClass(object, metaclass=Singleton):
 
         self.mail_timeout = 15  # seconds
         self.mail_attempts_limit = 3  # per mail limit
+        self.mail_connections_limit = 4  # per SMTP server limit
 
         self.acme_directory_url = 'https://acme-v02.api.letsencrypt.org/directory'
 
@@ -142,6 +146,9 @@ class SettingsClass(object, metaclass=Singleton):
         if options.orm_debug:
             enable_orm_debug()
 
+        if options.orm_wal:
+            enable_orm_wal()
+
         if options.working_path:
             self.working_path = options.working_path
 
@@ -4,6 +4,8 @@ import re
 import sys
 import traceback
 
+from collections import deque
+
 from acme.errors import ValidationError
 
 from twisted.internet.defer import succeed, AlreadyCalledError, CancelledError
@@ -20,7 +22,7 @@ from globaleaks.transactions import db_schedule_email
 from globaleaks.utils.agent import get_tor_agent, get_web_agent
 from globaleaks.utils.crypto import sha256, totpVerify
 from globaleaks.utils.log import log
-from globaleaks.utils.mail import sendmail
+from globaleaks.utils.mail import SMTPPool
 from globaleaks.utils.objectdict import ObjectDict
 from globaleaks.utils.pgp import PGPContext
 from globaleaks.utils.singleton import Singleton
@@ -52,13 +54,17 @@ class TenantState(object):
         # An ACME challenge will have 5 minutes to resolve
         self.acme_tmp_chall_dict = TempDict(300)
 
+        from globaleaks.event import EventCounter
+
+        # Counters of the events of the last hour used by the anomaly checks
+        self.RecentEvents = EventCounter()
+
         self.reset_events()
 
     def reset_events(self):
         from globaleaks.anomaly import Alarm
 
-        self.RecentEventQ = []
-        self.EventQ = []
+        self.EventQ = deque(maxlen=Settings.events_log_limit)
         self.AnomaliesQ = []
         self.Alarm = Alarm()
 
@@ -95,11 +101,16 @@ class StateClass(ObjectDict, metaclass=Singleton):
         self.orm_tp = None
         self.set_orm_tp(ThreadPool(4, 16))
 
+        self.orm_ro_tp = None
+        self.set_orm_ro_tp(ThreadPool(4, 16))
+
         self.tokens = TokenList(60)
         self.TempKeys = TempDict(3600 * 72)
         self.TwoFactorTokens = TempDict(120)
         self.TempUploadFiles = TempDict(3600)
 
+        self.smtp_pools = {}
+
         self.shutdown = False
 
     def init_environment(self):
@@ -111,6 +122,10 @@ class StateClass(ObjectDict, metaclass=Singleton):
         self.orm_tp = orm_tp
         orm.set_thread_pool(orm_tp)
 
+    def set_orm_ro_tp(self, orm_ro_tp):
+        self.orm_ro_tp = orm_ro_tp
+        orm.set_ro_thread_pool(orm_ro_tp)
+
     def get_agent(self):
         if 1 not in self.tenants or self.tenants[1].cache.anonymize_outgoing_connections:
             return get_tor_agent(self.settings.socks_port)
@@ -184,6 +199,33 @@ class StateClass(ObjectDict, metaclass=Singleton):
 
         self.stats_collection_start_time = datetime_now()
 
+    def get_smtp_pool(self, tid):
+        """
+        Return the pool of the connections to the SMTP server of a tenant
+
+        Pools are reused as long as the SMTP configuration is not changed
+        """
+        notification = self.tenants[tid].cache.notification
+
+        key = (notification.smtp_server,
+               notification.smtp_port,
+               notification.smtp_security,
+               notification.smtp_authentication,
+               notification.smtp_username,
+               notification.smtp_password,
+               notification.smtp_source_email,
+               self.tenants[1].cache.anonymize_outgoing_connections)
+
+        pool = self.smtp_pools.get(tid)
+        if pool is None or pool.key != key:
+            pool = self.smtp_pools[tid] = SMTPPool(tid, *key[:7],
+                                                   anonymize=key[7],
+                                                   socks_port=self.settings.socks_port,
+                                                   connections_limit=self.settings.mail_connections_limit)
+            pool.key = key
+
+        return pool
+
     def sendmail(self, tid, to_address, subject, body):
         if self.settings.disable_notifications:
             return succeed(True)
@@ -191,20 +233,15 @@ class StateClass(ObjectDict, metaclass=Singleton):
         if self.tenants[tid].cache.mode != 'default':
             tid = 1
 
-        return sendmail(tid,
-                        self.tenants[tid].cache.notification.smtp_server,
-                        self.tenants[tid].cache.notification.smtp_port,
-                        self.tenants[tid].cache.notification.smtp_security,
-                        self.tenants[tid].cache.notification.smtp_authentication,
-                        self.tenants[tid].cache.notification.smtp_username,
-                        self.tenants[tid].cache.notification.smtp_password,
-                        self.tenants[tid].cache.name,
-                        self.tenants[tid].cache.notification.smtp_source_email,
-                        to_address,
-                        self.tenants[tid].cache.name + ' - ' + subject,
-                        body,
-                        self.tenants[1].cache.anonymize_outgoing_connections,
-                        self.settings.socks_port)
+        try:
+            return self.get_smtp_pool(tid).send(self.tenants[tid].cache.name,
+                                                to_address,
+                                                self.tenants[tid].cache.name + ' - ' + subject,
+                                                body)
+        except Exception as e:
+            # avoids raising an exception inside email logic to avoid chained errors
+            log.err("Unexpected exception in sendmail: %s", e, tid=tid)
+            return succeed(False)
 
     def schedule_support_email(self, tid, text):
         subject = "Support request"
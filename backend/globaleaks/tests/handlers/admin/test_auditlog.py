@@ -1,10 +1,71 @@
 # -*- coding: utf-8 -*-
+import json
+
 from twisted.internet.defer import inlineCallbacks
 
 from globaleaks.handlers.admin import auditlog
+from globaleaks.orm import db_log, transact
 from globaleaks.tests import helpers
 
 
+class TestAuditLog(helpers.TestHandlerWithPopulatedDB):
+    _handler = auditlog.AuditLog
+
+    @transact
+    def add_logs(self, session, n):
+        for i in range(n):
+            db_log(session, tid=1, type='test', object_id=str(i))
+
+    @inlineCallbacks
+    def setUp(self):
+        yield helpers.TestHandlerWithPopulatedDB.setUp(self)
+        yield self.add_logs(25)
+
+    @inlineCallbacks
+    def test_get(self):
+        handler = self.request({}, role='admin')
+        response = yield handler.get()
+
+        self.assertTrue(isinstance(response, list))
+        self.assertEqual(len([x for x in response if x['type'] == 'test']), 25)
+
+    @inlineCallbacks
+    def test_get_paginated(self):
+        entries = []
+        cursor = b''
+
+        while True:
+            handler = self.request({}, role='admin', args={b'type': [b'test'], b'limit': [b'10'], b'cursor': [cursor]})
+            response = yield handler.get()
+            entries.extend(response['entries'])
+            if response['cursor'] is None:
+                break
+
+            cursor = response['cursor'].encode()
+
+        self.assertEqual(len(entries), 25)
+        self.assertEqual(len(set(x['object_id'] for x in entries)), 25)
+        self.assertEqual(entries, sorted(entries, key=lambda x: x['date'], reverse=True))
+
+    @inlineCallbacks
+    def test_get_ndjson(self):
+        handler = self.request({}, role='admin', args={b'type': [b'test'], b'format': [b'ndjson']})
+        yield handler.get()
+
+        lines = handler.request.getResponseBody().decode().splitlines()
+        self.assertEqual(len(lines), 25)
+        self.assertEqual(json.loads(lines[0])['type'], 'test')
+
+    @inlineCallbacks
+    def test_get_csv(self):
+        handler = self.request({}, role='admin', args={b'type': [b'test'], b'format': [b'csv']})
+        yield handler.get()
+
+        lines = handler.request.getResponseBody().decode().splitlines()
+        self.assertEqual(lines[0], ','.join(auditlog.AUDIT_LOG_FIELDS))
+        self.assertEqual(len(lines), 26)
+
+
 class TestTipsCollection(helpers.TestHandlerWithPopulatedDB):
     _handler = auditlog.TipsCollection
 
@@ -27,3 +88,21 @@ class TestJobsTiming(helpers.TestHandler):
         handler = self.request({}, role='admin')
 
         yield handler.get()
+
+
+class TestMetrics(helpers.TestHandler):
+    _handler = auditlog.Metrics
+
+    @inlineCallbacks
+    def test_get(self):
+        handler = self.request({}, role='admin')
+
+        response = yield handler.get()
+
+        self.assertEqual(response['argon2']['queued'], 0)
+        self.assertIn('hit_rate', response['tip_keys'])
+        self.assertIn('hits', response['pgp'])
+        self.assertEqual(response['orm']['lock_failures'], 0)
+        self.assertEqual(response['delivery']['in_progress'], {})
+        self.assertIn('pending', response['secure_deletion'])
+        self.assertIn('files', response['static'])
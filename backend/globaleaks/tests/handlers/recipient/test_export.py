@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+from io import BytesIO
+from zipfile import ZipFile
 
 from globaleaks.handlers.recipient import export
 from globaleaks.jobs.delivery import Delivery
@@ -32,3 +34,20 @@ class TestExportHandler(helpers.TestHandlerWithPopulatedDB):
 
         yield handler.get(rtips_desc[0]['id'])
         self.assertNotEqual(handler.request.getResponseBody(), b'')
+
+
+class TestExportHandlerWithoutPGP(TestExportHandler):
+    pgp_configuration = 'NONE'
+
+    @inlineCallbacks
+    def test_export(self):
+        rtips_desc = yield self.get_rtips()
+
+        handler = self.request({}, role='receiver')
+        handler.session.user_id = rtips_desc[0]['receiver_id']
+
+        yield handler.get(rtips_desc[0]['id'])
+
+        with ZipFile(BytesIO(handler.request.getResponseBody()), 'r') as f:
+            self.assertIsNone(f.testzip())
+            self.assertIn('report.txt', f.namelist())
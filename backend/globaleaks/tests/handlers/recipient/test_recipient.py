@@ -4,6 +4,7 @@ from twisted.internet.defer import inlineCallbacks
 from globaleaks import models
 from globaleaks.handlers import recipient
 from globaleaks.orm import transact
+from globaleaks.sessions import TipKeyCache
 from globaleaks.tests import helpers
 from globaleaks.utils.utility import datetime_never
 
@@ -29,6 +30,70 @@ class TestTipsCollection(helpers.TestHandlerWithPopulatedDB):
             self.assertEqual(rtips[idx]['file_count'], 2)
             self.assertEqual(rtips[idx]['comment_count'], 3)
 
+    @inlineCallbacks
+    def test_get_with_tip_key_cache(self):
+        handler = self.request(user_id=self.dummyReceiver_1['id'], role='receiver')
+        rtips = yield handler.get()
+
+        hits = TipKeyCache.hits
+        misses = TipKeyCache.misses
+
+        rtips = yield handler.get()
+
+        self.assertEqual(TipKeyCache.hits - hits, len(rtips))
+        self.assertEqual(TipKeyCache.misses, misses)
+
+        handler.session.expireCallback()
+        self.assertEqual(len(handler.session.tip_keys.keys), 0)
+
+    @inlineCallbacks
+    def test_get_paginated(self):
+        rtips = yield recipient.get_receivertips(1, self.dummyReceiver_1['id'], helpers.USER_PRV_KEY, 'en')
+
+        ids = []
+        cursor = b''
+        while True:
+            handler = self.request(user_id=self.dummyReceiver_1['id'], role='receiver')
+            handler.request.args = {b'limit': [b'1'], b'cursor': [cursor]}
+            response = yield handler.get()
+
+            self.assertTrue(len(response['tips']) <= 1)
+            for rtip in response['tips']:
+                self.assertEqual(rtip['file_count'], 2)
+                self.assertEqual(rtip['comment_count'], 3)
+                self.assertIn('answers', rtip)
+                ids.append(rtip['id'])
+
+            if response['cursor'] is None:
+                break
+
+            cursor = response['cursor'].encode()
+
+        self.assertEqual(sorted(ids), sorted(rtip['id'] for rtip in rtips))
+
+    @inlineCallbacks
+    def test_get_summary_and_delta(self):
+        handler = self.request(user_id=self.dummyReceiver_1['id'], role='receiver')
+        handler.request.args = {b'summary': [b'1']}
+        response = yield handler.get()
+
+        self.assertTrue(len(response['tips']) > 0)
+        for rtip in response['tips']:
+            self.assertNotIn('answers', rtip)
+
+        handler = self.request(user_id=self.dummyReceiver_1['id'], role='receiver')
+        handler.request.args = {b'summary': [b'1'], b'sync_token': [b'30000101000000000000']}
+        delta = yield handler.get()
+
+        self.assertEqual(delta['tips'], [])
+        self.assertEqual(sorted(delta['ids']), sorted(rtip['id'] for rtip in response['tips']))
+
+        handler = self.request(user_id=self.dummyReceiver_1['id'], role='receiver')
+        handler.request.args = {b'sync_token': [b'19700101000000000000']}
+        delta = yield handler.get()
+
+        self.assertEqual(len(delta['tips']), len(response['tips']))
+
 
 class TestOperations(helpers.TestHandlerWithPopulatedDB):
     _handler = recipient.Operations
@@ -1,8 +1,14 @@
 # -*- coding: utf-8 -*-
+import gzip
+import json
+
 from twisted.internet.defer import inlineCallbacks
 
+from globaleaks.handlers import public
+from globaleaks.rest import decorators
 from globaleaks.rest.cache import Cache
 from globaleaks.tests import helpers
+from globaleaks.utils.crypto import sha256
 
 
 class TestCache(helpers.TestGL):
@@ -12,6 +18,11 @@ class TestCache(helpers.TestGL):
 
         Cache.invalidate()
 
+    def tearDown(self):
+        Cache.max_size = 64 * 1024 * 1024
+
+        return helpers.TestGL.tearDown(self)
+
     def test_cache(self):
         self.assertEqual(Cache.memory_cache_dict, {})
         self.assertIsNone(Cache.get(1, "passante_di_professione", "it"))
@@ -20,11 +31,128 @@ class TestCache(helpers.TestGL):
         Cache.set(1, "passante_di_professione", "it", 'text/plain', 'ititit')
         Cache.set(1, "passante_di_professione", "en", 'text/plain', 'enenen')
         Cache.set(2, "passante_di_professione", "ca", 'text/plain', 'cacaca')
-        self.assertTrue("passante_di_professione" in Cache.memory_cache_dict[1])
-        self.assertTrue("passante_di_professione" in Cache.memory_cache_dict[2])
-        self.assertIsNone(Cache.get(1, "passante_di_professione", "ca"))
-        self.assertTrue("it" in Cache.memory_cache_dict[1]['passante_di_professione'])
-        self.assertTrue("en" in Cache.memory_cache_dict[1]['passante_di_professione'])
+        self.assertEqual(Cache.get(1, "passante_di_professione", "it")[:2], ('text/plain', b'ititit'))
+        self.assertEqual(Cache.get(1, "passante_di_professione", "en")[:2], ('text/plain', b'enenen'))
+        self.assertEqual(Cache.get(2, "passante_di_professione", "ca")[:2], ('text/plain', b'cacaca'))
         self.assertIsNone(Cache.get(1, "passante_di_professione", "ca"))
+        Cache.invalidate(2)
+        self.assertIsNone(Cache.get(2, "passante_di_professione", "ca"))
+        self.assertIsNotNone(Cache.get(1, "passante_di_professione", "it"))
         Cache.invalidate()
         self.assertEqual(Cache.memory_cache_dict, {})
+
+    def test_cache_tags(self):
+        Cache.set(1, "public", "en", 'application/json', 'a', ['node', 'contexts'])
+        Cache.set(2, "public", "en", 'application/json', 'b', ['node', 'contexts'])
+        Cache.set(2, "l10n", "en", 'application/json', 'c', ['l10n'])
+
+        Cache.invalidate(2, ['contexts'])
+        self.assertIsNone(Cache.get(2, "public", "en"))
+        self.assertIsNotNone(Cache.get(1, "public", "en"))
+        self.assertIsNotNone(Cache.get(2, "l10n", "en"))
+
+        Cache.set(2, "public", "en", 'application/json', 'b', ['node', 'contexts'])
+
+        # The contexts of the root tenant are not shared with the other tenants
+        Cache.invalidate(1, ['contexts'])
+        self.assertIsNone(Cache.get(1, "public", "en"))
+        self.assertIsNotNone(Cache.get(2, "public", "en"))
+
+        # The node of the root tenant is shared with the other tenants
+        Cache.invalidate(1, ['node'])
+        self.assertIsNone(Cache.get(2, "public", "en"))
+        self.assertIsNotNone(Cache.get(2, "l10n", "en"))
+
+    def test_cache_eviction(self):
+        entry = Cache.set(1, "x", "en", 'text/plain', '12345')
+        Cache.invalidate()
+
+        Cache.max_size = 2 * (len(entry[1]) + len(entry[3]))
+
+        evictions = Cache.evictions
+
+        Cache.set(1, "a", "en", 'text/plain', '12345')
+        Cache.set(1, "b", "en", 'text/plain', '12345')
+        Cache.get(1, "a", "en")
+        Cache.set(1, "c", "en", 'text/plain', '12345')
+
+        self.assertEqual(Cache.evictions - evictions, 1)
+        self.assertIsNone(Cache.get(1, "b", "en"))
+        self.assertIsNotNone(Cache.get(1, "a", "en"))
+        self.assertIsNotNone(Cache.get(1, "c", "en"))
+        self.assertEqual(Cache.size, Cache.max_size)
+
+    def test_cache_coalescing(self):
+        d, generation = Cache.wait(1, "public", "en")
+        self.assertIsNone(d)
+
+        results = []
+        for _ in range(3):
+            d, _ = Cache.wait(1, "public", "en")
+            d.addCallback(results.append)
+
+        Cache.set(1, "public", "en", 'text/plain', 'data', (), generation)
+
+        self.assertEqual([x[:2] for x in results], [('text/plain', b'data')] * 3)
+        self.assertEqual(Cache.get(1, "public", "en")[:2], ('text/plain', b'data'))
+
+        # Entries rebuilt across an invalidation are not stored
+        d, generation = Cache.wait(1, "public", "en")
+        Cache.invalidate(1)
+        Cache.set(1, "public", "en", 'text/plain', 'data', (), generation)
+        self.assertIsNone(Cache.get(1, "public", "en"))
+
+    def test_cache_entry(self):
+        content_type, data, etag, gzip_data, gzip_etag = Cache.set(1, "public", "en", 'application/json', '{}')
+
+        self.assertEqual(data, b'{}')
+        self.assertEqual(etag, b'"' + sha256(b'{}') + b'"')
+        self.assertEqual(gzip.decompress(gzip_data), data)
+        self.assertEqual(gzip_etag, b'"' + sha256(b'{}') + b'-gz"')
+
+
+class TestCachedResource(helpers.TestHandlerWithPopulatedDB):
+    _handler = public.PublicResource
+
+    @inlineCallbacks
+    def setUp(self):
+        yield helpers.TestHandlerWithPopulatedDB.setUp(self)
+
+        Cache.invalidate()
+
+    @inlineCallbacks
+    def test_get(self):
+        get = decorators.decorator_cache_get(public.PublicResource.get)
+
+        handler = self.request()
+        data = yield get(handler)
+        etag = handler.request.responseHeaders.getRawHeaders(b'ETag')[0]
+        self.assertEqual(handler.request.responseHeaders.getRawHeaders(b'Vary'), [b'Accept-Encoding'])
+        self.assertEqual(json.loads(data), json.loads(Cache.get(1, handler.request.path, handler.request.language)[1]))
+        self.assertFalse(handler.request.precompressed)
+
+        handler = self.request(headers={b'if-none-match': b'W/"x", ' + etag})
+        data = get(handler)
+        self.assertIsNone(data)
+        self.assertEqual(handler.request.responseCode, 304)
+        self.assertTrue(handler.request.precompressed)
+
+        handler = self.request()
+        handler.request.responseHeaders.setRawHeaders(b'content-encoding', [b'gzip'])
+        data = get(handler)
+        gzip_etag = handler.request.responseHeaders.getRawHeaders(b'ETag')[0]
+        self.assertEqual(gzip.decompress(data), Cache.get(1, handler.request.path, handler.request.language)[1])
+        self.assertTrue(handler.request.precompressed)
+        self.assertNotEqual(gzip_etag, etag)
+        self.assertEqual(handler.request.responseHeaders.getRawHeaders(b'Vary'), [b'Accept-Encoding'])
+
+        # The ETag of the identity representation does not match the gzip one
+        handler = self.request(headers={b'if-none-match': etag})
+        handler.request.responseHeaders.setRawHeaders(b'content-encoding', [b'gzip'])
+        data = get(handler)
+        self.assertEqual(gzip.decompress(data), Cache.get(1, handler.request.path, handler.request.language)[1])
+
+        handler = self.request(headers={b'if-none-match': gzip_etag})
+        handler.request.responseHeaders.setRawHeaders(b'content-encoding', [b'gzip'])
+        self.assertIsNone(get(handler))
+        self.assertEqual(handler.request.responseCode, 304)
@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
 import json
 
+from globaleaks import models
 from globaleaks.handlers import public
+from globaleaks.handlers.admin import step
+from globaleaks.orm import transact
 from globaleaks.rest import requests
+from globaleaks.rest.cache import QuestionnaireCache
 from globaleaks.tests import helpers
 from twisted.internet.defer import inlineCallbacks
 
@@ -16,3 +20,27 @@ class TestPublicResource(helpers.TestHandlerWithPopulatedDB):
         response = yield handler.get()
 
         self._handler.validate_request(json.dumps(response, default=str), requests.PublicResourcesDesc)
+
+    @inlineCallbacks
+    def test_compiled_questionnaires(self):
+        @transact
+        def serialize_questionnaires(session):
+            ret = []
+
+            for questionnaire in session.query(models.Questionnaire):
+                compiled = public.db_get_compiled_questionnaire(session, 1, questionnaire, True)
+                ret.append((public.localize_questionnaire(compiled['questionnaire'], 'en'),
+                            public.serialize_questionnaire(session, 1, questionnaire, 'en', True)))
+
+            return ret
+
+        for compiled, serialized in (yield serialize_questionnaires()):
+            self.assertEqual(compiled, serialized)
+
+        self.assertTrue(QuestionnaireCache.memory_cache_dict[1])
+
+        handler = self.request(role='admin', handler_cls=step.StepInstance,
+                               body=self.dummyQuestionnaire['steps'][0])
+        yield handler.put(self.dummyQuestionnaire['steps'][0]['id'])
+
+        self.assertNotIn(1, QuestionnaireCache.memory_cache_dict)
@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
+import os
+
 from twisted.internet.defer import inlineCallbacks
 
-from globaleaks.handlers.staticfile import StaticFileHandler
+from globaleaks.handlers.staticfile import StaticFileHandler, StaticFiles
 from globaleaks.rest import errors
+from globaleaks.settings import Settings
 from globaleaks.tests import helpers
 
 
@@ -19,3 +22,88 @@ class TestStaticFileHandler(helpers.TestHandler):
         handler = self.request()
 
         return self.assertRaises(errors.ResourceNotFound, handler.get, 'unexistent')
+
+    @inlineCallbacks
+    def test_get_precompressed(self):
+        root = os.path.join(Settings.working_path, 'client') + '/'
+        os.makedirs(root, exist_ok=True)
+
+        for filename, content in [('app.js', b'plain'), ('app.js.gz', b'gzip'), ('app.js.br', b'br')]:
+            with open(os.path.join(root, filename), 'wb') as f:
+                f.write(content)
+
+        for accept_encoding, content_encoding, body in [(b'gzip, deflate, br', b'br', b'br'),
+                                                        (b'gzip, deflate', b'gzip', b'gzip'),
+                                                        (b'identity', None, b'plain')]:
+            handler = self.request(headers={b'accept-encoding': accept_encoding})
+            handler.root = root
+            yield handler.get('app.js')
+
+            self.assertEqual(handler.request.getResponseBody(), body)
+            self.assertEqual(handler.request.responseHeaders.getRawHeaders(b'content-type'), [b'text/javascript'])
+            self.assertEqual(handler.request.responseHeaders.getRawHeaders(b'content-encoding'),
+                             [content_encoding] if content_encoding else None)
+            self.assertEqual(handler.request.precompressed, content_encoding is not None)
+
+    def write_client_file(self, filename, content):
+        root = os.path.join(Settings.working_path, 'client') + '/'
+        os.makedirs(root, exist_ok=True)
+
+        with open(os.path.join(root, filename), 'wb') as f:
+            f.write(content)
+
+        return root
+
+    @inlineCallbacks
+    def test_get_not_modified(self):
+        handler = self.request()
+        yield handler.get('')
+        etag = handler.request.responseHeaders.getRawHeaders(b'etag')[0]
+        self.assertEqual(handler.request.responseHeaders.getRawHeaders(b'cache-control'), [b'no-cache'])
+
+        handler = self.request(headers={b'if-none-match': etag})
+        yield handler.get('')
+        self.assertEqual(handler.request.responseCode, 304)
+        self.assertEqual(handler.request.written, [])
+
+    @inlineCallbacks
+    def test_get_fingerprinted(self):
+        root = self.write_client_file('main.0123456789abcdef.js', b'fingerprinted')
+
+        handler = self.request()
+        handler.root = root
+        yield handler.get('main.0123456789abcdef.js')
+
+        self.assertEqual(handler.request.getResponseBody(), b'fingerprinted')
+        self.assertEqual(handler.request.responseHeaders.getRawHeaders(b'cache-control'),
+                         [b'public, max-age=31536000, immutable'])
+
+    @inlineCallbacks
+    def test_get_refresh(self):
+        root = self.write_client_file('refresh.js', b'before')
+
+        handler = self.request()
+        handler.root = root
+        yield handler.get('refresh.js')
+        etag = handler.request.responseHeaders.getRawHeaders(b'etag')[0]
+
+        path = os.path.join(root, 'refresh.js')
+        self.write_client_file('refresh.js', b'after!')
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1000000000))
+
+        # Production serves the indexed content
+        self.assertEqual(StaticFiles.get(root, 'refresh.js').etag, etag)
+
+        # Devel mode checks the file on disk at each request
+        handler = self.request(headers={b'if-none-match': etag})
+        handler.root = root
+        yield handler.get('refresh.js')
+
+        self.assertNotEqual(handler.request.responseCode, 304)
+        self.assertEqual(handler.request.getResponseBody(), b'after!')
+        self.assertNotEqual(handler.request.responseHeaders.getRawHeaders(b'etag')[0], etag)
+
+        os.remove(path)
+        handler = self.request()
+        handler.root = root
+        self.assertRaises(errors.ResourceNotFound, handler.get, 'refresh.js')
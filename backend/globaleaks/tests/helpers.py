@@ -39,6 +39,7 @@ from globaleaks.handlers.whistleblower.submission import create_submission
 from globaleaks.models import serializers
 from globaleaks.models.config import db_set_config_variable, ConfigFactory
 from globaleaks.rest import decorators
+from globaleaks.rest.cache import QuestionnaireCache
 from globaleaks.rest.api import JSONEncoder
 from globaleaks.sessions import initialize_submission_session, Sessions
 from globaleaks.settings import Settings
@@ -145,6 +146,7 @@ def init_state():
         shutil.rmtree(Settings.working_path)
 
     orm.set_thread_pool(FakeThreadPool())
+    orm.set_ro_thread_pool(FakeThreadPool())
 
     State.settings.enable_api_cache = False
     State.tenants[1] = TenantState()
@@ -503,6 +505,7 @@ def forge_request(uri=b'https://www.globaleaks.org/',
     request.port = 8443
     request.language = 'en'
     request.multilang = False
+    request.precompressed = False
 
     def isSecure():
         if request.port == 8443:
@@ -522,6 +525,15 @@ def forge_request(uri=b'https://www.globaleaks.org/',
 
     request.getResponseBody = getResponseBody
 
+    registerProducer = request.registerProducer
+
+    def registerStreamingProducer(producer, streaming):
+        # push producers drive themselves once registered
+        if not streaming:
+            registerProducer(producer, streaming)
+
+    request.registerProducer = registerStreamingProducer
+
     if client_addr is None:
         request.client = IPv4Address('TCP', b'1.2.3.4', 12345)
     else:
@@ -579,6 +591,8 @@ class TestGL(unittest.TestCase):
 
         init_state()
 
+        QuestionnaireCache.invalidate()
+
         self.setUp_dummy()
 
         if self.initialize_test_database_using_archived_db:
@@ -733,7 +747,7 @@ class TestGL(unittest.TestCase):
             for event_obj in event.events_monitored:
                 for x in range(2):
                     e = event.Event(event_obj, timedelta(seconds=1.0 * x))
-                    self.state.tenants[1].RecentEventQ.append(e)
+                    self.state.tenants[1].RecentEvents.increment(e.event_type)
                     self.state.tenants[1].EventQ.append(e)
 
     @transact
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+import os
+
+from globaleaks.jobs import delivery
+from globaleaks.jobs.delivery import Delivery, DeliveryPool
+from globaleaks.settings import Settings
+from globaleaks.tests import helpers
+from globaleaks.utils.crypto import GCE
+from globaleaks.utils.pgp import PGPContext
+from globaleaks.utils.securetempfile import SecureTemporaryFile
+
+
+class TestDeliveryPool(helpers.TestGL):
+    content = os.urandom(300 * 1024)
+
+    def setUp(self):
+        self.retry_delay = DeliveryPool.retry_delay
+        DeliveryPool.retry_delay = 0
+
+        return helpers.TestGL.setUp(self)
+
+    def tearDown(self):
+        DeliveryPool.retry_delay = self.retry_delay
+
+        return helpers.TestGL.tearDown(self)
+
+    def get_tmp_file(self):
+        sf = SecureTemporaryFile(Settings.tmp_path)
+
+        with sf.open('w'):
+            sf.write(self.content)
+            sf.finalize_write()
+
+        return sf
+
+    def read_encrypted_file(self, key, path):
+        data = b''
+
+        with GCE.streaming_encryption_open('DECRYPT', key, path) as seo:
+            while True:
+                last, chunk = seo.decrypt_chunk()
+                data += chunk
+                if last:
+                    return data
+
+    def test_deliver(self):
+        pgpctx = PGPContext(helpers.PGPKEYS['VALID_PGP_KEY1_PRV'])
+
+        targets = [
+            {'key': helpers.USER_PUB_KEY, 'dst': os.path.join(Settings.attachments_path, 'a')},
+            {'key': None, 'dst': os.path.join(Settings.attachments_path, 'b'),
+             'pgp_key_public': helpers.PGPKEYS['VALID_PGP_KEY1_PUB']},
+            {'key': None, 'dst': os.path.join(Settings.attachments_path, 'c')}
+        ]
+
+        stats = DeliveryPool.stats()
+
+        DeliveryPool.deliver([('x', self.get_tmp_file(), targets)])
+
+        self.assertEqual(self.read_encrypted_file(helpers.USER_PRV_KEY, targets[0]['dst']), self.content)
+
+        with open(targets[1]['dst'], 'rb') as f:
+            self.assertEqual(pgpctx.gnupg.decrypt_file(f).data, self.content)
+
+        with open(targets[2]['dst'], 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+
+        self.assertEqual(DeliveryPool.stats()['delivered'] - stats['delivered'], 1)
+        self.assertEqual(DeliveryPool.stats()['bytes'] - stats['bytes'], 3 * len(self.content))
+        self.assertEqual(DeliveryPool.stats()['in_progress'], {})
+
+    def test_deliver_retry(self):
+        attempts = []
+        write_file = delivery.write_file
+
+        def failing_write_file(target, chunks):
+            if target['dst'].endswith('b') and target['dst'] not in attempts:
+                attempts.append(target['dst'])
+                raise Exception("failure")
+
+            attempts.append(target['dst'])
+
+            return write_file(target, chunks)
+
+        self.patch(delivery, 'write_file', failing_write_file)
+
+        targets = [
+            {'key': None, 'dst': os.path.join(Settings.attachments_path, 'a')},
+            {'key': None, 'dst': os.path.join(Settings.attachments_path, 'b')}
+        ]
+
+        stats = DeliveryPool.stats()
+
+        DeliveryPool.deliver([('x', self.get_tmp_file(), targets)])
+
+        # Only the failed destination is retried
+        self.assertEqual(len(attempts), 3)
+
+        for target in targets:
+            with open(target['dst'], 'rb') as f:
+                self.assertEqual(f.read(), self.content)
+
+        self.assertEqual(DeliveryPool.stats()['retries'] - stats['retries'], 1)
+        self.assertEqual(DeliveryPool.stats()['errors'] - stats['errors'], 1)
+        self.assertEqual(DeliveryPool.stats()['delivered'] - stats['delivered'], 1)
+
+    def test_deliver_failure(self):
+        targets = [{'key': None, 'dst': os.path.join(Settings.attachments_path, 'missing', 'a')}]
+
+        stats = DeliveryPool.stats()
+
+        DeliveryPool.deliver([('x', self.get_tmp_file(), targets),
+                              ('y', None, targets)])
+
+        self.assertEqual(DeliveryPool.stats()['retries'] - stats['retries'], DeliveryPool.max_attempts - 1)
+        self.assertEqual(DeliveryPool.stats()['failed'] - stats['failed'], 2)
+
+
+class TestDelivery(helpers.TestGL):
+    def test_adapt_batch_size(self):
+        job = Delivery()
+        job.stop()
+
+        job.adapt_batch_size(job.batch_size, 1)
+        self.assertEqual(job.batch_size, 40)
+
+        job.adapt_batch_size(10, 1)
+        self.assertEqual(job.batch_size, 40)
+
+        job.adapt_batch_size(10, job.interval * 5)
+        self.assertEqual(job.batch_size, 20)
+
+        for _ in range(10):
+            job.adapt_batch_size(job.batch_size, 1)
+
+        self.assertEqual(job.batch_size, job.max_batch_size)
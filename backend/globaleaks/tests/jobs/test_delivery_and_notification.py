@@ -5,6 +5,7 @@ from twisted.internet.defer import inlineCallbacks
 from globaleaks import models
 from globaleaks.jobs.delivery import Delivery
 from globaleaks.jobs.notification import Notification
+from globaleaks.models import serializers
 from globaleaks.orm import transact
 from globaleaks.state import State
 from globaleaks.tests import helpers
@@ -97,3 +98,64 @@ class TestNotification(helpers.TestGLWithPopulatedDB):
         yield notification.spool_emails()
 
         yield self.test_model_count(models.Mail, 0)
+
+    @inlineCallbacks
+    def test_notification_serialization_failure(self):
+        yield self.perform_full_submission_actions()
+        yield Delivery().run()
+
+        serialize_rtips = serializers.serialize_rtips
+        failures = []
+
+        def broken_serialize_rtips(session, tips, language):
+            raise Exception('antani')
+
+        def broken_serialize_rtip(session, itip, rtip, language):
+            if not failures:
+                failures.append(rtip.id)
+                raise Exception('antani')
+
+            return serialize_rtips(session, [(itip, rtip)], language)[0]
+
+        self.patch(serializers, 'serialize_rtips', broken_serialize_rtips)
+        self.patch(serializers, 'serialize_rtip', broken_serialize_rtip)
+
+        notification = Notification()
+        notification.skip_sleep = True
+
+        yield notification.generate_emails()
+
+        # Only the notification of the tip that cannot be serialized is skipped
+        self.assertEqual(len(failures), 1)
+        yield self.test_model_count(models.Mail, 3)
+
+
+@transact
+def set_pgp_key(session, user_id, pgp_key_public):
+    session.query(models.User).filter(models.User.id == user_id).one().pgp_key_public = pgp_key_public
+
+
+@transact
+def get_mail_bodies(session):
+    return [mail.body for mail in session.query(models.Mail)]
+
+
+class TestNotificationWithPGP(helpers.TestGLWithPopulatedDB):
+    @inlineCallbacks
+    def test_notification(self):
+        for receiver in [self.dummyReceiver_1, self.dummyReceiver_2]:
+            yield set_pgp_key(receiver['id'], helpers.PGPKEYS['VALID_PGP_KEY1_PUB'])
+
+        yield self.perform_full_submission_actions()
+        yield Delivery().run()
+
+        notification = Notification()
+        notification.skip_sleep = True
+
+        yield notification.generate_emails()
+
+        bodies = yield get_mail_bodies()
+
+        self.assertEqual(len(bodies), 4)
+        for body in bodies:
+            self.assertTrue(body.startswith('-----BEGIN PGP MESSAGE-----'))
@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+from sqlalchemy import event
+
 from globaleaks import models
 from globaleaks.models import config
 from globaleaks.orm import transact
@@ -30,3 +32,45 @@ class TestModels(helpers.TestGL):
             config.ConfigFactory(session, 1).update_defaults()
 
         return transaction()
+
+    def test_get_vals(self):
+        @transact
+        def transaction(session):
+            session.query(models.Config).filter(models.Config.tid == 1, models.Config.var_name == 'threshold_free_disk_megabytes_high').delete()
+
+            node = config.ConfigFactory(session, 1)
+            names = ['name', 'https_enabled', 'threshold_free_disk_megabytes_high']
+            values = node.get_vals(names)
+
+            self.assertEqual(list(values), names)
+            for name in names:
+                self.assertEqual(values[name], node.get_val(name))
+
+            l10n = config.ConfigL10NFactory(session, 1)
+            values = l10n.get_vals(['header_title_homepage', 'undefined'], 'en')
+            self.assertEqual(values['header_title_homepage'], l10n.get_val('header_title_homepage', 'en'))
+            self.assertEqual(values['undefined'], '')
+
+        return transaction()
+
+    def test_get_vals_queries(self):
+        names = ['version', 'version_db', 'latest_version', 'default_language', 'onionservice', 'disable_privacy_badge']
+
+        @transact
+        def transaction(session):
+            statements = []
+
+            def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+                statements.append(statement)
+
+            engine = session.get_bind()
+            event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+            try:
+                config.ConfigFactory(session, 1).get_vals(names)
+            finally:
+                event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+            # The values are loaded with a single query
+            self.assertEqual(len(statements), 1)
+
+        return transaction()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from sqlalchemy import event
+from twisted.internet.defer import inlineCallbacks
+
+from globaleaks import models
+from globaleaks.models import serializers
+from globaleaks.orm import transact
+from globaleaks.tests import helpers
+
+
+@transact
+def serialize_rtips(session, limit=None):
+    queries = []
+
+    def count_query(*args, **kwargs):
+        queries.append(args[2])
+
+    tips = session.query(models.InternalTip, models.ReceiverTip) \
+                  .filter(models.InternalTip.id == models.ReceiverTip.internaltip_id) \
+                  .order_by(models.ReceiverTip.id).limit(limit).all()
+
+    connection = session.connection()
+    event.listen(connection, 'before_cursor_execute', count_query)
+    try:
+        bulk = serializers.serialize_rtips(session, tips, 'en')
+    finally:
+        event.remove(connection, 'before_cursor_execute', count_query)
+
+    single = [serializers.serialize_rtip(session, itip, rtip, 'en') for itip, rtip in tips]
+
+    return len(queries), bulk, single
+
+
+class TestSerializers(helpers.TestGLWithPopulatedDB):
+    @inlineCallbacks
+    def setUp(self):
+        yield helpers.TestGLWithPopulatedDB.setUp(self)
+        yield self.perform_full_submission_actions()
+
+    @inlineCallbacks
+    def test_serialize_rtips(self):
+        count_1, bulk, single = yield serialize_rtips(1)
+        self.assertEqual(bulk, single)
+
+        count_n, bulk, single = yield serialize_rtips()
+        self.assertTrue(len(bulk) > 1)
+        self.assertEqual(bulk, single)
+
+        self.assertEqual(count_1, count_n)
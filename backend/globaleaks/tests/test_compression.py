@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import gzip
+import json
+
+from twisted.internet.defer import inlineCallbacks
+
+from globaleaks.rest import compression
+from globaleaks.tests import helpers
+
+
+def encode(encoder, data):
+    return encoder.encode(data) + encoder.finish()
+
+
+class TestCompression(helpers.TestGL):
+    def get_request(self, content_type, accept_encoding=b'gzip, deflate'):
+        request = helpers.forge_request(headers={b'accept-encoding': accept_encoding})
+        request.startedWriting = False
+        request._encoder = compression.GzipEncoderFactory().encoderForRequest(request)
+        request.setHeader(b'content-type', content_type)
+        return request
+
+    def test_accepts_encoding(self):
+        for value, encoding, expected in [(b'gzip, deflate, br', b'br', True),
+                                          (b'gzip;q=0.5', b'gzip', True),
+                                          (b'gzip;q=0, br', b'gzip', False),
+                                          (b'gzip', b'br', False)]:
+            request = helpers.forge_request(headers={b'accept-encoding': value})
+            self.assertEqual(compression.accepts_encoding(request, encoding), expected)
+
+    def test_is_compressible(self):
+        for content_type, expected in [(b'application/json', True),
+                                       (b'text/html; charset=utf-8', True),
+                                       (b'application/octet-stream', False),
+                                       (b'image/png', False)]:
+            self.assertEqual(compression.is_compressible(self.get_request(content_type)), expected)
+
+    def test_encoder(self):
+        data = b'antani' * 1024
+
+        request = self.get_request(b'text/html')
+        self.assertEqual(gzip.decompress(encode(request._encoder, data)), data)
+        self.assertEqual(request.responseHeaders.getRawHeaders(b'content-encoding'), [b'gzip'])
+
+        request = self.get_request(b'application/octet-stream')
+        self.assertEqual(encode(request._encoder, data), data)
+        self.assertIsNone(request.responseHeaders.getRawHeaders(b'content-encoding'))
+
+        request = self.get_request(b'text/html')
+        request.precompressed = True
+        self.assertEqual(encode(request._encoder, data), data)
+
+    @inlineCallbacks
+    def test_compress_response(self):
+        data = json.dumps([{'id': i, 'name': 'antani'} for i in range(10000)]).encode()
+
+        request = self.get_request(b'application/json')
+        compressed = yield compression.compress_response(request, data)
+        self.assertTrue(request.precompressed)
+        self.assertEqual(gzip.decompress(compressed), data)
+        self.assertEqual(encode(request._encoder, compressed), compressed)
+
+        request = self.get_request(b'application/json')
+        small = yield compression.compress_response(request, data[:1024])
+        self.assertFalse(request.precompressed)
+        self.assertEqual(small, data[:1024])
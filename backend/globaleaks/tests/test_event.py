@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from globaleaks import event
+from globaleaks.anomaly import ANOMALY_MAP
+from globaleaks.tests import helpers
+
+
+class TestEventCounter(helpers.TestGL):
+    def test_sliding_window(self):
+        counter = event.EventCounter(window=60, bucket_size=10)
+
+        now = counter.current * 10
+
+        for i in range(6):
+            for _ in range(i + 1):
+                counter.increment('failed_logins', now + i * 10)
+
+        self.assertEqual(counter.count('failed_logins', now + 55), 21)
+        self.assertEqual(counter.counts(now + 55), {'failed_logins': 21})
+
+        # The buckets exit the window one at a time
+        self.assertEqual(counter.count('failed_logins', now + 60), 20)
+        self.assertEqual(counter.count('failed_logins', now + 85), 15)
+        self.assertEqual(counter.count('successful_logins', now + 85), 0)
+
+        counter.increment('successful_logins', now + 85)
+        self.assertEqual(counter.counts(now + 85), {'failed_logins': 15, 'successful_logins': 1})
+
+        self.assertEqual(counter.counts(now + 1000), {})
+
+    def test_bounded_memory(self):
+        counter = event.EventCounter(window=60, bucket_size=1)
+
+        now = counter.current
+
+        for i in range(100000):
+            counter.increment('failed_logins', now + i / 1000)
+
+        self.assertEqual(counter.count('failed_logins', now + 99.999), 60000)
+        self.assertEqual([len(ring) for ring in counter.rings.values()], [60])
+
+
+class TestTrackHandler(helpers.TestGL):
+    def test_pollute_events(self):
+        self.pollute_events(200)
+
+        tenant = self.state.tenants[1]
+
+        self.assertEqual(tenant.RecentEvents.counts(),
+                         {e['name']: 400 for e in event.events_monitored})
+        self.assertEqual(len(tenant.EventQ), self.state.settings.events_log_limit)
+
+        tenant.Alarm.check_tenant_anomalies(1)
+        self.assertEqual(tenant.Alarm.alarm_levels['activity'], 2)
+        self.assertEqual(tenant.Alarm.event_matrix['failed_logins'], 400)
+        self.assertTrue(all(tenant.Alarm.event_matrix[k] > v for k, v in ANOMALY_MAP.items()))
@@ -12,6 +12,7 @@ from twisted.trial import unittest
 
 from globaleaks import DATABASE_VERSION, FIRST_DATABASE_VERSION_SUPPORTED
 from globaleaks.db import update_db
+from globaleaks.db.migrations.update import MigrationBase
 from globaleaks.orm import set_db_uri
 from globaleaks.settings import Settings
 from globaleaks.tests import helpers
@@ -38,6 +39,11 @@ class TestMigrationRoutines(unittest.TestCase):
 
         self.assertNotEqual(ret, -1)
 
+    def test_db_migration_batches(self):
+        self.patch(MigrationBase, 'batch_size', 2)
+
+        self._test(path, FIRST_DATABASE_VERSION_SUPPORTED)
+
 
 def test(path, version):
     return lambda self: self._test(path, version)
@@ -48,3 +54,4 @@ path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'db', 'populate
 
 for i in range(FIRST_DATABASE_VERSION_SUPPORTED, DATABASE_VERSION + 1):
     setattr(TestMigrationRoutines, "test_db_migration_%d" % i, test(path, i))
+
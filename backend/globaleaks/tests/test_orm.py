@@ -1,6 +1,14 @@
 # -*- coding: utf-8 -*-
+import sqlite3
+
+from twisted.python.threadpool import ThreadPool
+
+from sqlalchemy.exc import DatabaseError, OperationalError
+
+from globaleaks import orm
 from globaleaks.models import Tenant
-from globaleaks.orm import get_session, transact
+from globaleaks.orm import get_session, transact, transact_ro
+from globaleaks.settings import Settings
 from globaleaks.tests import helpers
 from twisted.internet.defer import inlineCallbacks
 
@@ -45,3 +53,90 @@ class TestORM(helpers.TestGL):
             self.assertTrue(getattr(session, 'query'))
 
         return transaction()
+
+    def test_shared_engine(self):
+        engine = orm.get_shared_engine()
+        self.assertIs(orm.get_shared_engine(), engine)
+        self.assertIs(get_session().bind, engine)
+        self.assertIs(orm.get_thread_session(), orm.get_thread_session())
+
+        orm.dispose_engines()
+        self.assertIsNot(orm.get_shared_engine(), engine)
+        self.assertIsNot(orm.get_thread_session().bind, engine)
+
+    def test_readonly_session(self):
+        session = get_session(readonly=True)
+        self.assertIsNot(session.bind, orm.get_shared_engine())
+
+        count = session.query(Tenant).count()
+        self.assertEqual(count, 1)
+
+        session.add(Tenant())
+        self.assertRaises(DatabaseError, session.commit)
+        session.rollback()
+        session.close()
+
+        self.assertIn('readonly', orm.get_orm_stats()['pools'])
+
+    def test_wal(self):
+        self.patch(orm, '_ORM_WAL', True)
+        orm.dispose_engines()
+        self.addCleanup(orm.dispose_engines)
+
+        session = get_session()
+        self.assertEqual(session.query(Tenant).count(), 1)
+        session.close()
+
+        # The journal mode is persistent in the database file
+        conn = sqlite3.connect(Settings.db_file_path)
+        self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        conn.close()
+
+        self.assertTrue(orm.get_orm_stats()['wal'])
+
+    @inlineCallbacks
+    def test_lock_retries(self):
+        attempts = []
+
+        @transact
+        def transaction(session):
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OperationalError('', {}, Exception('database is locked'))
+
+        self.patch(orm.time, 'sleep', lambda _: None)
+
+        retries = orm.get_orm_stats()['lock_retries']
+
+        yield transaction()
+
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(orm.get_orm_stats()['lock_retries'], retries + 1)
+
+    @inlineCallbacks
+    def test_transact_ro(self):
+        @transact_ro
+        def read(session):
+            self.assertIs(session.bind, orm.get_shared_engine(readonly=True))
+            return session.query(Tenant).count()
+
+        @transact_ro
+        def write(session):
+            session.add(Tenant())
+            session.flush()
+
+        count = yield read()
+        self.assertEqual(count, 1)
+
+        yield self.assertFailure(write(), DatabaseError)
+
+        count = yield read()
+        self.assertEqual(count, 1)
+
+    def test_thread_pool_stats(self):
+        stats = orm.get_orm_stats()['thread_pools']
+        self.assertEqual(set(stats), {'readonly', 'readwrite'})
+
+        thread_pool = ThreadPool(1, 1)
+        thread_pool.callInThread(lambda: None)
+        self.assertEqual(orm.get_thread_pool_stats(thread_pool)['queued'], 1)
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import re
+
+from globaleaks.rest import api
+from globaleaks.rest.router import Router, split_pattern
+from globaleaks.tests.helpers import TestGL
+
+uuid = '12345678-1234-1234-1234-123456789012'
+
+paths = [
+    '/',
+    '/index.html',
+    '/js/app.js',
+    '/admin',
+    '/login',
+    '/s/logo',
+    '/s/',
+    '/l10n/en',
+    '/l10n/xx',
+    '/robots.txt',
+    '/viewer/index.html',
+    '/api/public',
+    '/api/public/',
+    '/api//public',
+    '/api/admin/fields/',
+    '/api/admin/questionnaires/default',
+    '/api/admin/questionnaires/duplicate',
+    '/api/admin/questionnaires/' + uuid,
+    '/api/admin/statuses/closed/substatuses',
+    '/api/admin/statuses/closed/substatuses/' + uuid,
+    '/api/admin/statuses/' + uuid + '/substatuses/' + uuid,
+    '/api/admin/config/tls/files/cert',
+    '/api/admin/tenants/12',
+    '/api/auth/tenantauthswitch/3',
+    '/api/signup/' + 'a' * 64,
+    '/api/user/reset/password/abc/def',
+    '/api/recipient/rtips/' + uuid + '/comments',
+    '/.well-known/acme-challenge/' + 'a' * 43,
+    '/not found'
+]
+
+
+class TestRouter(TestGL):
+    def setUp(self):
+        self.router = Router()
+        self.registry = []
+
+        for spec in api.api_spec:
+            self.router.add(spec[0], spec[1])
+            self.registry.append((re.compile('^' + spec[0].lstrip('^').rstrip('$') + '$'), spec[1]))
+
+        return TestGL.setUp(self)
+
+    def linear_match(self, path):
+        for regexp, handler in self.registry:
+            match = regexp.match(path)
+            if match is not None:
+                return handler, match.groups()
+
+    def router_match(self, path):
+        match = self.router.match(path)
+        if match is not None:
+            return match[0].handler, match[1]
+
+    def test_split_pattern(self):
+        self.assertEqual(split_pattern(r'/api/admin/files/(.+)'), ['', 'api', 'admin', 'files', '(.+)'])
+        self.assertEqual(split_pattern(r'/(viewer/[a-z\/]*)'), ['', r'(viewer/[a-z\/]*)'])
+
+    def test_match(self):
+        for path in paths:
+            self.assertEqual(self.router_match(path), self.linear_match(path))
+
+        self.assertEqual(self.router.stats()['not_found'], 1)
+        self.assertEqual(self.router.stats()['routes'][r'/api/public'], 1)
+
+    def count_evaluations(self):
+        # Wrap the regular expressions of the router counting their evaluations
+        evaluations = []
+
+        class Regexp(object):
+            def __init__(self, regexp):
+                self.regexp = regexp
+
+            def match(self, path):
+                evaluations.append(self.regexp.pattern)
+                return self.regexp.match(path)
+
+            def fullmatch(self, path):
+                evaluations.append(self.regexp.pattern)
+                return self.regexp.fullmatch(path)
+
+        self.router.slot_regexps = {k: Regexp(v) for k, v in self.router.slot_regexps.items()}
+        self.router.fallbacks = [(route, prefix, Regexp(regexp)) for route, prefix, regexp in self.router.fallbacks]
+
+        nodes = [self.router.root]
+        while nodes:
+            node = nodes.pop()
+            node.tails = [(Regexp(regexp), route) for regexp, route in node.tails]
+            nodes.extend(node.literals.values())
+            nodes.extend(node.slots.values())
+
+        return evaluations
+
+    def test_dispatch_cost(self):
+        evaluations = self.count_evaluations()
+
+        # The paths routed by the last patterns are the most penalized by a linear scan
+        for path in ['/js/app.js', '/s/logo']:
+            linear = next(i for i, (regexp, _) in enumerate(self.registry, 1) if regexp.match(path))
+
+            del evaluations[:]
+            self.router.match(path)
+            self.assertLess(len(evaluations), linear)
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+import copy
+import json
+import re
+
+from globaleaks.rest import errors, requests
+from globaleaks.rest.validator import Validators, validate_request
+from globaleaks.tests.helpers import TestGL
+
+uuid = '12345678-1234-1234-1234-123456789012'
+
+
+def legacy_validate_type(value, type):
+    if value is None:
+        return False
+
+    if callable(type):
+        if type == int:
+            try:
+                int(value)
+                return True
+            except:
+                return False
+
+        if type == bool and (value == 'true' or value == 'false'):
+            return True
+
+        return isinstance(value, type)
+
+    if isinstance(type, dict):
+        return legacy_validate_request(value, type)
+
+    if isinstance(type, str):
+        return bool(re.match(type, value))
+
+    return not value or all(legacy_validate_type(x, type[0]) for x in value)
+
+
+def legacy_validate_request(request, request_template):
+    """
+    Recursive validation of the requests preceding the compiled validators
+    """
+    if not isinstance(request, (dict, list)):
+        try:
+            request = json.loads(request)
+        except:
+            raise errors.InputValidationError
+
+    if isinstance(request_template, dict):
+        success_check = 0
+        for key in [key for key in request if key not in request_template]:
+            del request[key]
+
+        for key, value in request.items():
+            if not legacy_validate_type(value, request_template[key]):
+                raise errors.InputValidationError()
+            success_check += 1
+
+        for key, value in request_template.items():
+            if key not in request or not legacy_validate_type(request[key], value):
+                raise errors.InputValidationError()
+
+            if isinstance(value, (dict, list)) and value:
+                legacy_validate_request(request[key], value)
+
+            success_check += 1
+
+        if success_check != len(request_template) * 2:
+            raise errors.InputValidationError()
+
+    elif isinstance(request_template, list):
+        if not all(legacy_validate_type(x, request_template[0]) for x in request):
+            raise errors.InputValidationError()
+
+    return request
+
+
+def get_field(i):
+    return {
+        'id': uuid,
+        'instance': 'instance',
+        'template_id': '',
+        'template_override_id': '',
+        'step_id': uuid,
+        'fieldgroup_id': '',
+        'label': 'Field %d' % i,
+        'description': 'Description',
+        'hint': 'Hint',
+        'placeholder': '',
+        'multi_entry': False,
+        'x': 0,
+        'y': i,
+        'width': 0,
+        'required': True,
+        'type': 'selectbox',
+        'attrs': {},
+        'options': [{
+            'id': uuid,
+            'label': 'Option %d' % j,
+            'hint1': '',
+            'hint2': '',
+            'block_submission': False,
+            'order': j,
+            'score_type': 'none',
+            'score_points': 0,
+            'trigger_receiver': [],
+            'creation_date': '1970-01-01T00:00:00Z'
+        } for j in range(10)],
+        'children': [],
+        'triggered_by_score': 0,
+        'triggered_by_options': []
+    }
+
+
+submission = {
+    'context_id': uuid,
+    'receivers': [uuid] * 5,
+    'identity_provided': False,
+    'answers': {uuid: [{'value': 'x' * 100}] for _ in range(50)},
+    'score': 0
+}
+
+step = {
+    'id': uuid,
+    'label': 'Step',
+    'description': 'Description',
+    'children': [get_field(i) for i in range(20)],
+    'questionnaire_id': 'default',
+    'order': 0,
+    'triggered_by_score': 0,
+    'triggered_by_options': []
+}
+
+
+class TestValidator(TestGL):
+    def test_validate_request(self):
+        for request, template in [(submission, requests.SubmissionDesc),
+                                  (step, requests.AdminStepDesc)]:
+            self.assertEqual(validate_request(copy.deepcopy(request), template),
+                             legacy_validate_request(copy.deepcopy(request), template))
+
+        request = validate_request(json.dumps(step), requests.AdminStepDesc)
+        self.assertNotIn('creation_date', request['children'][0]['options'][0])
+
+        self.assertRaises(errors.InputValidationError, validate_request, '{', requests.SubmissionDesc)
+        self.assertRaises(errors.InputValidationError, validate_request, [], requests.SubmissionDesc)
+
+    def test_validate_request_errors(self):
+        for path, value, reason in [
+            ('children.3.options.7.order', 'x', 'expected int'),
+            ('children.3.required', None, 'expected bool'),
+            ('children.3.type', 'unknown', 'failed match'),
+            ('children.3.options', {'x': 1}, 'expected list'),
+            ('children.3', 1, 'expected object'),
+        ]:
+            request = copy.deepcopy(step)
+
+            keys = path.split('.')
+            obj = request
+            for key in keys[:-1]:
+                obj = obj[int(key) if isinstance(obj, list) else key]
+
+            obj[int(keys[-1]) if isinstance(obj, list) else keys[-1]] = value
+
+            e = self.assertRaises(errors.InputValidationError, validate_request, request, requests.AdminStepDesc)
+            self.assertTrue(e.arguments[0].startswith(path + ': ' + reason))
+
+        request = copy.deepcopy(step)
+        del request['children'][0]['attrs']
+        e = self.assertRaises(errors.InputValidationError, validate_request, request, requests.AdminStepDesc)
+        self.assertEqual(e.arguments[0], 'children.0.attrs: missing key')
+
+    def test_compile_module(self):
+        Validators.compile_module(requests)
+
+        self.assertIsNotNone(Validators.validators.get(id(requests.SubmissionDesc)))
+        self.assertIs(Validators.get(requests.AdminStepDesc), Validators.get(requests.AdminStepDesc))
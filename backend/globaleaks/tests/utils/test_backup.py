@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import sqlite3
+
+from twisted.internet.defer import inlineCallbacks
+from twisted.trial.unittest import SkipTest
+
+from globaleaks.settings import Settings
+from globaleaks.tests import helpers
+from globaleaks.utils import backup
+
+
+class TestBackup(helpers.TestGL):
+    @inlineCallbacks
+    def setUp(self):
+        yield helpers.TestGL.setUp(self)
+
+        self.workdir = os.path.join(Settings.working_path, 'backup_workdir')
+        self.backuppath = os.path.join(self.workdir, 'backups')
+        self.db_path = os.path.join(self.workdir, 'globaleaks.db')
+
+        os.makedirs(os.path.join(self.workdir, 'attachments'))
+
+        for i in range(10):
+            self.write('attachments/%d' % i, os.urandom(1024))
+
+        # Two files with the same content are stored once
+        self.write('files/a', b'antani')
+        self.write('files/b', b'antani')
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('CREATE TABLE t (x INTEGER)')
+        conn.execute('INSERT INTO t VALUES (1)')
+        conn.commit()
+        conn.close()
+
+    def write(self, relpath, content):
+        path = os.path.join(self.workdir, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+
+    def read(self, workdir, relpath):
+        with open(os.path.join(workdir, relpath), 'rb') as f:
+            return f.read()
+
+    def test_backup_and_restore(self):
+        b = backup.Backup(self.backuppath)
+
+        # The database is open while the snapshot is taken
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('INSERT INTO t VALUES (2)')
+
+        _, stats = b.backup(self.workdir, self.db_path)
+        conn.close()
+
+        self.assertEqual(stats['files'], 13)
+        self.assertEqual(stats['copied'], 13)
+        self.assertEqual(len(os.listdir(os.path.join(self.backuppath, 'objects'))), len({x[:2] for x in self.list_objects(b)}))
+        self.assertEqual(len(self.list_objects(b)), 12)
+
+        # Only the files changed since the previous snapshot are copied
+        self.write('attachments/0', b'changed')
+        _, stats = b.backup(self.workdir, self.db_path)
+        self.assertEqual(stats['copied'], 2)
+        self.assertEqual(stats['reused'], 11)
+        self.assertEqual(len(b.list_snapshots()), 2)
+
+        self.assertEqual(b.verify(), [])
+
+        restored = os.path.join(Settings.working_path, 'restored')
+        b.restore(restored)
+
+        for relpath in ['attachments/0', 'attachments/9', 'files/a']:
+            self.assertEqual(self.read(restored, relpath), self.read(self.workdir, relpath))
+
+        self.assertFalse(os.path.exists(os.path.join(restored, 'backups')))
+
+        conn = sqlite3.connect(os.path.join(restored, 'globaleaks.db'))
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM t').fetchone()[0], 1)
+        conn.close()
+
+        # The first snapshot keeps referencing the previous content
+        restored = os.path.join(Settings.working_path, 'restored_first')
+        b.restore(restored, b.list_snapshots()[0])
+        self.assertNotEqual(self.read(restored, 'attachments/0'), b'changed')
+
+    def test_restore_ownership(self):
+        if os.geteuid() != 0:
+            raise SkipTest('changing the ownership of the files requires root')
+
+        # The files of the working directory are owned by the user of the application
+        uid, gid = 4242, 4343
+        for relpath in ['attachments/0', 'files/a', 'globaleaks.db']:
+            os.chown(os.path.join(self.workdir, relpath), uid, gid)
+            os.chmod(os.path.join(self.workdir, relpath), 0o640)
+
+        b = backup.Backup(self.backuppath)
+        snapshot, _ = b.backup(self.workdir, self.db_path)
+
+        restored = os.path.join(Settings.working_path, 'restored')
+        b.restore(restored)
+
+        for relpath in ['attachments/0', 'files/a', 'globaleaks.db']:
+            st = os.stat(os.path.join(restored, relpath))
+            self.assertEqual((st.st_uid, st.st_gid, st.st_mode & 0o777), (uid, gid, 0o640))
+
+        # Snapshots not recording the ownership are restored with the owner of the working directory
+        path = os.path.join(b.manifests_path, snapshot + '.json')
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+
+        for entry in manifest['files'].values():
+            del entry['uid'], entry['gid']
+
+        with open(path, 'w') as f:
+            json.dump(manifest, f)
+
+        restored = os.path.join(Settings.working_path, 'restored_legacy')
+        os.makedirs(restored)
+        os.chown(restored, uid, gid)
+        b.restore(restored)
+
+        for relpath in ['attachments', 'attachments/1', 'globaleaks.db']:
+            st = os.stat(os.path.join(restored, relpath))
+            self.assertEqual((st.st_uid, st.st_gid), (uid, gid))
+
+    def test_verify(self):
+        b = backup.Backup(self.backuppath)
+        b.backup(self.workdir, self.db_path)
+
+        with open(b.get_object_path(backup.file_sha256(os.path.join(self.workdir, 'files/a'))), 'wb') as f:
+            f.write(b'corrupted')
+
+        self.assertEqual(b.verify(), ['files/a', 'files/b'])
+        self.assertRaises(RuntimeError, b.restore, os.path.join(Settings.working_path, 'restored'))
+
+    def list_objects(self, b):
+        return [x for d in os.listdir(b.objects_path) for x in os.listdir(os.path.join(b.objects_path, d))]
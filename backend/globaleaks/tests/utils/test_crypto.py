@@ -2,9 +2,11 @@
 import filecmp
 import os
 
+from concurrent.futures import ThreadPoolExecutor
+
 from globaleaks.settings import Settings
 from globaleaks.tests import helpers
-from globaleaks.utils.crypto import Base64Encoder, GCE
+from globaleaks.utils.crypto import _Argon2Pool, Base64Encoder, GCE
 
 password = b'password'
 message = b'message'
@@ -77,3 +79,16 @@ class TestCryptoUtils(helpers.TestGL):
         plain_rec_key = GCE.asymmetric_decrypt(prv_key, Base64Encoder.decode(rec_key))
         x = GCE.symmetric_decrypt(plain_rec_key, Base64Encoder.decode(bck_key))
         self.assertEqual(x, prv_key)
+
+    def test_argon2_pool_concurrency(self):
+        pool = _Argon2Pool(2)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda x: pool.run(pow, x, 2), range(4)))
+
+        self.assertEqual(results, [0, 1, 4, 9])
+
+        stats = pool.stats()
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['queued'], 0)
+        self.assertEqual(stats['executions'], 4)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import gzip
+import os
+
+from twisted.internet import reactor
+from twisted.internet.defer import inlineCallbacks, returnValue
+from twisted.web import resource, server
+from twisted.web.client import Agent, readBody
+from twisted.web.http_headers import Headers
+from twisted.web.iweb import UNKNOWN_LENGTH
+
+from globaleaks.handlers import base
+from globaleaks.rest.compression import GzipEncoderFactory
+from globaleaks.settings import Settings
+from globaleaks.tests import helpers
+
+
+class FileResource(resource.Resource):
+    isLeaf = True
+
+    def __init__(self, path, content_type):
+        resource.Resource.__init__(self)
+        self.path = path
+        self.content_type = content_type
+
+    def render_GET(self, request):
+        request.precompressed = False
+        request.setHeader(b'Content-Type', self.content_type)
+        base.serve_file(request, open(self.path, 'rb')).addCallback(lambda _: request.finish())
+        return server.NOT_DONE_YET
+
+
+class TestFileProducer(helpers.TestGL):
+    size = 16 * 1024 * 1024
+
+    @inlineCallbacks
+    def setUp(self):
+        yield helpers.TestGL.setUp(self)
+
+        self.path = os.path.join(Settings.tmp_path, 'file')
+        self.data = os.urandom(self.size)
+        with open(self.path, 'wb') as f:
+            f.write(self.data)
+
+        self.ports = []
+
+    def tearDown(self):
+        for port in self.ports:
+            port.stopListening()
+
+    def listen(self, content_type):
+        root = resource.EncodingResourceWrapper(FileResource(self.path, content_type), [GzipEncoderFactory()])
+        port = reactor.listenTCP(0, server.Site(root), interface='127.0.0.1')
+        self.ports.append(port)
+        return b'http://127.0.0.1:%d/' % port.getHost().port
+
+    @inlineCallbacks
+    def fetch(self, url, headers=None):
+        response = yield Agent(reactor).request(b'GET', url, Headers(headers or {}))
+        body = yield readBody(response)
+        returnValue((response, body))
+
+    @inlineCallbacks
+    def test_serve_file(self):
+        url = self.listen(b'application/octet-stream')
+
+        response, body = yield self.fetch(url, {b'accept-encoding': [b'gzip']})
+        self.assertEqual(body, self.data)
+        self.assertEqual(response.length, self.size)
+
+    @inlineCallbacks
+    def test_serve_file_compressed(self):
+        self.data = b'antani' * 1024 * 1024
+        with open(self.path, 'wb') as f:
+            f.write(self.data)
+
+        url = self.listen(b'text/plain')
+
+        response, body = yield self.fetch(url, {b'accept-encoding': [b'gzip']})
+        self.assertEqual(gzip.decompress(body), self.data)
+        self.assertEqual(response.headers.getRawHeaders(b'content-encoding'), [b'gzip'])
+        self.assertEqual(response.length, UNKNOWN_LENGTH)
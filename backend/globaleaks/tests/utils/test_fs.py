@@ -1,5 +1,6 @@
 # -*- coding: utf-8
 import os
+import time
 
 from globaleaks.rest import errors
 from globaleaks.settings import Settings
@@ -32,3 +33,37 @@ class TestFilesystemUtilities(helpers.TestGL):
         fs.srm(path, 10)
 
         self.assertFalse(os.path.isfile(path))
+
+    def test_scan_untracked_files(self):
+        for name in ['tracked', 'untracked', 'recent']:
+            with open(os.path.join(Settings.tmp_path, name), 'wb') as f:
+                f.write(b'antani')
+
+        for name in ['tracked', 'untracked']:
+            os.utime(os.path.join(Settings.tmp_path, name), (0, 0))
+
+        untracked = list(fs.scan_untracked_files(Settings.tmp_path, {'tracked'}, time.time() - 60))
+        self.assertEqual(untracked, [os.path.join(Settings.tmp_path, 'untracked')])
+
+        untracked = fs.scan_untracked_files(Settings.tmp_path, {'tracked'})
+        self.assertEqual(len(list(untracked)), 2)
+
+    def test_secure_deletion_queue(self):
+        paths = [os.path.join(Settings.tmp_path, str(i)) for i in range(10)]
+        for path in paths:
+            with open(path, 'wb') as f:
+                f.write(b'antani')
+
+        deleted = fs.SecureDeletionQueue.stats()['deleted']
+
+        for path in paths + paths:
+            fs.SecureDeletionQueue.put(path)
+
+        fs.SecureDeletionQueue.join()
+
+        for path in paths:
+            self.assertFalse(os.path.exists(path))
+
+        stats = fs.SecureDeletionQueue.stats()
+        self.assertEqual(stats['pending'], 0)
+        self.assertEqual(stats['deleted'], deleted + 10)
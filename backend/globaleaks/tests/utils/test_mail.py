@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+from twisted.internet import defer, protocol, reactor, task
+from twisted.mail import smtp
+from twisted.trial import unittest
+from zope.interface import implementer
+
+from globaleaks.utils.mail import SMTPPool
+
+
+@implementer(smtp.IMessage)
+class Message(object):
+    def __init__(self, server):
+        self.server = server
+        self.lines = []
+
+    def lineReceived(self, line):
+        self.lines.append(line)
+
+    def eomReceived(self):
+        self.server.messages.append(b'\n'.join(self.lines))
+        return defer.succeed(None)
+
+    def connectionLost(self):
+        pass
+
+
+@implementer(smtp.IMessageDelivery)
+class MessageDelivery(object):
+    def __init__(self, server):
+        self.server = server
+
+    def receivedHeader(self, helo, origin, recipients):
+        return b'Received: test'
+
+    def validateFrom(self, helo, origin):
+        return origin
+
+    def validateTo(self, user):
+        if user.dest.local == b'reject':
+            raise smtp.SMTPBadRcpt(user)
+
+        return lambda: Message(self.server)
+
+
+class SMTPServer(smtp.ESMTP):
+    def connectionMade(self):
+        smtp.ESMTP.connectionMade(self)
+        self.factory.open += 1
+
+    def connectionLost(self, reason):
+        smtp.ESMTP.connectionLost(self, reason)
+        self.factory.open -= 1
+
+
+class SMTPServerFactory(protocol.ServerFactory):
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+        self.open = 0
+
+    def buildProtocol(self, addr):
+        self.connections += 1
+        p = SMTPServer()
+        p.delivery = MessageDelivery(self)
+        p.factory = self
+        return p
+
+
+class TestSMTPPool(unittest.TestCase):
+    def setUp(self):
+        self.server = SMTPServerFactory()
+        self.port = reactor.listenTCP(0, self.server, interface='127.0.0.1')
+
+    def tearDown(self):
+        return self.port.stopListening()
+
+    @defer.inlineCallbacks
+    def wait_connections_closed(self, pool):
+        while pool.connections or self.server.open:
+            yield task.deferLater(reactor, 0.01, lambda: None)
+
+    def get_pool(self, port, connections_limit, security='PLAINTEXT', authentication=False):
+        return SMTPPool(1, '127.0.0.1', port, security, authentication, 'username', 'password',
+                        'sender@example.net', anonymize=False, connections_limit=connections_limit)
+
+    @defer.inlineCallbacks
+    def test_send(self):
+        pool = self.get_pool(self.port.getHost().port, 2)
+
+        results = yield defer.gatherResults([pool.send('Sender', 'receiver%d@example.net' % i, 'Subject', 'Body %d' % i)
+                                             for i in range(10)] +
+                                            [pool.send('Sender', 'reject@example.net', 'Subject', 'Body')])
+
+        self.assertEqual(results, [True] * 10 + [False])
+        self.assertEqual(len(self.server.messages), 10)
+
+        # The messages are sent over the limited number of connections
+        self.assertEqual(self.server.connections, 2)
+        self.assertEqual(pool.stats()['sent'], 10)
+        self.assertEqual(pool.stats()['failed'], 1)
+        self.assertEqual(pool.stats()['connections_opened'], 2)
+
+        # The messages queued while the connections are open reuse them
+        result = yield pool.send('Sender', 'receiver@example.net', 'Subject', 'Body')
+        self.assertTrue(result)
+        self.assertEqual(self.server.connections, 2)
+
+        yield self.wait_connections_closed(pool)
+
+        # The pool opens new connections when new messages are queued
+        result = yield pool.send('Sender', 'receiver@example.net', 'Subject', 'Body')
+        self.assertTrue(result)
+        self.assertEqual(self.server.connections, 3)
+
+        yield self.wait_connections_closed(pool)
+
+    @defer.inlineCallbacks
+    def test_send_connection_failure(self):
+        port = self.port.getHost().port
+        yield self.port.stopListening()
+
+        pool = self.get_pool(port, 2)
+
+        results = yield defer.gatherResults([pool.send('Sender', 'receiver@example.net', 'Subject', 'Body')
+                                             for _ in range(5)])
+
+        self.assertEqual(results, [False] * 5)
+        self.assertEqual(pool.stats()['failed'], 5)
+        self.assertEqual(pool.stats()['queued'], 0)
+
+    @defer.inlineCallbacks
+    def test_send_protocol_failure(self):
+        # The test server supports neither STARTTLS nor authentication
+        for security, authentication in [('TLS', False), ('PLAINTEXT', True)]:
+            pool = self.get_pool(self.port.getHost().port, 2, security, authentication)
+
+            results = yield defer.gatherResults([pool.send('Sender', 'receiver@example.net', 'Subject', 'Body')
+                                                 for _ in range(3)])
+
+            self.assertEqual(results, [False] * 3)
+            self.assertEqual(pool.stats()['failed'], 3)
+            self.assertEqual(pool.stats()['queued'], 0)
+            self.assertEqual(self.server.messages, [])
+
+            yield self.wait_connections_closed(pool)
+
+        self.assertEqual(self.flushLoggedErrors(), [])
@@ -3,7 +3,7 @@ import os
 from datetime import datetime
 
 from globaleaks.tests import helpers
-from globaleaks.utils.pgp import PGPContext
+from globaleaks.utils.pgp import KeyringCache, PGPContext
 
 
 class TestPGP(helpers.TestGL):
@@ -22,6 +22,15 @@ class TestPGP(helpers.TestGL):
 
         self.assertEqual(str(pgpctx.gnupg.decrypt(encrypted_body)), self.secret_content)
 
+    def test_encrypt_stream_failure(self):
+        pgpctx = PGPContext(helpers.PGPKEYS['VALID_PGP_KEY1_PRV'])
+
+        def chunks():
+            yield self.secret_content.encode()
+            raise IOError('missing attachment')
+
+        self.assertRaises(IOError, b''.join, pgpctx.encrypt_stream(chunks()))
+
     def test_encrypt_file(self):
         file_src = os.path.join(os.getcwd(), 'test_plaintext_file.txt')
         file_dst = os.path.join(os.getcwd(), 'test_encrypted_file.txt')
@@ -44,6 +53,42 @@ class TestPGP(helpers.TestGL):
         with open(file_dst, 'rb') as f:
             self.assertEqual(str(pgpctx.gnupg.decrypt_file(f)), self.secret_content)
 
+    def test_open_encrypted_file(self):
+        file_dst = os.path.join(os.getcwd(), 'test_encrypted_stream.txt')
+
+        pgpctx = PGPContext(helpers.PGPKEYS['VALID_PGP_KEY1_PRV'])
+
+        with pgpctx.open_encrypted_file(file_dst) as f:
+            for line in self.secret_content.encode().splitlines(True):
+                f.write(line)
+
+        with open(file_dst, 'rb') as f:
+            self.assertEqual(str(pgpctx.gnupg.decrypt_file(f)), self.secret_content)
+
+    def test_keyring_cache(self):
+        size = KeyringCache.size
+        self.addCleanup(setattr, KeyringCache, 'size', size)
+
+        KeyringCache.clear()
+        KeyringCache.size = 1
+
+        stats = KeyringCache.stats()
+
+        pgpctx1 = PGPContext(helpers.PGPKEYS['VALID_PGP_KEY1_PUB'])
+        pgpctx2 = PGPContext(helpers.PGPKEYS['VALID_PGP_KEY1_PUB'])
+        self.assertIs(pgpctx1.gnupg, pgpctx2.gnupg)
+        self.assertEqual(KeyringCache.stats()['hits'] - stats['hits'], 1)
+
+        PGPContext(helpers.PGPKEYS['VALID_PGP_KEY2_PUB'])
+        self.assertEqual(KeyringCache.stats()['evictions'] - stats['evictions'], 1)
+
+        # Contexts of evicted keyrings keep working
+        encrypted_body = pgpctx1.encrypt_message(self.secret_content)
+        self.assertTrue(encrypted_body.startswith('-----BEGIN PGP MESSAGE-----'))
+
+        pgpctx3 = PGPContext(helpers.PGPKEYS['VALID_PGP_KEY1_PUB'])
+        self.assertIsNot(pgpctx1.gnupg, pgpctx3.gnupg)
+
     def test_read_expirations(self):
         pgpctx = PGPContext(helpers.PGPKEYS['VALID_PGP_KEY1_PRV'])
 
@@ -54,3 +99,12 @@ class TestPGP(helpers.TestGL):
 
         self.assertEqual(pgpctx.expiration,
                          datetime.utcfromtimestamp(1391012793))
+
+    def test_encrypt_stream(self):
+        pgpctx = PGPContext(helpers.PGPKEYS['VALID_PGP_KEY1_PRV'])
+
+        chunks = [self.secret_content[i:i+100].encode() for i in range(0, len(self.secret_content), 100)]
+
+        encrypted_body = b''.join(pgpctx.encrypt_stream(chunks))
+
+        self.assertEqual(str(pgpctx.gnupg.decrypt(encrypted_body)), self.secret_content)
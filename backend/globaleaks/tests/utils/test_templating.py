@@ -1,10 +1,36 @@
 # -*- coding: utf-8 -*-
+import re
+
 from twisted.internet.defer import inlineCallbacks
 from globaleaks.handlers import admin, public, recipient, user
 from globaleaks.jobs.delivery import Delivery
 from globaleaks.orm import tw
 from globaleaks.tests import helpers
-from globaleaks.utils.templating import Templating, supported_template_types
+from globaleaks.utils.templating import Templating, compile_template, supported_template_types
+
+
+def format_template_by_keyword_scan(raw_template, data):
+    keyword_converter = supported_template_types[data['type']](data)
+
+    for kw in keyword_converter.keyword_list:
+        if raw_template.count(kw):
+            variable_content = getattr(keyword_converter, kw[1:-1])()
+            variable_content = re.sub("{", "(", variable_content)
+            variable_content = re.sub("}", ")", variable_content)
+            raw_template = raw_template.replace(kw, variable_content)
+
+    return raw_template.rstrip()
+
+
+class TestCompileTemplate(helpers.TestGL):
+    def test_compile_template(self):
+        for template_type in supported_template_types.values():
+            template = 'Text {' + ' text '.join(template_type.keyword_list) + '{Unknown} {} }\n'
+            tokens = compile_template(template)
+
+            self.assertEqual(''.join(tokens), template)
+            self.assertEqual(list(tokens[1::2]), template_type.keyword_list + ['{Unknown}'])
+            self.assertIs(compile_template(template), tokens)
 
 
 class notifTemplateTest(helpers.TestGLWithPopulatedDB):
@@ -40,3 +66,18 @@ class notifTemplateTest(helpers.TestGLWithPopulatedDB):
 
             template = ''.join(supported_template_types[data['type']].keyword_list)
             Templating().format_template(template, data)
+
+            for template in [''.join(supported_template_types[data['type']].keyword_list),
+                             data['notification']['tip_mail_template'],
+                             '{Unknown} {TipNum}{TipNum} {{TipID}} {TipNum']:
+                self.assertEqual(Templating().format_template(template, data),
+                                 format_template_by_keyword_scan(template, data))
+
+        # The mail templates of every supported template type render as with the keyword scan
+        templates = [data['notification'][t + '_mail_template'] for t in supported_template_types
+                     if t + '_mail_template' in data['notification']]
+
+        data['type'] = 'tip'
+        for template in templates:
+            self.assertEqual(Templating().format_template(template, data),
+                             format_template_by_keyword_scan(template, data))
@@ -2,8 +2,15 @@
 """
 ORM Transactions definitions.
 """
+from sqlalchemy import bindparam
+
 from globaleaks import models
-from globaleaks.orm import db_add, db_get
+from globaleaks.orm import bakery, db_add
+
+
+user_query = bakery(lambda session: session.query(models.User)
+                                         .filter(models.User.id == bindparam('user_id'),
+                                                 models.User.tid == bindparam('tid')))
 
 
 def db_get_user(session, tid, user_id):
@@ -15,10 +22,7 @@ def db_get_user(session, tid, user_id):
     :param user_id: A id of the user to retrieve
     :return: A retrieved model
     """
-    return db_get(session,
-                  models.User,
-                  (models.User.id == user_id,
-                   models.User.tid == tid))
+    return user_query(session).params(tid=tid, user_id=user_id).one()
 
 
 def db_schedule_email(session, tid, address, subject, body):
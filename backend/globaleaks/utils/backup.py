@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+#
+#  Backup utilities
+#
+# Online and incremental backups of the working directory.
+#
+# A backup directory contains a content addressed store of the files and a
+# manifest for each snapshot mapping the paths of the working directory to
+# the checksums of their content:
+#
+#   objects/<sha256[:2]>/<sha256>
+#   manifests/<snapshot>.json
+#
+# The files are stored once whatever the number of snapshots referencing
+# them and the database is copied with the SQLite backup API so that the
+# snapshots can be taken while the application is running.
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from globaleaks.utils.fs import directory_traversal_check
+
+MANIFEST_VERSION = 1
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+
+    return h.hexdigest()
+
+
+def snapshot_db(src, dst):
+    """
+    Copy a consistent snapshot of a SQLite database
+
+    :param src: The path of the database
+    :param dst: The path of the copy
+    """
+    source = sqlite3.connect(src)
+    try:
+        target = sqlite3.connect(dst)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+
+class Backup(object):
+    """
+    Backup directory of a working directory
+    """
+    def __init__(self, path, workers=4):
+        self.path = os.path.abspath(path)
+        self.objects_path = os.path.join(self.path, 'objects')
+        self.manifests_path = os.path.join(self.path, 'manifests')
+        self.tmp_path = os.path.join(self.path, 'tmp')
+        self.workers = workers
+
+    def init(self):
+        for path in [self.path, self.objects_path, self.manifests_path, self.tmp_path]:
+            os.makedirs(path, mode=0o700, exist_ok=True)
+
+    def get_object_path(self, checksum):
+        return os.path.join(self.objects_path, checksum[:2], checksum)
+
+    def list_snapshots(self):
+        if not os.path.isdir(self.manifests_path):
+            return []
+
+        return sorted(x[:-5] for x in os.listdir(self.manifests_path) if x.endswith('.json'))
+
+    def load_manifest(self, snapshot=None):
+        """
+        Load the manifest of a snapshot
+
+        :param snapshot: The name of the snapshot; if not set the latest one
+        :return: The manifest or None if no snapshot exists
+        """
+        if snapshot is None:
+            snapshots = self.list_snapshots()
+            if not snapshots:
+                return None
+
+            snapshot = snapshots[-1]
+
+        with open(os.path.join(self.manifests_path, snapshot + '.json'), 'r') as f:
+            return json.load(f)
+
+    def store_file(self, path):
+        """
+        Store a file in the object store
+
+        The file is read once copying it and computing its checksum; the copy
+        is discarded if the object is already stored.
+
+        :param path: The path of the file
+        :return: A tuple (checksum, size, stored)
+        """
+        h = hashlib.sha256()
+        size = 0
+
+        fd, tmp = self.mkstemp()
+        try:
+            with open(path, 'rb') as src, os.fdopen(fd, 'wb') as dst:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                    h.update(chunk)
+                    dst.write(chunk)
+                    size += len(chunk)
+
+            checksum = h.hexdigest()
+            dst_path = self.get_object_path(checksum)
+
+            if os.path.exists(dst_path):
+                return checksum, size, False
+
+            os.makedirs(os.path.dirname(dst_path), mode=0o700, exist_ok=True)
+            os.rename(tmp, dst_path)
+
+            return checksum, size, True
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def mkstemp(self):
+        return tempfile.mkstemp(dir=self.tmp_path)
+
+    def list_files(self, workdir, exclude):
+        for root, dirs, files in os.walk(workdir):
+            dirs[:] = [d for d in dirs if os.path.join(root, d) not in exclude]
+
+            for name in files:
+                path = os.path.join(root, name)
+                if path not in exclude and os.path.isfile(path) and not os.path.islink(path):
+                    yield path
+
+    def backup(self, workdir, db_path=None, exclude=()):
+        """
+        Take a snapshot of a working directory
+
+        The database is copied first so that every file it references at the
+        time of the snapshot is copied too. The files unchanged in size and
+        modification time since the previous snapshot are not read again; the
+        others are copied in parallel.
+
+        :param workdir: The working directory
+        :param db_path: The path of the database to be copied with the backup API
+        :param exclude: Paths of files and directories to be excluded
+        :return: A tuple (snapshot name, statistics)
+        """
+        self.init()
+
+        workdir = os.path.abspath(workdir)
+        exclude = {os.path.abspath(x) for x in exclude}
+        exclude.add(self.path)
+
+        if db_path:
+            db_path = os.path.abspath(db_path)
+            for suffix in ['', '-journal', '-shm', '-wal']:
+                exclude.add(db_path + suffix)
+
+        previous = self.load_manifest() or {'files': {}}
+        stats = {'files': 0, 'copied': 0, 'reused': 0, 'bytes': 0}
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'date': datetime.utcnow().isoformat(),
+            'files': {}
+        }
+
+        def process(path):
+            relpath = os.path.relpath(path, workdir)
+            st = os.stat(path)
+
+            entry = previous['files'].get(relpath)
+            if entry is not None and \
+               entry['size'] == st.st_size and \
+               entry['mtime'] == st.st_mtime_ns and \
+               os.path.exists(self.get_object_path(entry['sha256'])):
+                return relpath, entry, False, 0
+
+            checksum, size, stored = self.store_file(path)
+
+            return relpath, {
+                'sha256': checksum,
+                'size': size,
+                'mtime': st.st_mtime_ns,
+                'mode': st.st_mode & 0o777,
+                'uid': st.st_uid,
+                'gid': st.st_gid
+            }, True, size if stored else 0
+
+        if db_path and os.path.exists(db_path):
+            st = os.stat(db_path)
+            fd, tmp = self.mkstemp()
+            os.close(fd)
+
+            try:
+                snapshot_db(db_path, tmp)
+                checksum, size, stored = self.store_file(tmp)
+            finally:
+                os.remove(tmp)
+
+            # The copy is restored with the ownership and the mode of the database
+            manifest['files'][os.path.relpath(db_path, workdir)] = {
+                'sha256': checksum,
+                'size': size,
+                'mtime': 0,
+                'mode': st.st_mode & 0o777,
+                'uid': st.st_uid,
+                'gid': st.st_gid
+            }
+
+            stats['files'] += 1
+            stats['copied'] += 1
+            stats['bytes'] += size if stored else 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = executor.map(process, self.list_files(workdir, exclude))
+
+            for relpath, entry, copied, size in results:
+                manifest['files'][relpath] = entry
+                stats['files'] += 1
+                stats['copied' if copied else 'reused'] += 1
+                stats['bytes'] += size
+
+        name = datetime.utcnow().strftime('%Y%m%d%H%M%S%f')
+
+        fd, tmp = self.mkstemp()
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f)
+
+        os.rename(tmp, os.path.join(self.manifests_path, name + '.json'))
+
+        return name, stats
+
+    def verify(self, snapshot=None):
+        """
+        Verify in parallel the checksums of the objects of a snapshot
+
+        :param snapshot: The name of the snapshot; if not set the latest one
+        :return: The list of the paths whose content is missing or corrupted
+        """
+        manifest = self.load_manifest(snapshot)
+        if manifest is None:
+            raise RuntimeError("No snapshot found in {}".format(self.path))
+
+        checksums = {entry['sha256'] for entry in manifest['files'].values()}
+
+        def check(checksum):
+            try:
+                return checksum, file_sha256(self.get_object_path(checksum)) == checksum
+            except OSError:
+                return checksum, False
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            invalid = {checksum for checksum, valid in executor.map(check, checksums) if not valid}
+
+        return sorted(relpath for relpath, entry in manifest['files'].items() if entry['sha256'] in invalid)
+
+    def restore(self, workdir, snapshot=None):
+        """
+        Restore a snapshot in a working directory
+
+        The snapshot is verified before writing any file. The files are
+        restored with the mode and the ownership recorded in the snapshot;
+        snapshots not recording the ownership are restored with the owner of
+        the working directory.
+
+        :param workdir: The working directory
+        :param snapshot: The name of the snapshot; if not set the latest one
+        """
+        invalid = self.verify(snapshot)
+        if invalid:
+            raise RuntimeError("Corrupted backup: {}".format(', '.join(invalid)))
+
+        manifest = self.load_manifest(snapshot)
+        workdir = os.path.abspath(workdir)
+        os.makedirs(workdir, exist_ok=True)
+        owner = os.stat(workdir)
+
+        def chown(path, uid, gid):
+            st = os.stat(path)
+            if (st.st_uid, st.st_gid) != (uid, gid):
+                os.chown(path, uid, gid)
+
+        def copy(item):
+            relpath, entry = item
+            uid, gid = entry.get('uid', owner.st_uid), entry.get('gid', owner.st_gid)
+            dst = os.path.abspath(os.path.join(workdir, relpath))
+            directory_traversal_check(workdir, dst)
+
+            parent = os.path.dirname(dst)
+            if not os.path.isdir(parent):
+                os.makedirs(parent, exist_ok=True)
+                while parent != workdir:
+                    chown(parent, owner.st_uid, owner.st_gid)
+                    parent = os.path.dirname(parent)
+
+            shutil.copyfile(self.get_object_path(entry['sha256']), dst)
+            os.chmod(dst, entry['mode'])
+            chown(dst, uid, gid)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(copy, manifest['files'].items()))
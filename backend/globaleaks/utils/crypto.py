@@ -10,6 +10,7 @@ import struct
 import threading
 import time
 
+from concurrent.futures import ThreadPoolExecutor
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import constant_time, hashes
 from cryptography.hazmat.primitives.twofactor.totp import TOTP
@@ -25,7 +26,6 @@ from typing import Any, Optional, Tuple, Union
 
 
 crypto_backend = default_backend()
-lock = threading.Lock()
 
 def _convert_to_bytes(arg: Union[bytes, str]) -> bytes:
     """
@@ -91,29 +91,80 @@ def totpVerify(secret: str, token: str) -> None:
 
 
 def _kdf_argon2(password: bytes, salt: bytes) -> bytes:
-    lock.acquire()
-
-    try:
-        salt = base64.b64decode(salt)
-        return argon2id.kdf(32, password, salt[0:16],
-                            opslimit=_GCE.options['OPSLIMIT'] + 1,
-                            memlimit=1 << _GCE.options['MEMLIMIT'])
-    finally:
-        lock.release()
+    salt = base64.b64decode(salt)
+    return Argon2Pool.run(argon2id.kdf, 32, password, salt[0:16],
+                          opslimit=_GCE.options['OPSLIMIT'] + 1,
+                          memlimit=1 << _GCE.options['MEMLIMIT'])
 
 
 def _hash_argon2(password: bytes, salt: bytes) -> str:
-    lock.acquire()
+    salt = base64.b64decode(salt)
+    hash = Argon2Pool.run(argon2id.kdf, 32, password, salt[0:16],
+                          opslimit=_GCE.options['OPSLIMIT'],
+                          memlimit=1 << _GCE.options['MEMLIMIT'])
+    return base64.b64encode(hash).decode()
+
+
+class _Argon2Pool(object):
+    """
+    Bounded pool of workers dedicated to Argon2 computations
+
+    The number of workers is limited by the number of available cores and
+    by the amount of memory that can be reserved to concurrent computations.
+    """
+    def __init__(self, size: int = 0) -> None:
+        self.size = size or self.default_size()
+        self.executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix='argon2')
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.max_queued = 0
+        self.executions = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    @staticmethod
+    def default_size() -> int:
+        cores = os.cpu_count() or 1
+
+        try:
+            memory = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+        except (AttributeError, ValueError, OSError):
+            return 1
+
+        # Reserve at most half of the system memory to Argon2
+        return max(1, min(cores, memory // 2 // (1 << _GCE.options['MEMLIMIT'])))
+
+    def _execute(self, start: float, f: Any, *args: Any, **kwargs: Any) -> Any:
+        wait_time = time.monotonic() - start
+
+        with self.lock:
+            self.queued -= 1
+            self.executions += 1
+            self.wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+
+        return f(*args, **kwargs)
+
+    def run(self, f: Any, *args: Any, **kwargs: Any) -> Any:
+        """
+        Execute the function on the pool waiting for its result
+        """
+        with self.lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
 
-    try:
-        salt = base64.b64decode(salt)
-        hash = argon2id.kdf(32, password, salt[0:16],
-                            opslimit=_GCE.options['OPSLIMIT'],
-                            memlimit=1 << _GCE.options['MEMLIMIT'])
-        return base64.b64encode(hash).decode()
+        return self.executor.submit(self._execute, time.monotonic(), f, *args, **kwargs).result()
 
-    finally:
-        lock.release()
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                'size': self.size,
+                'queued': self.queued,
+                'max_queued': self.max_queued,
+                'executions': self.executions,
+                'avg_wait_time': self.wait_time / self.executions if self.executions else 0,
+                'max_wait_time': self.max_wait_time
+            }
 
 
 class _StreamingEncryptionObject(object):
@@ -310,3 +361,4 @@ class _GCE(object):
 
 
 GCE = _GCE()
+Argon2Pool = _Argon2Pool()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+#  fileproducer
+#  ************
+#
+# Producer serving files to HTTP requests
+import mmap
+
+from twisted.internet import reactor
+from twisted.internet.defer import Deferred
+
+__all__ = ["MmapFileProducer"]
+
+
+class MmapFileProducer(object):
+    """
+    Streaming producer writing a memory mapped file
+
+    The chunk size grows while the transport accepts the data and
+    shrinks when it asks to pause; the production yields to the reactor
+    after each burst so that fast clients do not monopolize it.
+    """
+    min_chunk_size = 64 * 1024
+    max_chunk_size = 1024 * 1024
+    burst_size = 4 * 1024 * 1024
+
+    def __init__(self, request, fo, offset, size):
+        self.request = request
+        self.mm = mmap.mmap(fo.fileno(), 0, access=mmap.ACCESS_READ)
+        self.offset = offset
+        self.end = offset + size
+        self.chunk_size = self.min_chunk_size
+        self.paused = False
+        self.call = None
+        self.finish = Deferred()
+
+    def start(self):
+        self.request.registerProducer(self, True)
+        self.produce()
+        return self.finish
+
+    def produce(self):
+        self.call = None
+
+        written = 0
+        while self.request is not None and not self.paused and self.offset < self.end and written < self.burst_size:
+            chunk = self.mm[self.offset:min(self.offset + self.chunk_size, self.end)]
+            self.offset += len(chunk)
+            written += len(chunk)
+
+            # The transport pauses the producer while writing if its buffer is full
+            self.request.write(chunk)
+
+            if self.paused:
+                self.chunk_size = max(self.chunk_size // 2, self.min_chunk_size)
+            else:
+                self.chunk_size = min(self.chunk_size * 2, self.max_chunk_size)
+
+        if self.request is None:
+            return
+
+        if self.offset >= self.end:
+            self.stop()
+        elif not self.paused:
+            self.call = reactor.callLater(0, self.produce)
+
+    def pauseProducing(self):
+        self.paused = True
+
+    def resumeProducing(self):
+        self.paused = False
+
+        if self.call is None:
+            self.produce()
+
+    def stopProducing(self):
+        if self.request is None:
+            return
+
+        self.request = None
+        self.close()
+        self.finish.callback(None)
+
+    def stop(self):
+        self.request.unregisterProducer()
+        self.request = None
+        self.close()
+        self.finish.callback(None)
+
+    def close(self):
+        if self.call is not None:
+            self.call.cancel()
+            self.call = None
+
+        self.mm.close()
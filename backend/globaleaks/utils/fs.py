@@ -2,7 +2,10 @@
 import io
 import json
 import os
+import queue
 import secrets
+import threading
+import time
 
 from globaleaks.rest import errors
 from globaleaks.utils.log import log
@@ -66,6 +69,101 @@ def srm(absolutefpath, iterations_number=1):
     log.debug("Performed deletion of file: %s", absolutefpath)
 
 
+def scan_untracked_files(path, tracked_files, max_mtime=None):
+    """
+    Generator of the files of a directory that are not tracked
+
+    The directory is streamed and each entry is looked up in the set of the
+    tracked files so that the cost is linear in the number of the files.
+
+    :param path: The path of the directory to be scanned
+    :param tracked_files: A set of the names of the tracked files
+    :param max_mtime: If set, the files modified after this timestamp are skipped
+    """
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.name in tracked_files:
+                continue
+
+            try:
+                if max_mtime is not None and entry.stat().st_mtime >= max_mtime:
+                    continue
+            except OSError:
+                continue
+
+            yield entry.path
+
+
+class _SecureDeletionQueue(object):
+    """
+    Queue of the files pending secure deletion
+
+    The files are deleted by a background thread at a limited rate so that
+    the overwrite of large amounts of files does not saturate the disk.
+    """
+    rate = 100
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.thread = None
+        self.deleted = 0
+        self.failed = 0
+
+    def put(self, path):
+        with self.lock:
+            if path in self.pending:
+                return
+
+            self.pending.add(path)
+
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='srm', daemon=True)
+                self.thread.start()
+
+        self.queue.put(path)
+
+    def run(self):
+        while True:
+            path = self.queue.get()
+            exists = os.path.exists(path)
+
+            try:
+                srm(path)
+            finally:
+                with self.lock:
+                    self.pending.discard(path)
+
+                    if os.path.exists(path):
+                        self.failed += 1
+                    elif exists:
+                        self.deleted += 1
+
+                self.queue.task_done()
+
+            if exists and self.rate:
+                time.sleep(1.0 / self.rate)
+
+    def join(self):
+        """
+        Wait for the deletion of all the files in the queue
+        """
+        self.queue.join()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'rate': self.rate,
+                'pending': len(self.pending),
+                'deleted': self.deleted,
+                'failed': self.failed
+            }
+
+
+SecureDeletionQueue = _SecureDeletionQueue()
+
+
 def directory_traversal_check(trusted_absolute_prefix, untrusted_path):
     """
     Check that an 'untrusted_path' matches a 'trusted_absolute_path' prefix
@@ -1,5 +1,8 @@
 # -*- coding: utf-8
 # GlobaLeaks Utility used to handle Mail, format, exception, etc
+import time
+
+from collections import deque
 from io import BytesIO
 
 from email import utils  # pylint: disable=no-name-in-module
@@ -7,9 +10,9 @@ from email.header import Header
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
-from twisted.internet import reactor, defer
+from twisted.internet import reactor, defer, protocol
 from twisted.internet.endpoints import TCP4ClientEndpoint
-from twisted.mail.smtp import messageid, ESMTPSenderFactory
+from twisted.mail.smtp import messageid, DNSNAME, SUCCESS, ESMTPSender, SMTPClient
 from twisted.protocols import tls
 
 from globaleaks.utils.socks import SOCKS5ClientEndpoint
@@ -61,69 +64,213 @@ def sendmail(tid, smtp_host, smtp_port, security, authentication, username, pass
     :return: A deferred resource resolving at the end of the connection
     """
     try:
-        timeout = 30
+        pool = SMTPPool(tid, smtp_host, smtp_port, security, authentication, username, password,
+                        from_address, anonymize, socks_port, 1)
+
+        return pool.send(from_name, to_address, subject, body)
+
+    except Exception as e:
+        # avoids raising an exception inside email logic to avoid chained errors
+        log.err("Unexpected exception in sendmail: %s", e, tid=tid)
+        return defer.succeed(False)
+
+
+class PooledESMTPSender(ESMTPSender):
+    """
+    ESMTP protocol sending over the same connection
+    the messages queued on its pool until the queue is empty
+    """
+    message = None
+    sent = 0
+    completed = False
+    error = False
+
+    def getMailFrom(self):
+        self.message = self.factory.pop()
+        if self.message is None:
+            self.completed = True
+            return None
+
+        return self.factory.from_address
 
-        message = MIME_mail_build(from_name,
-                                  from_address,
-                                  to_address,
-                                  to_address,
-                                  subject,
-                                  body)
+    def getMailTo(self):
+        return [self.message['to_address'].encode()]
 
+    def getMailData(self):
+        return self.message['data']
+
+    def sentMail(self, code, resp, numOk, addresses, smtp_log):
+        message, self.message = self.message, None
+
+        if code in SUCCESS:
+            self.sent += 1
+            self.factory.done(message, True)
+        else:
+            log.err("SMTP delivery to %s failed (Error: %d %s)",
+                    message['to_address'], code, resp, tid=self.factory.tid)
+            self.factory.done(message, False)
+
+    def sendError(self, exc):
+        self.error = True
+
+        # The failure is reported through the deferreds of the messages of the
+        # pool and not through the single result of a SMTPSenderFactory
+        SMTPClient.sendError(self, exc)
+
+        log.err("SMTP connection failed (Exception: %s)", exc, tid=self.factory.tid)
+
+        if self.message is not None:
+            message, self.message = self.message, None
+            self.factory.done(message, False)
+
+    def connectionLost(self, reason=protocol.connectionDone):
+        ESMTPSender.connectionLost(self, reason)
+
+        if self.message is not None:
+            self.error = True
+            message, self.message = self.message, None
+            self.factory.done(message, False)
+
+        self.factory.connectionClosed(self)
+
+
+class SMTPPool(protocol.ClientFactory):
+    """
+    Pool of the connections to an SMTP server
+
+    The messages sent through the pool are queued and spooled by up to
+    connections_limit concurrent connections each sending many messages
+    with a single TLS handshake and authentication.
+    """
+    protocol = PooledESMTPSender
+    timeout = 30
+
+    def __init__(self, tid, smtp_host, smtp_port, security, authentication, username, password, from_address, anonymize=True, socks_port=9999, connections_limit=4):
+        self.tid = tid
+        self.smtp_host = smtp_host
+        self.smtp_port = smtp_port
+        self.security = security
+        self.authentication = authentication
+        self.username = username
+        self.password = password
+        self.from_address = from_address
+        self.anonymize = anonymize
+        self.socks_port = socks_port
+        self.connections_limit = connections_limit
+        self.context_factory = TLSClientContextFactory()
+
+        self.queue = deque()
+        self.connections = 0
+
+        self.sent = 0
+        self.failed = 0
+        self.connections_opened = 0
+        self.bytes = 0
+        self.send_time = 0.0
+
+    def send(self, from_name, to_address, subject, body):
+        """
+        Queue a message to be sent
+
+        :return: A deferred resolving to True if the message is sent or False otherwise
+        """
         log.debug('Sending email to %s using SMTP server [%s:%d] [%s]',
                   to_address,
-                  smtp_host,
-                  smtp_port,
-                  security,
-                  tid=tid)
-
-        context_factory = TLSClientContextFactory()
-
-        smtp_deferred = defer.Deferred()
-
-        factory = ESMTPSenderFactory(
-            username.encode() if authentication else None,
-            password.encode() if authentication else None,
-            from_address,
-            to_address,
-            message,
-            smtp_deferred,
-            contextFactory=context_factory,
-            requireAuthentication=authentication,
-            requireTransportSecurity=(security == 'TLS'),
-            retries=0,
-            timeout=timeout)
-
-        if security == "SSL":
-            factory = tls.TLSMemoryBIOFactory(context_factory, True, factory)
-
-        if anonymize:
-            socksProxy = TCP4ClientEndpoint(reactor, "127.0.0.1", socks_port, timeout=timeout)
-            endpoint = SOCKS5ClientEndpoint(smtp_host.encode('utf-8'), smtp_port, socksProxy)
+                  self.smtp_host,
+                  self.smtp_port,
+                  self.security,
+                  tid=self.tid)
+
+        data = MIME_mail_build(from_name,
+                               self.from_address,
+                               to_address,
+                               to_address,
+                               subject,
+                               body)
+
+        message = {
+            'to_address': to_address,
+            'data': data,
+            'size': len(data.getvalue()),
+            'start': time.monotonic(),
+            'deferred': defer.Deferred()
+        }
+
+        self.queue.append(message)
+
+        while self.connections < min(self.connections_limit, len(self.queue)):
+            self.connect()
+
+        return message['deferred']
+
+    def pop(self):
+        if self.queue:
+            return self.queue.popleft()
+
+    def done(self, message, result):
+        if result:
+            self.sent += 1
+            self.bytes += message['size']
+            self.send_time += time.monotonic() - message['start']
         else:
-            endpoint = TCP4ClientEndpoint(reactor, smtp_host, smtp_port, timeout=timeout)
+            self.failed += 1
 
-        conn_deferred = endpoint.connect(factory)
+        message['deferred'].callback(result)
 
-        final = defer.DeferredList([conn_deferred, smtp_deferred], fireOnOneErrback=True, consumeErrors=True)
+    def connect(self):
+        self.connections += 1
+        self.connections_opened += 1
 
-        def failure_cb(failure):
-            """
-            :param failure {Failure {twisted.internet.FirstError {Failure}}}
-            """
-            log.err("SMTP connection failed (Exception: %s)",
-                    failure.value.subFailure.value, tid=tid)
-            return False
+        factory = self
+        if self.security == 'SSL':
+            factory = tls.TLSMemoryBIOFactory(self.context_factory, True, self)
 
-        def success_cb(results):
-            """
-            :param results {list of (success, return_val) tuples}
-            """
-            return True
+        if self.anonymize:
+            socksProxy = TCP4ClientEndpoint(reactor, "127.0.0.1", self.socks_port, timeout=self.timeout)
+            endpoint = SOCKS5ClientEndpoint(self.smtp_host.encode('utf-8'), self.smtp_port, socksProxy)
+        else:
+            endpoint = TCP4ClientEndpoint(reactor, self.smtp_host, self.smtp_port, timeout=self.timeout)
 
-        return final.addCallbacks(success_cb, failure_cb)
+        endpoint.connect(factory).addErrback(self.connectionFailed)
 
-    except Exception as e:
-        # avoids raising an exception inside email logic to avoid chained errors
-        log.err("Unexpected exception in sendmail: %s", e, tid=tid)
-        return defer.succeed(False)
+    def connectionFailed(self, failure):
+        log.err("SMTP connection failed (Exception: %s)", failure.value, tid=self.tid)
+        self.connections -= 1
+        self.flush()
+
+    def connectionClosed(self, p):
+        self.connections -= 1
+
+        if self.queue and (p.completed or (p.sent and not p.error)):
+            # The connection was working; reopen it to complete the queue
+            self.connect()
+        else:
+            self.flush()
+
+    def flush(self):
+        # Fail the queued messages once no connection is left to send them
+        while not self.connections and self.queue:
+            self.done(self.queue.popleft(), False)
+
+    def buildProtocol(self, addr):
+        p = self.protocol(self.username.encode() if self.authentication else None,
+                          self.password.encode() if self.authentication else None,
+                          self.context_factory,
+                          DNSNAME,
+                          10)
+        p.requireAuthentication = self.authentication
+        p.requireTransportSecurity = self.security == 'TLS'
+        p.factory = self
+        p.timeout = self.timeout
+        return p
+
+    def stats(self):
+        return {
+            'queued': len(self.queue),
+            'connections': self.connections,
+            'connections_opened': self.connections_opened,
+            'sent': self.sent,
+            'failed': self.failed,
+            'bytes': self.bytes,
+            'avg_send_time': self.send_time / self.sent if self.sent else 0
+        }
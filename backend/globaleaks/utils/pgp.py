@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 import os
+import subprocess
+import threading
 
+from collections import OrderedDict
 from datetime import datetime
 
 from tempfile import TemporaryDirectory
@@ -8,12 +11,15 @@ from tempfile import TemporaryDirectory
 from gnupg import GPG
 
 from globaleaks.rest import errors
+from globaleaks.utils.crypto import sha256
 from globaleaks.utils.log import log
 
 
-class PGPContext(object):
+class Keyring(object):
     def __init__(self, key):
         """
+        Import a PGP key in a dedicated GnuPG home
+
         :param key: The PGP key to be loaded
         """
         self.fingerprint = ''
@@ -49,6 +55,75 @@ class PGPContext(object):
             log.err("Error in PGP import_keys: %s", excep)
             raise errors.InputValidationError
 
+
+class _KeyringCache(object):
+    """
+    LRU cache of the keyrings of the PGP keys in use
+
+    Keyrings are indexed by the digest of the key material so that the
+    import of a key is performed once and not at every operation. The
+    GnuPG home of an evicted keyring is removed once no context uses it.
+    """
+    def __init__(self, size=256):
+        self.size = size
+        self.keyrings = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        digest = sha256(key)
+
+        with self.lock:
+            keyring = self.keyrings.get(digest)
+            if keyring is not None:
+                self.keyrings.move_to_end(digest)
+                self.hits += 1
+                return keyring
+
+            self.misses += 1
+
+        keyring = Keyring(key)
+
+        with self.lock:
+            self.keyrings[digest] = keyring
+            self.keyrings.move_to_end(digest)
+
+            while len(self.keyrings) > self.size:
+                self.keyrings.popitem(last=False)
+                self.evictions += 1
+
+        return keyring
+
+    def clear(self):
+        with self.lock:
+            self.keyrings.clear()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'size': self.size,
+                'entries': len(self.keyrings),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+KeyringCache = _KeyringCache()
+
+
+class PGPContext(object):
+    def __init__(self, key):
+        """
+        :param key: The PGP key to be loaded
+        """
+        self.keyring = KeyringCache.get(key)
+        self.gnupg = self.keyring.gnupg
+        self.fingerprint = self.keyring.fingerprint
+        self.expiration = self.keyring.expiration
+
     def encrypt_file(self, input_file, output_path):
         """
         Encrypt a file with the specified PGP key
@@ -60,6 +135,12 @@ class PGPContext(object):
 
         return encrypted_obj, os.stat(output_path).st_size
 
+    def open_encrypted_file(self, output_path):
+        """
+        Open a file where the data written is encrypted with the specified PGP key
+        """
+        return PGPEncryptedFile(self, output_path)
+
     def encrypt_message(self, plaintext):
         """
         Encrypt a text message with the specified key
@@ -70,3 +151,117 @@ class PGPContext(object):
             raise errors.InputValidationError
 
         return str(encrypted_obj)
+
+    def encrypt_stream(self, chunks, chunk_size=64 * 1024):
+        """
+        Encrypt an iterable of data chunks with the specified key
+        yielding the encrypted output while the input is consumed
+
+        The errors raised by the iterable are raised again after killing
+        GnuPG so that a truncated input never results in a valid output.
+        """
+        args = self.gnupg.make_args(['--batch', '--encrypt', '--recipient', self.fingerprint], False)
+        process = subprocess.Popen(args,
+                                   stdin=subprocess.PIPE,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL)
+        failures = []
+
+        def feed():
+            try:
+                for chunk in chunks:
+                    process.stdin.write(chunk)
+            except BrokenPipeError:
+                # GnuPG exited; its exit status is checked by the reader
+                pass
+            except Exception as e:
+                failures.append(e)
+                process.kill()
+            finally:
+                try:
+                    process.stdin.close()
+                except:
+                    pass
+
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+
+        try:
+            while True:
+                data = process.stdout.read1(chunk_size)
+                if not data:
+                    break
+
+                yield data
+
+            feeder.join()
+            if failures:
+                raise failures[0]
+
+            if process.wait() != 0:
+                raise errors.InputValidationError
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+            process.stdout.close()
+            feeder.join()
+
+
+class PGPEncryptedFile(object):
+    """
+    Write-only file object piping its data to a GnuPG process
+    that encrypts it to the output path
+    """
+    def __init__(self, context, output_path):
+        self.context = context
+
+        args = context.gnupg.make_args(['--batch', '--yes', '--armor',
+                                        '--encrypt', '--recipient', context.fingerprint,
+                                        '--output', output_path], False)
+
+        self.process = subprocess.Popen(args,
+                                        stdin=subprocess.PIPE,
+                                        stdout=subprocess.DEVNULL,
+                                        stderr=subprocess.DEVNULL)
+
+    def write(self, data):
+        self.process.stdin.write(data)
+
+    def close(self):
+        if self.process is None:
+            return
+
+        process, self.process = self.process, None
+
+        try:
+            process.stdin.close()
+        finally:
+            returncode = process.wait()
+
+        if returncode != 0:
+            raise errors.InputValidationError
+
+    def abort(self):
+        if self.process is None:
+            return
+
+        process, self.process = self.process, None
+
+        process.kill()
+        process.wait()
+
+        try:
+            process.stdin.close()
+        except:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
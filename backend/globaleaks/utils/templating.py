@@ -7,6 +7,7 @@ import copy
 import re
 
 from datetime import datetime, timedelta
+from functools import lru_cache
 
 from twisted.internet.abstract import isIPAddress
 
@@ -127,6 +128,18 @@ account_activation_keywords = [
 ]
 
 
+keyword_regexp = re.compile(r'({[a-zA-Z0-9]+})')
+
+
+@lru_cache(maxsize=1024)
+def compile_template(raw_template):
+    """
+    Parse a template in a tuple of tokens where the text is
+    at the even positions and the keywords at the odd positions
+    """
+    return tuple(keyword_regexp.split(raw_template))
+
+
 def indent(n=1):
     return '  ' * n
 
@@ -141,6 +154,15 @@ def indent_text(text, n=1):
 class Keyword(object):
     keyword_list = []
     data_keys = []
+    keyword_sets = {}
+
+    @classmethod
+    def keywords(cls):
+        keywords = cls.keyword_sets.get(cls)
+        if keywords is None:
+            keywords = cls.keyword_sets[cls] = frozenset(cls.keyword_list)
+
+        return keywords
 
     def __init__(self, data):
         for k in self.data_keys:
@@ -656,18 +678,25 @@ supported_template_types = {
 class Templating(object):
     def format_template(self, raw_template, data):
         keyword_converter = supported_template_types[data['type']](data)
+        keywords = keyword_converter.keywords()
+        tokens = compile_template(raw_template)
+
+        output = list(tokens)
+        values = {}
+
+        for i in range(1, len(tokens), 2):
+            kw = tokens[i]
+            if kw not in keywords:
+                continue
 
-        for kw in keyword_converter.keyword_list:
-            if raw_template.count(kw):
+            if kw not in values:
                 # if {SomeKeyword} matches, call keyword_converter.SomeKeyword function
                 variable_content = getattr(keyword_converter, kw[1:-1])()
-                variable_content = re.sub("{", "(", variable_content)
-                variable_content = re.sub("}", ")", variable_content)
-                raw_template = raw_template.replace(kw, variable_content)
+                values[kw] = variable_content.replace('{', '(').replace('}', ')')
 
-        raw_template = raw_template.rstrip()
+            output[i] = values[kw]
 
-        return raw_template
+        return ''.join(output).rstrip()
 
     def get_mail_subject_and_body(self, data):
         subject_template = ''
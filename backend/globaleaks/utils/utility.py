@@ -175,3 +175,18 @@ def bytes_to_pretty_str(b):
         return "%dMB" % int(b / 1000000)
 
     return "%dKB" % int(b / 1000)
+
+
+def encode_cursor(date, id):
+    """
+    Encode a pagination cursor pointing to the entry with the given date and id
+    """
+    return '%s.%s' % (date.strftime('%Y%m%d%H%M%S%f'), id)
+
+
+def decode_cursor(cursor):
+    """
+    Decode a pagination cursor returning the date and the id it points to
+    """
+    date, id = cursor.split('.', 1)
+    return datetime.strptime(date, '%Y%m%d%H%M%S%f'), id
@@ -14,10 +14,12 @@ import zlib
 
 from twisted.internet import abstract
 from twisted.internet.defer import Deferred
+from twisted.internet.threads import deferToThread
+from twisted.python.failure import Failure
 
 from globaleaks.utils.crypto import GCE
 
-__all__ = ["ZipStream"]
+__all__ = ["ZipStream", "ZipStreamProducer"]
 
 ZIP64_LIMIT = (1 << 31) - 1
 ZIP_DEFLATED = 8
@@ -321,33 +323,85 @@ class ZipStream(object):
 
 
 class ZipStreamProducer(object):
-    """Streaming producter for ZipStream"""
+    """
+    Streaming producer for ZipStream
+
+    Chunks are generated in a worker thread so that compression and
+    decryption never block the reactor; production is paused and
+    resumed by the transport in relation to the client consumption.
+    """
 
     def __init__(self, handler, zipstreamObject):
         self.finish = Deferred()
         self.handler = handler
-        self.zipstreamObject = zipstreamObject
+        self.zipstreamObject = iter(zipstreamObject)
+        self.paused = False
+        self.pending = False
 
     def start(self):
-        self.handler.request.registerProducer(self, False)
+        self.handler.request.registerProducer(self, True)
+        self.produce()
         return self.finish
 
-    def resumeProducing(self):
-        if not self.handler:
+    def produce(self):
+        if self.handler is None or self.paused or self.pending:
             return
 
-        data = self.zip_chunk()
-        if data:
+        self.pending = True
+        deferToThread(self.zip_chunk).addCallbacks(self.on_chunk, self.on_error)
+
+    def on_chunk(self, data):
+        self.pending = False
+
+        if self.handler is None:
+            deferToThread(self.close)
+        elif data:
             self.handler.request.write(data)
+            self.produce()
         else:
-            self.stopProducing()
+            self.stop(None)
+
+    def on_error(self, failure):
+        self.pending = False
+
+        if self.handler is None:
+            deferToThread(self.close)
+        else:
+            self.stop(failure)
+
+    def pauseProducing(self):
+        self.paused = True
+
+    def resumeProducing(self):
+        self.paused = False
+        self.produce()
 
     def stopProducing(self):
-        self.handler.request.unregisterProducer()
-        self.handler.request.finish()
+        if self.handler is None:
+            return
+
         self.handler = None
+
+        if not self.pending:
+            deferToThread(self.close)
+
         self.finish.callback(None)
 
+    def stop(self, result):
+        self.handler.request.unregisterProducer()
+        self.handler = None
+        self.close()
+
+        if isinstance(result, Failure):
+            self.finish.errback(result)
+        else:
+            self.finish.callback(result)
+
+    def close(self):
+        close = getattr(self.zipstreamObject, 'close', None)
+        if close is not None:
+            close()
+
     def zip_chunk(self):
         chunk = []
         chunk_size = 0
@@ -357,6 +411,6 @@ class ZipStreamProducer(object):
                 chunk_size += len(data)
                 chunk.append(data)
                 if chunk_size >= abstract.FileDescriptor.bufferSize:
-                    return b''.join(chunk)
+                    break
 
         return b''.join(chunk)
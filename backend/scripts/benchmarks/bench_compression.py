@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+#
+# Benchmark of the compression of the responses
+#
+# The CPU time spent on the reactor thread by the legacy gzip encoder of
+# Twisted is compared with the one spent by the compression policy on an
+# encrypted download, that is not compressed, and on a large JSON response,
+# that is compressed out of the reactor thread.
+#
+# The benchmarks reuse the fixtures of the unit tests and are run with trial
+# from the backend directory:
+#
+#   trial scripts/benchmarks/bench_compression.py
+import json
+import os
+import time
+
+from twisted.internet.defer import inlineCallbacks
+from twisted.web import server
+
+from globaleaks.rest import compression
+from globaleaks.tests import helpers, test_compression
+
+
+class BenchmarkCompression(helpers.TestGL):
+    get_request = test_compression.TestCompression.get_request
+
+    @inlineCallbacks
+    def test_compression(self):
+        encrypted = os.urandom(4 * 1024 * 1024)
+        data = json.dumps([{'id': i, 'name': 'antani'} for i in range(100000)]).encode()
+
+        request = self.get_request(b'application/octet-stream')
+        start = time.thread_time()
+        test_compression.encode(server._GzipEncoder(compression.COMPRESS_LEVEL, request), encrypted)
+        legacy = time.thread_time() - start
+
+        request = self.get_request(b'application/octet-stream')
+        start = time.thread_time()
+        test_compression.encode(request._encoder, encrypted)
+        policy = time.thread_time() - start
+
+        print("\nencrypted download of 4MiB: legacy %.1fms, policy %.1fms" % (legacy * 1000, policy * 1000))
+
+        request = self.get_request(b'application/json')
+        start = time.thread_time()
+        test_compression.encode(server._GzipEncoder(compression.COMPRESS_LEVEL, request), data)
+        legacy = time.thread_time() - start
+
+        request = self.get_request(b'application/json')
+        start = time.thread_time()
+        d = compression.compress_response(request, data)
+        policy = time.thread_time() - start
+        compressed = yield d
+        start = time.thread_time()
+        test_compression.encode(request._encoder, compressed)
+        policy += time.thread_time() - start
+
+        print("JSON response of %dKiB: legacy %.1fms, policy %.1fms" % (len(data) // 1024, legacy * 1000, policy * 1000))
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+#
+# Benchmark of the lookups of the configuration
+#
+# The lookups of a set of variables performed with a query per variable are
+# compared with the baked lookup of each variable and with the single query
+# of ConfigFactory.get_vals() on the variables serialized by the public node.
+#
+# The benchmarks reuse the fixtures of the unit tests and are run with trial
+# from the backend directory:
+#
+#   trial scripts/benchmarks/bench_config.py
+import timeit
+
+from globaleaks.models.config import ConfigFactory
+from globaleaks.orm import transact
+from globaleaks.tests import helpers
+
+
+class BenchmarkConfig(helpers.TestGL):
+    number = 200
+
+    names = ['version',
+             'version_db',
+             'latest_version',
+             'default_language',
+             'onionservice',
+             'disable_privacy_badge']
+
+    def test_get_vals(self):
+        @transact
+        def transaction(session):
+            node = ConfigFactory(session, 1)
+
+            query = timeit.timeit(lambda: [node.get_cfg(name).value for name in self.names], number=self.number)
+            baked = timeit.timeit(lambda: [node.get_val(name) for name in self.names], number=self.number)
+            single = timeit.timeit(lambda: node.get_vals(self.names), number=self.number)
+
+            print("\n%d variables: query per variable %.3fms, baked %.3fms (%.1fx), single query %.3fms (%.1fx)" %
+                  (len(self.names),
+                   query * 1000 / self.number,
+                   baked * 1000 / self.number,
+                   query / baked,
+                   single * 1000 / self.number,
+                   query / single))
+
+        return transaction()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+#
+# Benchmark of the serving of the files
+#
+# The CPU time per MiB spent serving a file on a loopback connection with
+# the FileSender of Twisted is compared with the one spent with the memory
+# mapped producer used by serve_file. The figures include the CPU time of
+# the in-process client, that is the same in all the runs.
+#
+# The benchmarks reuse the fixtures of the unit tests and are run with trial
+# from the backend directory:
+#
+#   trial scripts/benchmarks/bench_fileproducer.py
+import os
+import time
+
+from twisted.internet import reactor
+from twisted.internet.defer import inlineCallbacks, returnValue
+from twisted.web import server
+from twisted.web.client import Agent, readBody
+
+from globaleaks.handlers import base
+from globaleaks.settings import Settings
+from globaleaks.tests import helpers
+from globaleaks.tests.utils.test_fileproducer import FileResource
+
+
+class BenchmarkFileProducer(helpers.TestGL):
+    size = 16 * 1024 * 1024
+    number = 5
+
+    @inlineCallbacks
+    def setUp(self):
+        yield helpers.TestGL.setUp(self)
+
+        self.path = os.path.join(Settings.tmp_path, 'file')
+        with open(self.path, 'wb') as f:
+            f.write(os.urandom(self.size))
+
+        self.port = reactor.listenTCP(0, server.Site(FileResource(self.path, b'application/octet-stream')),
+                                      interface='127.0.0.1')
+        self.url = b'http://127.0.0.1:%d/' % self.port.getHost().port
+
+    def tearDown(self):
+        return self.port.stopListening()
+
+    @inlineCallbacks
+    def measure(self):
+        results = []
+
+        for _ in range(self.number):
+            start = time.thread_time()
+            response = yield Agent(reactor).request(b'GET', self.url)
+            body = yield readBody(response)
+            results.append(time.thread_time() - start)
+            self.assertEqual(len(body), self.size)
+
+        returnValue(min(results) * 1000 / (self.size / (1024 * 1024)))
+
+    @inlineCallbacks
+    def test_serve_file(self):
+        mmap = yield self.measure()
+
+        # Files without a known range are served with the FileSender
+        self.patch(base, 'get_file_range', lambda fo: None)
+        filesender = yield self.measure()
+
+        print("\n%dMiB file: FileSender %.1fms/MiB, mmap %.1fms/MiB (%.1fx)" %
+              (self.size // (1024 * 1024), filesender, mmap, filesender / mmap))
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+#
+# Benchmark of the rendering of the notification templates
+#
+# The compiled templates are compared with the legacy scan of the keywords
+# on the default mail templates of every supported template type.
+#
+# The benchmarks reuse the fixtures of the unit tests and are run with trial
+# from the backend directory:
+#
+#   trial scripts/benchmarks/bench_templating.py
+import timeit
+
+from twisted.internet.defer import inlineCallbacks
+
+from globaleaks.handlers import admin, public, recipient, user
+from globaleaks.jobs.delivery import Delivery
+from globaleaks.orm import tw
+from globaleaks.tests import helpers
+from globaleaks.tests.utils.test_templating import format_template_by_keyword_scan
+from globaleaks.utils.templating import Templating, supported_template_types
+
+
+class BenchmarkTemplating(helpers.TestGLWithPopulatedDB):
+    number = 20
+
+    @inlineCallbacks
+    def test_format_template(self):
+        yield self.perform_full_submission_actions()
+        yield Delivery().run()
+
+        data = {}
+        data['type'] = 'tip'
+        data['user'] = yield user.get_user(1, self.dummyReceiver_1['id'], 'en')
+        data['context'] = yield admin.context.get_context(1, self.dummyContext['id'], 'en')
+        data['notification'] = yield tw(admin.notification.db_get_notification, 1, 'en')
+        data['node'] = yield tw(admin.node.db_admin_serialize_node, 1, 'en')
+        data['submission_statuses'] = yield tw(public.db_get_submission_statuses, 1, 'en')
+
+        tip_id = next(tip['id'] for tip in self.dummyRTips if tip['receiver_id'] == self.dummyReceiver_1['id'])
+        data['tip'], _ = yield recipient.rtip.get_rtip(1, self.dummyReceiver_1['id'], tip_id, 'en')
+        data['comments'] = data['tip']['comments']
+
+        templates = [data['notification'][t + '_mail_template'] for t in supported_template_types
+                     if t + '_mail_template' in data['notification']]
+
+        scan = timeit.timeit(lambda: [format_template_by_keyword_scan(t, data) for t in templates], number=self.number)
+        compiled = timeit.timeit(lambda: [Templating().format_template(t, data) for t in templates], number=self.number)
+
+        print("\n%d templates: keyword scan %.2fms, compiled %.2fms (%.1fx)" %
+              (len(templates),
+               scan * 1000 / self.number,
+               compiled * 1000 / self.number,
+               scan / compiled))
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+#
+# Benchmark of the validation of the requests
+#
+# The compiled validators are compared with the legacy recursive validation
+# on a submission with 50 answers and on a step with 20 fields of 10 options.
+#
+# The benchmarks reuse the fixtures of the unit tests and are run with trial
+# from the backend directory:
+#
+#   trial scripts/benchmarks/bench_validator.py
+import copy
+import timeit
+
+from globaleaks.rest import requests
+from globaleaks.rest.validator import validate_request
+from globaleaks.tests.helpers import TestGL
+from globaleaks.tests.test_validator import legacy_validate_request, step, submission
+
+
+class BenchmarkValidator(TestGL):
+    number = 50
+
+    def measure(self, validate, request, template):
+        # the requests are altered by the validation so they are copied in advance
+        copies = [copy.deepcopy(request) for _ in range(self.number)]
+        return timeit.timeit(lambda: validate(copies.pop(), template), number=self.number)
+
+    def test_validate_request(self):
+        for name, request, template in [('submission', submission, requests.SubmissionDesc),
+                                        ('step', step, requests.AdminStepDesc)]:
+            legacy = self.measure(legacy_validate_request, request, template)
+            compiled = self.measure(validate_request, request, template)
+
+            print("\n%s: legacy %.3fms, compiled %.3fms (%.1fx)" %
+                  (name,
+                   legacy * 1000 / self.number,
+                   compiled * 1000 / self.number,
+                   legacy / compiled))